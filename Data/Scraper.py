@@ -1,79 +1,157 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
-import time, os, requests
-
-# === Step 1: Launch and navigate ===
-driver = webdriver.Chrome()
-driver.maximize_window()
-driver.get("https://www.fia.com/documents/championships/fia-formula-one-world-championship-14/season/season-2024-2043")
-
-wait = WebDriverWait(driver, 20)
-wait.until(EC.presence_of_element_located((By.CLASS_NAME, "decision-document-list")))
-
-# === Step 2: Count how many ULs are in that container ===
-div_element = driver.find_element(By.XPATH, "//*[@id='list-view']/div[3]/div/div[2]/div")
-ul_elements = div_element.find_elements(By.TAG_NAME, "ul")
-uls = len(ul_elements)
-#uls = driver.find_elements(By.XPATH, "//*[@id="list-view"]/div[3]/div/div[2]/div")
-print(f"Found {uls} GP panels")
-
-# === Step 3: Click each GP panel using absolute XPath ===
-for i in range(1, uls + 1):
+import os
+import re
+import csv
+import time
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+
+from panels import make_driver, open_season_page, count_panels, iter_panel_documents
+from downloader import BASE_URL, RateLimiter, download_all
+from manifest import Manifest
+
+# FIA season pages; other seasons can be passed on the command line as YEAR=URL.
+SEASON_URLS = {
+    2022: "https://www.fia.com/documents/championships/fia-formula-one-world-championship-14/season/season-2022-2005",
+    2023: "https://www.fia.com/documents/championships/fia-formula-one-world-championship-14/season/season-2023-2042",
+    2024: "https://www.fia.com/documents/championships/fia-formula-one-world-championship-14/season/season-2024-2043",
+    2025: "https://www.fia.com/documents/championships/fia-formula-one-world-championship-14/season/season-2025-2071",
+}
+
+INDEX_FIELDS = ["year", "grand_prix", "title", "url", "local_path"]
+DEFAULT_INDEX = "document_index.csv"
+
+
+def gp_folder_name(grand_prix):
+    """'2024 Abu Dhabi Grand Prix' -> 'abu_dhabi_grand_prix' (the year/gp_folder layout)."""
+    if not grand_prix:
+        return "unknown_gp"
+    name = re.sub(r"^\d{4}\s+", "", grand_prix.strip()).lower()
+    return re.sub(r"[^a-z0-9]+", "_", name).strip("_") or "unknown_gp"
+
+
+# --- STEP 1: Expand one season's panels and read its links straight from the DOM ---
+def _scrape_share(year, url, worker, workers, output_dir, rate_limiter, headless):
+    """One browser's share of a season: every `workers`-th GP panel, as index rows."""
+    driver = make_driver(headless=headless)
+    rows = []
     try:
-        xpath = f"/html/body/div[4]/div/div/div[4]/div[2]/div/div[3]/div/div[2]/div/ul[{i}]"
-        panel = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.XPATH, xpath)))
-        driver.execute_script("arguments[0].scrollIntoView(true);", panel)
-        time.sleep(1)
-        driver.execute_script("arguments[0].click();", panel)
-        time.sleep(10)
-        
-        print(f"Clicked panel {i}")
-        time.sleep(10)  # wait for documents to load
-    except Exception as e:
-        print(f"Failed to click panel {i}: {e}")
-
-# === Step 4: Save the final expanded page source ===
-time.sleep(15)
-page_source = driver.page_source
-with open("page_source.html", "w", encoding="utf-8") as f:
-    f.write(page_source)
-print("✅ Saved full page source after all panels expanded.")
-driver.quit()
-
-#print(page_source)
-# === Step 5: Parse with BeautifulSoup and download PDFs ===
-with open("page_source.html", "r", encoding="utf-8") as f:
-    soup = BeautifulSoup(f, "html.parser")
-
-pdf_links = soup.find_all("a", href=True)
-
-downloaded = 0
-for link in pdf_links:
-    href = link["href"]
-    if "/decision-document/" in href and href.endswith(".pdf"):
-        filename = href.split("/")[-1]
-        parts = filename.split("_")
-
-        if len(parts) > 2:
-            gp_parts = parts[1:-3]  # crude logic to extract "canadian_grand_prix"
-            gp_folder = "_".join(gp_parts).lower()
-        else:
-            gp_folder = "unknown_gp"
-
-        os.makedirs(gp_folder, exist_ok=True)
-        full_url = "https://www.fia.com" + href
-        file_path = os.path.join(gp_folder, filename)
-
-        try:
-            r = requests.get(full_url)
-            with open(file_path, "wb") as f:
-                f.write(r.content)
-            downloaded += 1
-            print(f"⬇️ Downloaded: {file_path}")
-        except Exception as e:
-            print(f"❌ Failed: {full_url} — {e}")
-
-print(f"\n✅ Finished: {downloaded} PDF documents downloaded into folders.")
+        rate_limiter.acquire()
+        open_season_page(driver, url)
+        indices = range(worker, count_panels(driver), workers)
+
+        for grand_prix, documents in iter_panel_documents(driver, indices, rate_limiter=rate_limiter):
+            folder = os.path.join(output_dir, str(year), gp_folder_name(grand_prix))
+            for doc in documents:
+                href = doc["href"]
+                if not href.endswith(".pdf"):
+                    continue
+                rows.append({
+                    "year": year,
+                    "grand_prix": grand_prix,
+                    "title": doc["title"],
+                    "url": urljoin(BASE_URL, href),
+                    "local_path": os.path.join(folder, href.split("/")[-1]),
+                })
+            print(f"📄 {year} — {grand_prix}: {len(documents)} documents")
+    finally:
+        driver.quit()
+    return rows
+
+
+def scrape_seasons(seasons, output_dir="pdfs", browsers_per_season=2, rate_limiter=None, headless=True):
+    """Scrapes several seasons concurrently and returns one normalized document index.
+
+    `seasons` maps year -> season page URL. Every browser shares `rate_limiter`, so the
+    request rate against the FIA site is capped for the whole run, not per season.
+    """
+    rate_limiter = rate_limiter or RateLimiter(rate=5.0)
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=len(seasons) * browsers_per_season) as pool:
+        futures = [
+            pool.submit(_scrape_share, year, url, w, browsers_per_season, output_dir, rate_limiter, headless)
+            for year, url in seasons.items()
+            for w in range(browsers_per_season)
+        ]
+        rows = [row for future in futures for row in future.result()]
+
+    # Same document can be linked from more than one place; keep the first occurrence
+    index = list({row["url"]: row for row in reversed(rows)}.values())
+    index.sort(key=lambda row: (row["year"], row["grand_prix"] or "", row["title"]))
+    print(f"⏱️ Indexed {len(index)} documents from {len(seasons)} season(s) in {time.perf_counter() - start:.1f}s")
+    return index
+
+
+def write_index(index, index_path=DEFAULT_INDEX):
+    with open(index_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=INDEX_FIELDS)
+        writer.writeheader()
+        writer.writerows(index)
+
+
+def read_index(index_path=DEFAULT_INDEX):
+    """Loads the document index written by `write_index` (what downstream stages consume)."""
+    with open(index_path, "r", encoding="utf-8") as f:
+        return [dict(row, year=int(row["year"])) for row in csv.DictReader(f)]
+
+
+# --- MAIN: scrape -> index -> download ---
+def main(years, output_dir="pdfs", index_path=DEFAULT_INDEX, manifest_path="manifest.sqlite",
+         browsers_per_season=2, rate=5.0, max_workers=8, season_urls=None, headless=True):
+    season_urls = {**SEASON_URLS, **(season_urls or {})}
+    missing = [year for year in years if year not in season_urls]
+    if missing:
+        raise ValueError(f"No season page URL known for {missing}; pass them as YEAR=URL")
+
+    rate_limiter = RateLimiter(rate=rate)
+    index = scrape_seasons(
+        {year: season_urls[year] for year in years},
+        output_dir=output_dir,
+        browsers_per_season=browsers_per_season,
+        rate_limiter=rate_limiter,
+        headless=headless,
+    )
+    write_index(index, index_path)
+    print(f"✅ Wrote document index: {index_path}")
+
+    # Only documents missing from the manifest are fetched; known ones are skipped
+    manifest = Manifest(manifest_path)
+    manifest.start_run()
+    jobs = [(row["url"], row["local_path"], row["title"]) for row in index]
+    stats = download_all(jobs, max_workers=max_workers, per_host=4, manifest=manifest, rate_limiter=rate_limiter)
+    new_docs = manifest.new_documents()
+    # Long titles are stored under a shortened name (paths.py); point the index at the real files
+    for row in index:
+        entry = manifest.get(row["url"])
+        if entry:
+            row["local_path"] = entry["local_path"]
+    write_index(index, index_path)
+    manifest.close()
+
+    print(f"\n✅ Finished: {stats['files']} PDF documents downloaded into folders ({len(new_docs)} new this run).")
+    return index
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Scrape FIA decision documents for one or more seasons.")
+    parser.add_argument("seasons", nargs="+", help="season years, or YEAR=URL for seasons not in SEASON_URLS")
+    parser.add_argument("--output-dir", default="pdfs")
+    parser.add_argument("--index", default=DEFAULT_INDEX)
+    parser.add_argument("--manifest", default="manifest.sqlite")
+    parser.add_argument("--browsers", type=int, default=2, help="browsers per season")
+    parser.add_argument("--rate", type=float, default=5.0, help="max requests per second for the whole run")
+    parser.add_argument("--workers", type=int, default=8, help="download workers")
+    parser.add_argument("--show", action="store_true", help="run with visible browser windows")
+    args = parser.parse_args()
+
+    years, extra_urls = [], {}
+    for season in args.seasons:
+        year, _, url = season.partition("=")
+        years.append(int(year))
+        if url:
+            extra_urls[int(year)] = url
+
+    main(years, args.output_dir, args.index, args.manifest, args.browsers, args.rate, args.workers,
+         season_urls=extra_urls, headless=not args.show)
@@ -0,0 +1,220 @@
+import csv
+import json
+import time
+import sqlite3
+
+from .template_extractor import FIELDS
+
+DEFAULT_STORE = "annotations.sqlite"
+COLUMNS = FIELDS + ["source_file"]  # CSV/Parquet export order, same as the anottated/ CSVs
+LIST_FIELDS = ("drivers_involved", "teams_involved")  # stored as JSON text
+# Misspelled headers of the older anottated/ CSVs (2022_annotations.csv) and the published
+# Pdata.csv/penalty2x_data.csv. The one copy: cleaning, parquet_export, search_index and
+# mock_llm_server import it from here.
+COLUMN_ALIASES = {
+    "immediat_advantage_gained": "immediate_advantage_gained",
+    "drivers_invovled": "drivers_involved",
+    "teams_invovled": "teams_involved",
+}
+
+# --- JOB STATUSES ---
+DONE = "done"        # annotated, records stored
+SKIPPED = "skipped"  # pre-classifier decided there is nothing to extract
+EMPTY = "empty"      # model returned no records: retried on the next run
+FAILED = "failed"    # error: retried on the next run
+FINISHED = (DONE, SKIPPED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS annotations (
+    source_file TEXT NOT NULL,
+    record_no   INTEGER NOT NULL,
+    {columns},
+    PRIMARY KEY (source_file, record_no)
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    source_file TEXT PRIMARY KEY,
+    status      TEXT NOT NULL,
+    route       TEXT,
+    records     INTEGER NOT NULL DEFAULT 0,
+    error       TEXT,
+    updated_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status);
+""".format(columns=",\n    ".join(f"{field} {'INTEGER' if field in ('year', 'lap_number') else 'TEXT'}" for field in FIELDS))
+
+
+def _to_db(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def _from_db(field, value):
+    if field in LIST_FIELDS and value:
+        try:
+            return json.loads(value)
+        except ValueError:  # imported from a CSV as a Python-style list string
+            return value
+    return value
+
+
+# --- ANNOTATION STORE ---
+class AnnotationStore:
+    """SQLite sink for annotations, replacing the append-only CSV.
+
+    Records and their job status are written in the same transaction, buffered and
+    flushed every `batch_size` files, so a crash loses at most the unflushed files and
+    those are simply redone. `is_finished` is a primary-key lookup, so resuming does
+    not re-read previous output. CSV/Parquet files are produced on demand by the exports.
+    """
+
+    def __init__(self, path=DEFAULT_STORE, batch_size=50):
+        self.path = path
+        self.batch_size = batch_size
+        self._pending = {}  # source_file -> (status, route, records, error), in arrival order
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    # --- resume ---
+    def is_finished(self, source_file):
+        if source_file in self._pending:
+            return self._pending[source_file][0] in FINISHED
+        row = self._conn.execute("SELECT status FROM jobs WHERE source_file = ?", (source_file,)).fetchone()
+        return row is not None and row[0] in FINISHED
+
+    def finished_files(self, statuses=FINISHED):
+        self.flush()
+        rows = self._conn.execute(
+            "SELECT source_file FROM jobs WHERE status IN (%s)" % ",".join("?" * len(statuses)), statuses
+        )
+        return {row[0] for row in rows}
+
+    # --- writes ---
+    def save(self, source_file, records, route=None):
+        """Queues a file's records (replacing any earlier ones); status is DONE or EMPTY."""
+        self._queue(source_file, DONE if records else EMPTY, route, records or [], None)
+
+    def mark(self, source_file, status, route=None, error=None):
+        self._queue(source_file, status, route, None, error)
+
+    def reset(self, source_files):
+        """Forgets the job status of `source_files` (e.g. their text changed) so they are redone."""
+        self.flush()
+        with self._conn:
+            self._conn.executemany("DELETE FROM jobs WHERE source_file = ?", [(f,) for f in source_files])
+
+    def _queue(self, source_file, status, route, records, error):
+        self._pending[source_file] = (status, route, records, error)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        now = time.time()
+        placeholders = ", ".join("?" * (len(FIELDS) + 2))
+        with self._conn:
+            for source_file, (status, route, records, error) in self._pending.items():
+                if records is not None:
+                    self._conn.execute("DELETE FROM annotations WHERE source_file = ?", (source_file,))
+                    self._conn.executemany(
+                        f"INSERT INTO annotations (source_file, record_no, {', '.join(FIELDS)}) VALUES ({placeholders})",
+                        [
+                            (source_file, i, *(_to_db(record.get(field)) for field in FIELDS))
+                            for i, record in enumerate(records)
+                        ],
+                    )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?)",
+                    (source_file, status, route, len(records or []), error, now),
+                )
+        self._pending = {}
+
+    # --- reads / exports ---
+    def fingerprint(self):
+        """Changes whenever a job is written; lets downstream stages tell if the store moved on."""
+        self.flush()
+        count, last = self._conn.execute("SELECT COUNT(*), MAX(updated_at) FROM jobs").fetchone()
+        return f"{count}:{last}"
+
+    def counts(self):
+        self.flush()
+        return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def records(self, source_file):
+        """One file's stored records, lists decoded (e.g. to copy them onto a near-duplicate)."""
+        self.flush()
+        cursor = self._conn.execute(
+            f"SELECT {', '.join(FIELDS)} FROM annotations WHERE source_file = ? ORDER BY record_no", (source_file,)
+        )
+        return [
+            {field: _from_db(field, value) for field, value in zip(FIELDS, row)}
+            for row in cursor
+        ]
+
+    def rows(self):
+        """Yields stored records as dicts in COLUMNS order (lists kept as JSON text)."""
+        self.flush()
+        cursor = self._conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM annotations ORDER BY source_file, record_no"
+        )
+        for row in cursor:
+            yield dict(zip(COLUMNS, row))
+
+    def export_csv(self, path):
+        count = 0
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS)
+            writer.writeheader()
+            for row in self.rows():
+                writer.writerow(row)
+                count += 1
+        return count
+
+    def export_parquet(self, root):
+        """Writes a typed, year-partitioned Parquet dataset (see parquet_export.py)."""
+        from .parquet_export import write_dataset  # only needed for Parquet export (pyarrow)
+
+        return write_dataset(self.rows(), root)
+
+    def import_csv(self, path, route=None):
+        """Loads an existing annotations CSV (e.g. from before the store existed) as DONE jobs."""
+        by_file = {}
+        with open(path, "r", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                row = {COLUMN_ALIASES.get(column, column): value for column, value in row.items()}
+                if row.get("source_file"):
+                    by_file.setdefault(row["source_file"], []).append(
+                        {field: (row.get(field) or None) for field in FIELDS}
+                    )
+        for source_file, records in by_file.items():
+            self.save(source_file, records, route)
+        self.flush()
+        return len(by_file)
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or export the annotation store.")
+    parser.add_argument("--store", default=DEFAULT_STORE)
+    parser.add_argument("--import-csv", nargs="*", default=[], help="legacy annotation CSVs to load")
+    parser.add_argument("--csv", help="export all records to this CSV")
+    parser.add_argument("--parquet", help="export all records to this Parquet dataset folder")
+    args = parser.parse_args()
+
+    store = AnnotationStore(args.store)
+    for path in args.import_csv:
+        print(f"📥 Imported {store.import_csv(path)} files from {path}")
+    if args.csv:
+        print(f"📤 Exported {store.export_csv(args.csv)} records to {args.csv}")
+    if args.parquet:
+        print(f"📤 Exported {store.export_parquet(args.parquet)} records to {args.parquet}")
+    print(f"📊 Jobs: {store.counts()}")
+    store.close()
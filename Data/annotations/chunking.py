@@ -0,0 +1,129 @@
+import re
+
+from .engine import estimate_tokens
+
+# Budget for the document text in one request; with the prompt prefix this keeps each
+# call well inside llama3.2's default context window.
+MAX_CHUNK_TOKENS = 1500
+HEADER_LINES = 3  # "2024 ABU DHABI GRAND PRIX / dates / From ... Document N", repeated on every chunk
+
+# --- BOUNDARIES ---
+# raw_text files join pages with a plain newline, so page ends are recognised by the lone
+# page number printed at the foot of each page; sections by all-caps or numbered headings.
+PAGE_END = re.compile(r"^\s*\d{1,2}\s*$")
+SECTION_START = re.compile(r"^\s*(?:[A-Z][A-Z0-9 &'’:/()-]{6,}|\d+(?:\.\d+)*\)?\s+[A-Z].*)\s*$")
+
+LIST_FIELDS = ("drivers_involved", "teams_involved")
+
+
+def split_blocks(text):
+    """Splits text into page/section blocks, keeping every line (joined back they give `text`)."""
+    blocks, current = [], []
+    for line in text.splitlines(keepends=True):
+        if SECTION_START.match(line) and current:
+            blocks.append("".join(current))
+            current = []
+        current.append(line)
+        if PAGE_END.match(line):
+            blocks.append("".join(current))
+            current = []
+    if current:
+        blocks.append("".join(current))
+    return blocks
+
+
+def _split_oversized(block, max_tokens):
+    """Falls back to line, then character, boundaries for a block that is too big on its own."""
+    pieces, current = [], ""
+    max_chars = max_tokens * 4
+    for line in block.splitlines(keepends=True):
+        while len(line) > max_chars:
+            pieces.append(line[:max_chars])
+            line = line[max_chars:]
+        if current and estimate_tokens(current + line) > max_tokens:
+            pieces.append(current)
+            current = ""
+        current += line
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_text(text, max_tokens=MAX_CHUNK_TOKENS):
+    """Splits a long document into chunks of at most ~`max_tokens`, on page/section boundaries.
+
+    Short documents come back as a single chunk. Later chunks are prefixed with the
+    document header so year and Grand Prix can still be read from each of them.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    header = "".join(text.splitlines(keepends=True)[:HEADER_LINES])
+    budget = max(1, max_tokens - estimate_tokens(header))
+    chunks, current = [], ""
+    for block in split_blocks(text):
+        pieces = [block] if estimate_tokens(block) <= budget else _split_oversized(block, budget)
+        for piece in pieces:
+            if current and estimate_tokens(current + piece) > budget:
+                chunks.append(current)
+                current = ""
+            current += piece
+    if current:
+        chunks.append(current)
+    return [chunk if i == 0 else header + "...\n" + chunk for i, chunk in enumerate(chunks)]
+
+
+# --- MERGE ---
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [v for v in value if v]
+    return [v.strip() for v in str(value).split(",") if v.strip()]
+
+
+def _norm(value):
+    return re.sub(r"[^a-z0-9]+", " ", str(value or "").lower()).strip()
+
+
+def _incident_key(record):
+    """Records describing the same incident agree on drivers, penalty and lap."""
+    drivers = tuple(sorted(_norm(d) for d in _as_list(record.get("drivers_involved"))))
+    return drivers, _norm(record.get("penalty_given")), _norm(record.get("lap_number"))
+
+
+def merge_records(chunk_results):
+    """Merges per-chunk record lists into per-incident records.
+
+    Records with the same incident key are folded together: empty fields are filled
+    from later chunks and driver/team lists are unioned. Order of first appearance is kept.
+    """
+    merged = {}
+    for records in chunk_results:
+        for record in records or []:
+            if not isinstance(record, dict):
+                continue
+            key = _incident_key(record)
+            if key not in merged:
+                merged[key] = dict(record)
+                continue
+            target = merged[key]
+            for field, value in record.items():
+                if field in LIST_FIELDS:
+                    union = _as_list(target.get(field))
+                    union += [v for v in _as_list(value) if v not in union]
+                    target[field] = union or None
+                elif target.get(field) in (None, "") and value not in (None, ""):
+                    target[field] = value
+    return list(merged.values())
+
+
+if __name__ == "__main__":
+    import sys
+
+    for path in sys.argv[1:]:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        chunks = chunk_text(text)
+        print(f"--- {path}: ~{estimate_tokens(text)} tokens -> {len(chunks)} chunk(s) "
+              f"of ~{', '.join(str(estimate_tokens(c)) for c in chunks)} tokens")
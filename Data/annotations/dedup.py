@@ -0,0 +1,243 @@
+import os
+import re
+import time
+import zlib
+import sqlite3
+
+import numpy as np
+
+from .preclassify import PENALTY_TEXT
+
+DEFAULT_INDEX = "dedup.sqlite"
+DUPLICATE = "duplicate"  # store route for files that reused a representative's records
+
+# --- MINHASH PARAMETERS ---
+SHINGLE_WORDS = 3   # word 3-grams: re-timed classifications still overlap, shared boilerplate alone does not
+NUM_PERM = 128
+BANDS = 32          # 32 bands x 4 rows: pairs above ~0.6 Jaccard almost always share a bucket
+THRESHOLD = 0.7     # estimated Jaccard needed to call two documents near-duplicates
+SEED = 1
+
+_rng = np.random.default_rng(SEED)
+_A = _rng.integers(1, 2**63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2**63, NUM_PERM, dtype=np.uint64)
+_WORD_HASH = {}
+_EMPTY = np.full(NUM_PERM, np.iinfo(np.uint32).max, dtype=np.uint32)
+
+# Lines that make two similar documents mean different things: a penalty, a car or a
+# driver. If the documents differ on one of these, the near-duplicate is annotated itself.
+SENSITIVE_LINE = re.compile(PENALTY_TEXT.pattern + r"|\bcar\s*\d|\bdriver\b|\bno\s*/\s*driver", re.I)
+# Preferred representative when nothing in a cluster is annotated yet: the latest version.
+PROVISIONAL = re.compile(r"provisional", re.I)
+REVISION = re.compile(r"final|official|correct|revis|amend|updated|\bv\d+\b", re.I)
+VERSION_WORDS = re.compile(r"\b(?:provisional|final|official|corrected|revised|amended|updated|v\d+)\b|[^a-z0-9]+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    source_file TEXT PRIMARY KEY,
+    size        INTEGER NOT NULL,
+    mtime       REAL NOT NULL,
+    signature   BLOB NOT NULL
+);
+"""
+
+
+# --- SIGNATURES ---
+def shingle_hashes(text, k=SHINGLE_WORDS):
+    """Distinct 64-bit hashes of the word k-grams of `text` (lowercased, punctuation dropped)."""
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    for word in words:
+        if word not in _WORD_HASH:
+            _WORD_HASH[word] = zlib.crc32(word.encode())
+    h = np.fromiter((_WORD_HASH[w] for w in words), dtype=np.uint64, count=len(words))
+    k = min(k, len(h))
+    shingles = np.zeros(len(h) - k + 1, dtype=np.uint64)
+    for i in range(k):  # polynomial rolling combination, wrapping mod 2**64
+        shingles = shingles * np.uint64(1000003) + h[i:len(h) - k + 1 + i]
+    return np.unique(shingles)
+
+
+def minhash(hashes, chunk_rows=8192):
+    """NUM_PERM-value MinHash signature (multiply-shift hash family, top 32 bits kept)."""
+    if len(hashes) == 0:
+        return _EMPTY.copy()
+    signature = np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    for start in range(0, len(hashes), chunk_rows):
+        block = hashes[start:start + chunk_rows, None] * _A + _B
+        np.minimum(signature, block.min(axis=0), out=signature)
+    return (signature >> np.uint64(32)).astype(np.uint32)
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of the two documents' shingle sets."""
+    return float(np.mean(sig_a == sig_b))
+
+
+def event_of(filename):
+    """'2024 Abu Dhabi Grand Prix - Final Race Classification.txt' -> '2024 abu dhabi grand prix'."""
+    title = os.path.splitext(os.path.basename(filename))[0].replace("_", " ").lower()
+    return title.split(" - ")[0].strip()
+
+
+def base_title(filename):
+    """Title without event and version markers: Provisional/Final/V2/(Corrected) issues of one document agree."""
+    stem = re.sub(r"_\d+$", "", os.path.splitext(os.path.basename(filename))[0])  # "..._0" download copies
+    title = stem.replace("_", " ").lower()
+    subject = title.split(" - ", 1)[1] if " - " in title else title
+    return " ".join(VERSION_WORDS.sub(" ", subject).split())
+
+
+def diverges(text_a, text_b):
+    """True when the lines the two documents do not share carry penalty/car/driver details."""
+    lines_a = {line.strip() for line in text_a.splitlines() if line.strip()}
+    lines_b = {line.strip() for line in text_b.splitlines() if line.strip()}
+    return any(SENSITIVE_LINE.search(line) for line in lines_a ^ lines_b)
+
+
+# --- INDEX ---
+class DedupIndex:
+    """MinHash signatures of the raw_text documents, cached in SQLite, plus an LSH lookup.
+
+    Signatures are only computed for files that are new or changed since the last run
+    (size/mtime), so keeping the index current as documents arrive costs one MinHash per
+    new file. Candidates come from LSH buckets and are confirmed against `threshold`.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX, threshold=THRESHOLD, bands=BANDS, same_event=True):
+        self.path = path
+        self.threshold = threshold
+        self.bands = bands
+        self.same_event = same_event  # only compare documents of the same year and GP
+        self._signatures = {}
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(SCHEMA)
+
+    def update(self, folder):
+        """Loads signatures for every .txt in `folder`, computing the missing ones; returns that count."""
+        cached = {
+            row[0]: row[1:] for row in self._conn.execute("SELECT source_file, size, mtime, signature FROM signatures")
+        }
+        fresh = []
+        for filename in sorted(os.listdir(folder)):
+            if not filename.endswith(".txt"):
+                continue
+            stat = os.stat(os.path.join(folder, filename))
+            entry = cached.get(filename)
+            if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime:
+                self._signatures[filename] = np.frombuffer(entry[2], dtype=np.uint32)
+                continue
+            with open(os.path.join(folder, filename), "r", encoding="utf-8") as f:
+                signature = minhash(shingle_hashes(f.read()))
+            self._signatures[filename] = signature
+            fresh.append((filename, stat.st_size, stat.st_mtime, signature.tobytes()))
+        with self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO signatures VALUES (?, ?, ?, ?)", fresh)
+        return len(fresh)
+
+    def candidate_pairs(self):
+        """Index pairs sharing at least one LSH band bucket (same event unless disabled)."""
+        names = [name for name, sig in self._signatures.items() if not np.array_equal(sig, _EMPTY)]
+        if len(names) < 2:
+            return names, set()
+        matrix = np.stack([self._signatures[name] for name in names])
+        events = [event_of(name) if self.same_event else "" for name in names]
+        rows = NUM_PERM // self.bands
+        pairs = set()
+        for band in range(self.bands):
+            keys = np.ascontiguousarray(matrix[:, band * rows:(band + 1) * rows]).view(f"V{rows * 4}").ravel()
+            _, bucket_of = np.unique(keys, return_inverse=True)
+            order = np.argsort(bucket_of, kind="stable")
+            splits = np.flatnonzero(np.diff(bucket_of[order])) + 1
+            for bucket in np.split(order, splits):
+                for i, a in enumerate(bucket):
+                    for b in bucket[i + 1:]:
+                        if events[a] == events[b]:
+                            pairs.add((min(a, b), max(a, b)))
+        return names, pairs
+
+    def clusters(self):
+        """Groups of near-duplicate filenames (size >= 2), via union-find over confirmed pairs."""
+        names, pairs = self.candidate_pairs()
+        parent = list(range(len(names)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for a, b in pairs:
+            if similarity(self._signatures[names[a]], self._signatures[names[b]]) >= self.threshold:
+                parent[find(a)] = find(b)
+        groups = {}
+        for i, name in enumerate(names):
+            groups.setdefault(find(i), []).append(name)
+        return [sorted(group) for group in groups.values() if len(group) > 1]
+
+    def duplicates_of(self, folder, pending, annotated=()):
+        """Maps each pending file that can reuse another document's records to that document.
+
+        Only issues of the same document (same title up to Provisional/Final/V2/Corrected)
+        share records; near-identical decisions about different cars or teams do not. The
+        representative is an issue already annotated if there is one, otherwise the latest
+        version. A member whose differing lines mention a penalty, car or driver is left
+        out and annotated on its own.
+        """
+        self.update(folder)
+        pending, annotated = set(pending), set(annotated)
+        issues = {}
+        for cluster in self.clusters():
+            for f in cluster:
+                issues.setdefault((cluster[0], base_title(f)), []).append(f)
+        mapping = {}
+        for cluster in issues.values():
+            candidates = [f for f in cluster if f in annotated] or [f for f in cluster if f in pending]
+            if not candidates:
+                continue
+            representative = max(candidates, key=lambda f: (
+                f in annotated,
+                not PROVISIONAL.search(f),
+                len(REVISION.findall(f)),
+                f,  # V3 after V2
+            ))
+            with open(os.path.join(folder, representative), "r", encoding="utf-8") as f:
+                representative_text = f.read()
+            for member in cluster:
+                if member == representative or member not in pending:
+                    continue
+                with open(os.path.join(folder, member), "r", encoding="utf-8") as f:
+                    if not diverges(representative_text, f.read()):
+                        mapping[member] = representative
+        return mapping
+
+    def close(self):
+        self._conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Find near-duplicate documents in raw_text/<year>/ folders.")
+    parser.add_argument("folders", nargs="+")
+    parser.add_argument("--index", default=DEFAULT_INDEX)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--show", type=int, default=5, help="clusters to print per folder")
+    args = parser.parse_args()
+
+    index = DedupIndex(args.index, threshold=args.threshold)
+    for folder in args.folders:
+        index._signatures = {}
+        start = time.perf_counter()
+        computed = index.update(folder)
+        clusters = index.clusters()
+        files = sorted(f for f in os.listdir(folder) if f.endswith(".txt"))
+        reusable = index.duplicates_of(folder, files)
+        elapsed = time.perf_counter() - start
+        print(f"🧬 {folder}: {len(files)} files ({computed} new signatures), {len(clusters)} clusters "
+              f"covering {sum(map(len, clusters))} files, {len(reusable)} could reuse a representative "
+              f"[{elapsed:.2f}s]")
+        for cluster in sorted(clusters, key=len, reverse=True)[:args.show]:
+            print(f"   {len(cluster)}x " + " | ".join(cluster[:3]) + (" | ..." if len(cluster) > 3 else ""))
+    index.close()
@@ -0,0 +1,155 @@
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from metrics import METRICS
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token), good enough for rate budgeting."""
+    return len(text) // 4 + 1
+
+
+def is_throttle_error(error):
+    """True for errors that mean 'slow down' rather than 'this input is bad': 429s and timeouts."""
+    if isinstance(error, TimeoutError):
+        return True
+    message = f"{type(error).__name__} {error}".lower()
+    return any(marker in message for marker in (
+        "429", "rate limit", "ratelimit", "resourceexhausted", "resource exhausted",
+        "quota", "timeout", "timed out", "too many requests",
+    ))
+
+
+# --- TOKEN-BUCKET LIMITER (requests/min and tokens/min) ---
+class RateLimiter:
+    """Token buckets for requests per minute and tokens per minute, shared by all workers.
+
+    `throttle()` is called when the backend pushes back (429 / timeout): every worker is
+    paused for an exponentially growing backoff and the effective rate is halved.
+    `recover()` on each success slowly restores it (AIMD), so the engine settles just
+    under whatever rate the backend actually sustains.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, base_backoff=2.0, max_backoff=60.0):
+        self.rpm = requests_per_minute
+        self.tpm = tokens_per_minute
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._lock = threading.Lock()
+        self._requests = float(requests_per_minute or 0)
+        self._tokens = float(tokens_per_minute or 0)
+        self._updated = time.monotonic()
+        self._factor = 1.0  # share of the nominal rate currently allowed
+        self._strikes = 0
+        self._paused_until = 0.0
+
+        self.throttled = 0
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm * self._factor / 60)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm * self._factor / 60)
+
+    def acquire(self, tokens=0):
+        """Blocks until one request costing `tokens` fits in both buckets."""
+        if self.tpm:
+            tokens = min(tokens, self.tpm)  # a single oversized request must still get through
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._paused_until - now
+                if wait <= 0:
+                    need_requests = 1 - self._requests if self.rpm else 0
+                    need_tokens = tokens - self._tokens if self.tpm else 0
+                    if need_requests <= 0 and need_tokens <= 0:
+                        if self.rpm:
+                            self._requests -= 1
+                        if self.tpm:
+                            self._tokens -= tokens
+                        return
+                    wait = max(
+                        need_requests * 60 / (self.rpm * self._factor) if need_requests > 0 else 0,
+                        need_tokens * 60 / (self.tpm * self._factor) if need_tokens > 0 else 0,
+                    )
+            time.sleep(wait)
+
+    def throttle(self):
+        """Backend pushed back: pause everyone and halve the allowed rate. Returns the pause."""
+        with self._lock:
+            self.throttled += 1
+            self._strikes += 1
+            self._factor = max(0.1, self._factor / 2)
+            pause = min(self.max_backoff, self.base_backoff * 2 ** (self._strikes - 1))
+            pause += random.uniform(0, pause / 4)
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            return pause
+
+    def recover(self):
+        with self._lock:
+            self._strikes = 0
+            self._factor = min(1.0, self._factor + 0.05)
+
+
+# --- CONCURRENT ENGINE ---
+def run_concurrently(items, work, on_result, max_in_flight=4, limiter=None, cost=None, max_attempts=5):
+    """Runs `work(item)` for every item with up to `max_in_flight` calls outstanding.
+
+    `cost(item)` gives the token estimate charged to the limiter. Throttle errors
+    (see `is_throttle_error`) trigger the limiter's backoff and a retry of that item;
+    any other error is final for that item. `on_result(item, result, error)` is
+    always called from the calling thread, so it can write to files safely.
+    Returns a summary dict with counts and wall time.
+    """
+    limiter = limiter or RateLimiter()
+    items = list(items)
+    done, failed = 0, 0
+    start = time.perf_counter()
+
+    def attempt(item):
+        for attempt_no in range(1, max_attempts + 1):
+            with METRICS.timer("limiter.wait"):
+                limiter.acquire(cost(item) if cost else 0)
+            try:
+                with METRICS.timer("request") as labels:
+                    result = work(item)
+                    labels["outcome"] = "ok"
+            except Exception as e:
+                if is_throttle_error(e) and attempt_no < max_attempts:
+                    pause = limiter.throttle()
+                    METRICS.inc("request.throttled")
+                    print(f"⏳ Backend throttled ({e}); backing off {pause:.1f}s")
+                    continue
+                METRICS.inc("request.errors", error=type(e).__name__)
+                raise
+            limiter.recover()
+            return result
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        futures = {pool.submit(attempt, item): item for item in items}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                result, error = future.result(), None
+            except Exception as e:
+                result, error = None, e
+            if error is None:
+                done += 1
+            else:
+                failed += 1
+            on_result(item, result, error)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "done": done,
+        "failed": failed,
+        "throttled": limiter.throttled,
+        "seconds": elapsed,
+        "per_minute": done * 60 / elapsed if elapsed else 0.0,
+    }
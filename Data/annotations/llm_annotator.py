@@ -0,0 +1,351 @@
+import os
+import json
+import time
+from .engine import RateLimiter, run_concurrently, estimate_tokens, is_throttle_error
+from .annotation_store import DONE, SKIPPED, FAILED
+from .preclassify import route, SKIP, DETERMINISTIC, LLM
+from .template_extractor import extract_templated
+from .prompts import PROMPT_VERSION, build_prompt, build_batch_prompt, split_batch_output, pack_batches
+from .chunking import MAX_CHUNK_TOKENS, chunk_text, merge_records
+from .output_parser import OutputError, ParseStats, extract_records
+from .dedup import DUPLICATE
+from metrics import METRICS
+
+# Cache namespace for answers to repair re-asks, keyed by the repair prompt itself
+REPAIR_VERSION = f"{PROMPT_VERSION}/repair"
+
+
+# --- ANNOTATION RUN, SHARED BY annotator.py AND annotatorGemini.py ---
+class LLMAnnotator:
+    """Annotates FIA documents with one LLM chain (see llm_backends.make_chain).
+
+    The backends differ only in the chain they stream from and their rate limits, so the
+    annotator scripts build a chain and hand it here; routing, batching, chunking, caching
+    and storage are the same for every model.
+    """
+
+    def __init__(self, chain, model_name):
+        self.chain = chain
+        self.model_name = model_name
+        self.parse_stats = ParseStats()
+
+    # --- Model calls, recorded for the cache ---
+    def _extract(self, prompt, cache=None, replay=None):
+        """`extract_records` for `prompt`; returns (records, raw output, {prompt: answer}).
+
+        Every answer streamed for the call (the prompt's and any repair re-asks) is returned
+        so it can be cached raw. With `replay` (a cached raw output), the prompt is answered
+        from it and repair re-asks from their cached answers, so re-parsing a cached output
+        with a changed parser costs no model call unless it needs a repair never seen before.
+        """
+        answers = {}
+
+        def stream(p):
+            answer = None
+            if replay is not None and p == prompt:
+                answer = replay
+            elif replay is not None and cache:
+                answer = cache.get(self.model_name, REPAIR_VERSION, p)
+            if answer is not None:
+                answers[p] = answer
+                yield answer
+                return
+            chunks = []
+            for chunk in self.chain.stream(p):
+                chunks.append(chunk)
+                yield chunk
+            answers[p] = "".join(chunks)
+
+        records, raw_output = extract_records(
+            stream, prompt, self.parse_stats, source="llm" if replay is None else "cache"
+        )
+        return records, raw_output, answers
+
+    def _cache_answers(self, cache, prompt_version, input_text, response, prompt, answers):
+        cache.put(self.model_name, prompt_version, input_text, response)
+        for repair_prompt, answer in answers.items():
+            if repair_prompt != prompt:
+                cache.put(self.model_name, REPAIR_VERSION, repair_prompt, answer)
+
+    # --- Annotate whole text (single-shot) with retries ---
+    def annotate_text(self, input_text, retries=3, delay=10, cache=None, filename=None, built=None):
+        """Invokes the LLM chain to extract data, with retries for robustness.
+
+        The answer is parsed while it streams, with or without a markdown fence; broken
+        objects are repaired locally or re-asked on their own (see output_parser.py), so the
+        chain only re-runs when nothing usable came back. With a `cache`, the raw output
+        stored for this exact input, model and prompt version is parsed again instead of
+        calling the model (first attempt only). `built` is the `build_prompt` result when the
+        caller already made it (e.g. to charge the rate limiter).
+        """
+        if built is None:
+            with METRICS.timer("prompt.build"):
+                built = build_prompt(input_text, filename)
+        prompt, kind, _ = built
+        prompt_version = f"{PROMPT_VERSION}/{kind}"
+        cached = cache.get(self.model_name, prompt_version, input_text) if cache else None
+        if cache:
+            METRICS.inc("llm.cache", result="miss" if cached is None else "hit")
+        for attempt in range(retries):
+            try:
+                replay, cached = cached, None
+                parsed, raw_output, answers = self._extract(prompt, cache, replay)
+                if cache and replay is None:
+                    self._cache_answers(cache, prompt_version, input_text, raw_output, prompt, answers)
+                return parsed
+
+            except OutputError as e:
+                self.parse_stats.discard(e.raw_output)
+                METRICS.inc("llm.retries", reason="invalid_json")
+                print(f"  ❌ No valid JSON on attempt {attempt + 1}/{retries}: {e}")
+                print("  ... Partial output received:\n", e.raw_output[:500])
+                continue  # a malformed answer is not a reason to wait
+            except Exception as e:
+                if is_throttle_error(e):
+                    raise  # 429 / timeout: the engine backs off and retries the whole file
+                METRICS.inc("llm.retries", reason=type(e).__name__)
+                print(f"  ❌ Unexpected error on attempt {attempt + 1}/{retries}: {e}")
+
+            time.sleep(delay)
+
+        print("❌ All retries failed for this file.")
+        return []
+
+    # --- Annotate several short documents in one request ---
+    def annotate_batch(self, documents, cache=None, built=None):
+        """Annotates [(filename, text), ...] with a single LLM call; returns {filename: annotations}.
+
+        Documents are numbered in the prompt and every returned object carries its
+        document_id, so results are split back per file. Any document whose result is
+        missing or unparseable is re-run on its own with `annotate_text`. Each document's
+        cache entry holds the whole raw batch output and its document_id in it. `built` is the
+        `build_batch_prompt` result for all of `documents`, when the caller already made it.
+        """
+        prompt_version = f"{PROMPT_VERSION}/batch"
+        results, pending = {}, []
+        for filename, text in documents:
+            cached = cache.get(self.model_name, prompt_version, text) if cache else None
+            if cache:
+                METRICS.inc("llm.cache", result="miss" if cached is None else "hit")
+            records = self._replay_batch_entry(cached, cache) if cached is not None else None
+            if records is not None:
+                results[filename] = records
+            else:
+                pending.append((filename, text))
+
+        if len(pending) > 1:
+            if built is None or len(pending) < len(documents):  # cache hits shrink the batch
+                with METRICS.timer("prompt.build", kind="batch"):
+                    built = build_batch_prompt([(i, text) for i, (_, text) in enumerate(pending, 1)])
+            prompt, _ = built
+            try:
+                parsed, raw_output, answers = self._extract(prompt)
+                grouped = split_batch_output(parsed, range(1, len(pending) + 1))
+            except OutputError as e:
+                self.parse_stats.discard(e.raw_output)
+                print(f"JSON error in batch of {len(pending)}: {e}. Falling back to one request per file")
+                grouped = {}
+            for doc_id, (filename, text) in enumerate(pending, 1):
+                if doc_id in grouped:
+                    results[filename] = grouped[doc_id]
+                    if cache:
+                        entry = json.dumps({"document_id": doc_id, "output": raw_output}, ensure_ascii=False)
+                        self._cache_answers(cache, prompt_version, text, entry, prompt, answers)
+
+        for filename, text in pending:
+            if filename not in results:
+                if len(pending) > 1:
+                    print(f"🔁 {filename} missing from batch result; annotating it on its own")
+                results[filename] = self.annotate_text(text, cache=cache, filename=filename)
+        return results
+
+    def _replay_batch_entry(self, cached, cache):
+        """One document's records parsed again from a cached batch output; None if unusable."""
+        entry = json.loads(cached)
+        if not isinstance(entry, dict):  # cached before batch entries kept the raw output
+            entry = {"document_id": None, "output": cached}
+        try:
+            records, _, _ = self._extract("", cache, replay=entry["output"])
+        except OutputError as e:
+            self.parse_stats.discard(e.raw_output)
+            return None
+        if entry["document_id"] is None:
+            return records
+        return split_batch_output(records, [entry["document_id"]]).get(entry["document_id"], [])
+
+    # --- MAIN PROCESSOR ---
+    def process_folder(self, input_folder, store, max_in_flight=2, requests_per_minute=None, tokens_per_minute=None,
+                       cache=None, batch_tokens=None, short_tokens=400, max_chunk_tokens=MAX_CHUNK_TOKENS, dedup=None,
+                       files=None):
+        """Processes all .txt files in a folder, extracting annotations into `store` (an AnnotationStore).
+
+        Up to `max_in_flight` files are annotated at once; the request and token rates are
+        capped by a token-bucket limiter that backs off automatically on 429s and timeouts.
+        With `batch_tokens`, short documents share requests (see `annotate_batch`); documents
+        over `max_chunk_tokens` are extracted chunk by chunk in parallel and merged. With
+        `dedup` (a DedupIndex), near-duplicate documents reuse one representative's records.
+        Finished files are looked up in the store's job table, so a rerun resumes; `files`
+        limits the run to those filenames (e.g. the ones the pipeline saw change).
+        """
+        files_to_process = [
+            f for f in (os.listdir(input_folder) if files is None else files)
+            if f.endswith(".txt") and not store.is_finished(f)
+        ]
+        if not files_to_process:
+            print("🎉 No new files to process. All done!")
+            return
+        print(f"Found {len(files_to_process)} new files to process.")
+
+        # Cheap pre-classification: documents that cannot hold a penalty never reach the LLM,
+        # and templated stewards' decisions are parsed directly (LLM only if a section is missing).
+        llm_files, skipped, parsed, text_tokens = [], 0, 0, {}
+        for filename in files_to_process:
+            with open(os.path.join(input_folder, filename), "r", encoding="utf-8") as f:
+                raw_text = f.read()
+            doc_route = route(filename, raw_text)
+            if doc_route == SKIP:
+                store.mark(filename, SKIPPED, route=SKIP)
+                skipped += 1
+                continue
+            if doc_route == DETERMINISTIC:
+                annotations = extract_templated(raw_text, filename)
+                if annotations:
+                    store.save(filename, annotations, route=DETERMINISTIC)
+                    parsed += 1
+                    continue
+            llm_files.append(filename)
+            text_tokens[filename] = estimate_tokens(raw_text)
+        files_to_process = llm_files
+        print(f"⏭️ Pre-classifier: {skipped} skipped, {parsed} parsed from template, "
+              f"{len(files_to_process)} for the LLM")
+
+        # Near-duplicates (Provisional/Final issues, V2/V3 re-issues) reuse the records of one
+        # representative instead of costing their own call (see dedup.py).
+        followers = {}
+        if dedup is not None:
+            duplicates = dedup.duplicates_of(input_folder, files_to_process, store.finished_files((DONE,)))
+            for member, representative in duplicates.items():
+                if representative in text_tokens:
+                    followers.setdefault(representative, []).append(member)
+                else:  # annotated on an earlier run
+                    store.save(member, store.records(representative), route=DUPLICATE)
+            files_to_process = [f for f in files_to_process if f not in duplicates]
+            waiting = sum(map(len, followers.values()))
+            print(f"🧬 Near-duplicates: {len(duplicates) - waiting} copied from earlier annotations, "
+                  f"{waiting} follow a representative")
+
+        # Documents over `max_chunk_tokens` are split on page/section boundaries and each chunk
+        # becomes its own request; with `batch_tokens`, documents of at most `short_tokens` are
+        # packed into shared requests. A request is a tuple of (filename, chunk index or None).
+        chunks = {}
+        for filename in files_to_process:
+            if max_chunk_tokens and text_tokens[filename] > max_chunk_tokens:
+                with open(os.path.join(input_folder, filename), "r", encoding="utf-8") as f:
+                    chunks[filename] = chunk_text(f.read(), max_chunk_tokens)
+        short = [(f, text_tokens[f]) for f in files_to_process if batch_tokens and text_tokens[f] <= short_tokens]
+        batched = {f for f, _ in short}
+        requests = [((f, None),) for f in files_to_process if f not in batched and f not in chunks]
+        requests += [tuple((f, None) for f in batch) for batch in pack_batches(short, batch_tokens or 0)]
+        requests += [((f, i),) for f, parts in chunks.items() for i in range(len(parts))]
+        print(f"📦 {len(files_to_process)} files in {len(requests)} requests "
+              f"({len(batched)} short files batched, {len(chunks)} long files chunked)")
+
+        limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        progress = {"count": 0}
+        chunk_results = {}
+
+        def read_texts(request):
+            texts = []
+            for filename, part in request:
+                if part is not None:
+                    texts.append((filename, chunks[filename][part]))
+                    continue
+                with open(os.path.join(input_folder, filename), "r", encoding="utf-8") as f:
+                    texts.append((filename, f.read()))
+            return texts
+
+        # Each request's prompt is built once: its token estimate is charged to the limiter
+        # and the same prompt is sent. It is kept until the request is done (throttled
+        # requests are retried); only the estimate stays for the summary.
+        prepared = {}  # request -> (texts, build_prompt / build_batch_prompt result)
+        prompt_tokens = {}
+
+        def prepare(request):
+            if request not in prepared:
+                texts = read_texts(request)
+                if len(texts) == 1:
+                    with METRICS.timer("prompt.build"):
+                        built = build_prompt(texts[0][1], request[0][0])
+                else:
+                    with METRICS.timer("prompt.build", kind="batch"):
+                        built = build_batch_prompt([(i, text) for i, (_, text) in enumerate(texts, 1)])
+                prepared[request] = (texts, built)
+                prompt_tokens[request] = built[-1]
+            return prepared[request]
+
+        def token_cost(request):
+            return prepare(request)[1][-1]
+
+        def annotate_request(request):
+            texts, built = prepare(request)
+            if len(request) == 1:
+                return {request[0]: self.annotate_text(texts[0][1], cache=cache, filename=request[0][0], built=built)}
+            results = self.annotate_batch(texts, cache=cache, built=built)
+            return {(filename, None): results.get(filename) for filename, _ in request}
+
+        def save_file(filename, annotations, error):
+            progress["count"] += 1
+            print(f"\n🔎 File {progress['count']}/{len(files_to_process)}: {filename}")
+            if error is not None:
+                store.mark(filename, FAILED, route=LLM, error=str(error))
+                for member in followers.get(filename, ()):
+                    store.mark(member, FAILED, route=DUPLICATE, error=f"representative {filename} failed")
+                print(f"❌ Failed on {filename}: {error}")
+                return
+            with METRICS.timer("store.write"):
+                store.save(filename, annotations, route=LLM)
+                for member in followers.get(filename, ()):
+                    store.save(member, annotations, route=DUPLICATE)
+            if annotations:
+                print(f"✅ Saved {len(annotations)} annotation(s) for {filename}")
+            else:
+                print(f"⚠️ No annotations saved for {filename}")
+
+        def handle_result(request, results, error):
+            prepared.pop(request, None)
+            for filename, part in request:
+                annotations = (results or {}).get((filename, part))
+                if part is None:
+                    save_file(filename, annotations, error)
+                    continue
+                # Chunks finish in any order; the file is merged and saved once all are back.
+                parts = chunk_results.setdefault(filename, {})
+                parts[part] = (annotations, error)
+                if len(parts) == len(chunks[filename]):
+                    errors = [e for _, e in parts.values() if e is not None]
+                    merged = merge_records(parts[i][0] for i in sorted(parts))
+                    if errors and merged:
+                        print(f"⚠️ {len(errors)}/{len(parts)} chunks of {filename} failed: {errors[0]}")
+                    save_file(filename, merged, errors[0] if errors and not merged else None)
+
+        summary = run_concurrently(
+            requests, annotate_request, handle_result,
+            max_in_flight=max_in_flight, limiter=limiter, cost=token_cost,
+        )
+
+        store.flush()
+        print(
+            f"\n🎉 All files processed! {summary['done']} requests done, {summary['failed']} failed in "
+            f"{summary['seconds']:.0f}s ({summary['per_minute']:.1f} requests/min, throttled {summary['throttled']}x)"
+        )
+        total_tokens = sum(prompt_tokens.values())
+        print(f"📝 ~{total_tokens} prompt tokens ({total_tokens // max(1, len(prompt_tokens))} per request)")
+        parsing = self.parse_stats.summary()
+        print(f"🧩 Output parsing: {parsing['responses']} responses, {parsing['repaired']} objects repaired locally, "
+              f"{parsing['reasked']} re-asked, {parsing['full_retries']} full retries ({parsing['retry_rate']:.1%}), "
+              f"~{parsing['wasted_tokens']} wasted tokens")
+        if cache:
+            stats = cache.stats()
+            print(f"💾 LLM cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate), "
+                  f"{stats['entries']} entries")
+        print(f"🗄️ Annotation store: {store.counts()}")
@@ -0,0 +1,63 @@
+import os
+
+from langchain_core.output_parsers import StrOutputParser
+
+# --- BACKENDS ---
+# The annotators only need `chain.stream(prompt)` yielding text, so any chat/completion
+# model LangChain wraps will do. Each backend's package is imported only when it is
+# picked, so the Ollama setup does not need the Gemini or OpenAI client installed.
+DEFAULT_MODELS = {
+    "ollama": "llama3.2:latest",
+    "gemini": "gemini-2.0-flash",
+    "openai": "gpt-4o-mini",
+}
+# Where each backend finds its key; keys are never written in source.
+API_KEY_ENV = {"gemini": "GOOGLE_API_KEY", "openai": "OPENAI_API_KEY"}
+
+
+def backend_from_env(default="ollama"):
+    """(backend, model, base_url) from LLM_BACKEND / LLM_MODEL / LLM_BASE_URL, falling back to `default`."""
+    backend = os.environ.get("LLM_BACKEND", default).lower()
+    if backend not in DEFAULT_MODELS:
+        raise ValueError(f"Unknown LLM_BACKEND {backend!r}; expected one of {sorted(DEFAULT_MODELS)}")
+    return backend, os.environ.get("LLM_MODEL") or DEFAULT_MODELS[backend], os.environ.get("LLM_BASE_URL") or None
+
+
+def make_llm(backend, model=None, base_url=None, temperature=None):
+    """The LangChain model object for `backend`; `base_url` points it at another server (e.g. the stand-in)."""
+    model = model or DEFAULT_MODELS[backend]
+    options = {} if temperature is None else {"temperature": temperature}
+
+    if backend == "ollama":
+        from langchain_ollama import OllamaLLM
+
+        # Without base_url the client follows OLLAMA_HOST (default http://localhost:11434).
+        return OllamaLLM(model=model, base_url=base_url, **options)
+
+    api_key = os.environ.get(API_KEY_ENV[backend])
+
+    if backend == "gemini":
+        # Google's API only: there is no Gemini-compatible local server to point it at.
+        if base_url:
+            raise ValueError(f"gemini does not take a base_url (got {base_url!r}); use LLM_BACKEND=openai for a local server")
+        if not api_key:
+            raise RuntimeError(f"gemini needs an API key: set {API_KEY_ENV[backend]}")
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        return ChatGoogleGenerativeAI(model=model, google_api_key=api_key, **options)
+
+    if backend == "openai":
+        if not api_key and not base_url:
+            raise RuntimeError(f"openai needs an API key: set {API_KEY_ENV[backend]} (or LLM_BASE_URL for a local server)")
+        from langchain_openai import ChatOpenAI
+
+        # A local OpenAI-compatible server (mock_llm_server.py, vLLM, llama.cpp) ignores the key.
+        return ChatOpenAI(model=model, base_url=base_url, api_key=api_key or "local", **options)
+
+    raise ValueError(f"Unknown LLM backend {backend!r}")
+
+
+def make_chain(backend, model=None, base_url=None, temperature=None):
+    """Returns (chain, model name): `chain.stream(prompt)` yields the answer as plain text chunks."""
+    model = model or DEFAULT_MODELS[backend]
+    return make_llm(backend, model, base_url, temperature) | StrOutputParser(), model
@@ -0,0 +1,104 @@
+import time
+import sqlite3
+import hashlib
+import threading
+
+DEFAULT_CACHE = "llm_cache.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key         TEXT PRIMARY KEY,
+    model       TEXT NOT NULL,
+    prompt_ver  TEXT NOT NULL,
+    response    TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    created_at  REAL NOT NULL,
+    used_at     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_used_at ON responses(used_at);
+"""
+
+
+def cache_key(model, prompt_version, input_text):
+    blob = "\x1f".join([model, prompt_version, input_text])
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+# --- RESPONSE CACHE ---
+class ResponseCache:
+    """Disk-backed store of raw LLM outputs keyed by (model, prompt version, input text).
+
+    Only outputs that parsed successfully are stored, so re-running the parsing and
+    normalization steps replays them instead of calling the model again. Bump the
+    prompt version whenever the prompt changes to stop serving stale outputs. Answers
+    to repair re-asks are kept the same way, with the repair prompt as the input text.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE, max_entries=None, max_age_days=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    def get(self, model, prompt_version, input_text):
+        key = cache_key(model, prompt_version, input_text)
+        with self._lock:
+            row = self._conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            expired = (
+                row is not None
+                and self.max_age_days is not None
+                and row[1] < time.time() - self.max_age_days * 86400
+            )
+            if row is None or expired:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self._conn:
+                self._conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def put(self, model, prompt_version, input_text, response):
+        key = cache_key(model, prompt_version, input_text)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, prompt_version, response, len(response), now, now),
+            )
+
+    def evict(self):
+        """Drops entries past `max_age_days`, then least-recently-used ones beyond `max_entries`."""
+        removed = 0
+        with self._lock, self._conn:
+            if self.max_age_days is not None:
+                cutoff = time.time() - self.max_age_days * 86400
+                removed += self._conn.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,)).rowcount
+            if self.max_entries is not None:
+                removed += self._conn.execute(
+                    """
+                    DELETE FROM responses WHERE key IN (
+                        SELECT key FROM responses ORDER BY used_at DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (self.max_entries,),
+                ).rowcount
+        return removed
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,385 @@
+import os
+import re
+import ast
+import csv
+import json
+import time
+import random
+import hashlib
+import threading
+from collections import Counter, deque
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from .annotation_store import COLUMN_ALIASES
+from .template_extractor import FIELDS
+
+# Canned reply: one stewards' decision in the 17-field schema the annotators expect.
+CANNED_RESPONSE = json.dumps([{
+    "type_of_document": "Stewards decision",
+    "year": 2024,
+    "grand_prix": "Abu Dhabi Grand Prix",
+    "description": "Mock incident used for offline benchmarking.",
+    "session_type": "Race",
+    "track": "Yas Marina Circuit",
+    "lap_number": 1,
+    "turn_number": "1",
+    "safety_car_or_vsc_involved": None,
+    "penalty_given": "5 second time penalty",
+    "type_of_incident": "Causing a collision",
+    "was_contact_made": "Yes",
+    "immediate_advantage_gained": None,
+    "drivers_involved": ["Driver A", "Driver B"],
+    "teams_involved": ["Team A", "Team B"],
+    "rule_violated": "Article 33.4 of the FIA F1 Sporting Regulations",
+    "decision_notes": "Canned response from mock_llm_server.py",
+}], indent=2)
+
+LIST_FIELDS = ("drivers_involved", "teams_involved")
+MALFORMATIONS = ("trailing_comma", "unquoted_key", "truncated", "prose")
+CHARS_PER_TOKEN = 4
+
+
+# --- RECORDED ANSWERS ---
+class ReplayBook:
+    """Answers prompts with the records already extracted for that document in anottated/*.csv.
+
+    The document is recognised from the text in the prompt: an exact match on the whole
+    text first, otherwise (a chunk of a long document) by a vote over its longer lines.
+    Documents the CSVs hold no records for are answered with "[]".
+    """
+
+    def __init__(self, csv_paths, raw_text_dir):
+        self.records = {}
+        for path in csv_paths:
+            with open(path, "r", encoding="utf-8-sig") as f:
+                for row in csv.DictReader(f):
+                    source_file = (row.get("source_file") or "").strip()
+                    if source_file.endswith(".txt"):  # skips rows shifted by stray commas
+                        self.records.setdefault(source_file, []).append(self._record(row))
+        self._by_text, self._by_line = {}, {}
+        for folder, _, files in os.walk(raw_text_dir):
+            for filename in files:
+                if filename in self.records:
+                    with open(os.path.join(folder, filename), "r", encoding="utf-8") as f:
+                        text = f.read()
+                    self._by_text[self._digest(text)] = filename
+                    for line in self._long_lines(text):
+                        self._by_line.setdefault(line, set()).add(filename)
+
+    @staticmethod
+    def _record(row):
+        row = {COLUMN_ALIASES.get(key, key): value for key, value in row.items()}
+        record = {}
+        for field in FIELDS:
+            value = (row.get(field) or "").strip() or None
+            if value and field in LIST_FIELDS and value.startswith("["):
+                try:
+                    value = ast.literal_eval(value)
+                except (ValueError, SyntaxError):
+                    pass
+            record[field] = value
+        return record
+
+    @staticmethod
+    def _digest(text):
+        return hashlib.sha1(text.strip().encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _long_lines(text):
+        return {line.strip() for line in text.splitlines() if len(line.strip()) >= 40}
+
+    def source_of(self, text):
+        filename = self._by_text.get(self._digest(text))
+        if filename:
+            return filename
+        votes = Counter(f for line in self._long_lines(text) for f in self._by_line.get(line, ()))
+        return votes.most_common(1)[0][0] if votes else None
+
+    def answer(self, prompt):
+        """The replayed JSON answer for a single-document or batched prompt, or None if not recognised."""
+        if "\nDocuments:\n" in prompt:  # prompts.build_batch_prompt
+            body = prompt.split("\nDocuments:\n", 1)[1]
+            parts = re.split(r"^=== DOCUMENT (\d+) ===\n", body, flags=re.M)[1:]
+            records, known = [], False
+            for doc_id, text in zip(parts[::2], parts[1::2]):
+                source_file = self.source_of(text)
+                known = known or source_file is not None
+                records += [dict(r, document_id=int(doc_id)) for r in self.records.get(source_file, [])]
+            return json.dumps(records, indent=2, ensure_ascii=False) if known else None
+        if "Incident text:\n" in prompt:  # prompts.build_prompt
+            source_file = self.source_of(prompt.rsplit("Incident text:\n", 1)[1])
+            if source_file is not None:
+                return json.dumps(self.records[source_file], indent=2, ensure_ascii=False)
+        return None
+
+
+def malform(text, kind):
+    """Breaks a JSON answer the way real models do.
+
+    Returns (broken text, broken object, original object); the objects are None when
+    the JSON itself is intact (prose around it) or there is no object to break.
+    """
+    if kind == "prose":
+        return f"Sure! Here is the extracted data:\n```json\n{text}\n```\nLet me know if you need more.", None, None
+    start = text.find("{")
+    end = text.find("\n  }", start)
+    if start < 0 or end < 0:
+        return text, None, None
+    end += len("\n  }")
+    obj = text[start:end]
+    if kind == "trailing_comma":
+        broken = obj[:-len("\n  }")] + ",\n  }"
+    elif kind == "unquoted_key":
+        broken = re.sub(r'"(\w+)":', r"\1:", obj, count=3)
+    else:  # truncated: the answer stops mid-object, as when max tokens run out
+        return text[:start + len(obj) // 2], obj[:len(obj) // 2], obj
+    return text[:start] + broken + text[end:], broken, obj
+
+
+# --- MOCK OLLAMA / OPENAI ENDPOINTS ---
+# Answers like a local Ollama (POST /api/generate, /api/chat) or an OpenAI-compatible
+# server (POST /v1/chat/completions), streamed or not. Point the annotator at it with
+# OLLAMA_HOST=http://127.0.0.1:<port> or LLM_BACKEND=openai LLM_BASE_URL=http://127.0.0.1:<port>/v1.
+class MockLLMServer(ThreadingHTTPServer):
+    """The HTTP server plus the state its handlers share, so two servers never mix counts."""
+
+    def __init__(self, address, handler):
+        super().__init__(address, handler)
+        self.calls = 0
+        self.stats = Counter()
+        self.lock = threading.Lock()
+        self.window = deque()     # request times of the last minute, for requests_per_minute
+        self.attempts = Counter() # prompt -> times asked, so a retry can come back clean
+        self.broken = {}          # broken fragment -> original object, answered (once) on a repair re-ask
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    delay = 0.5                # seconds before the first token
+    response_text = CANNED_RESPONSE
+    replay = None              # ReplayBook; unrecognised prompts get response_text
+    tokens_per_second = None   # stream pacing; None sends everything at once
+    requests_per_minute = None # above this, 429 with Retry-After
+    malformed_rate = 0.0       # share of answers broken on purpose (see malform)
+    seed = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": "llama3.2:latest", "model": "llama3.2:latest"}]})
+        elif self.path == "/api/version":
+            self._send_json(200, {"version": "0.0.0-mock"})
+        elif self.path.rstrip("/") == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "mock"}]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        path = self.path.rstrip("/")
+        if path == "/api/generate":
+            prompt, api = request.get("prompt", ""), "generate"
+        elif path == "/api/chat":
+            prompt, api = "\n".join(str(m.get("content", "")) for m in request.get("messages", [])), "chat"
+        elif path == "/v1/chat/completions":
+            prompt, api = "\n".join(_content(m.get("content", "")) for m in request.get("messages", [])), "openai"
+        else:
+            self._send_json(404, {"error": "not found"})
+            return
+
+        retry_after = self._rate_limited()
+        if retry_after:
+            message = "Rate limit reached, please retry later (429 Too Many Requests)"
+            if api == "openai":
+                payload = {"error": {"message": message, "type": "rate_limit_error", "code": "rate_limit_exceeded"}}
+            else:
+                payload = {"error": message}
+            self._send_json(429, payload, {"Retry-After": str(retry_after)})
+            return
+
+        with self.server.lock:
+            self.server.calls += 1
+        text = self._answer(prompt)
+        time.sleep(self.delay)
+
+        model = request.get("model", "llama3.2:latest")
+        usage = (len(prompt) // CHARS_PER_TOKEN, len(text) // CHARS_PER_TOKEN)
+        stream = request.get("stream", api != "openai")  # Ollama streams by default, OpenAI does not
+        if not stream:
+            if self.tokens_per_second:
+                time.sleep(usage[1] / self.tokens_per_second)
+            self._send_json(200, self._body(api, model, text, usage))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream" if api == "openai" else "application/x-ndjson")
+        self.end_headers()
+        for piece in self._pieces(text):
+            self._write_event(api, self._chunk(api, model, piece))
+            if self.tokens_per_second:
+                time.sleep(len(piece) / CHARS_PER_TOKEN / self.tokens_per_second)
+        self._write_event(api, self._chunk(api, model, None, usage))
+        if api == "openai":
+            self.wfile.write(b"data: [DONE]\n\n")
+
+    # --- answers ---
+    def _answer(self, prompt):
+        if prompt.startswith("The following JSON object(s) are malformed"):  # output_parser.build_repair_prompt
+            with self.server.lock:
+                broken = [fragment for fragment in self.server.broken if fragment in prompt]
+                fixed = [self.server.broken.pop(fragment) for fragment in broken]
+            self._count("repairs")
+            return "[" + ",\n".join(fixed) + "]"
+
+        text = self.replay.answer(prompt) if self.replay else None
+        self._count("replayed" if text is not None else "default")
+        if text is None:
+            text = self.response_text
+
+        if self.malformed_rate:
+            # Seeded per prompt and attempt, so a run is reproducible and a retry can come back clean.
+            with self.server.lock:
+                self.server.attempts[prompt] += 1
+                attempt = self.server.attempts[prompt]
+            rng = random.Random(f"{self.seed}:{attempt}:{prompt}")
+            if rng.random() < self.malformed_rate:
+                kind = rng.choice(MALFORMATIONS)
+                text, broken, original = malform(text, kind)
+                if broken is not None:
+                    with self.server.lock:
+                        self.server.broken[broken] = original
+                self._count(f"malformed_{kind}")
+        return text
+
+    def _rate_limited(self):
+        if not self.requests_per_minute:
+            return 0
+        with self.server.lock:
+            now = time.monotonic()
+            window = self.server.window
+            while window and now - window[0] >= 60:
+                window.popleft()
+            if len(window) >= self.requests_per_minute:
+                self.server.stats["throttled"] += 1  # lock already held
+                return max(1, int(60 - (now - window[0]) + 1))
+            window.append(now)
+            return 0
+
+    def _count(self, name):
+        with self.server.lock:
+            self.server.stats[name] += 1
+
+    @staticmethod
+    def _pieces(text, size=4 * CHARS_PER_TOKEN):
+        # ~4 tokens per chunk, roughly what real servers send
+        return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+    # --- wire formats ---
+    def _body(self, api, model, text, usage):
+        if api == "openai":
+            return {
+                "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": usage[0], "completion_tokens": usage[1], "total_tokens": sum(usage)},
+            }
+        body = self._chunk(api, model, None, usage)
+        if api == "chat":
+            body["message"]["content"] = text
+        else:
+            body["response"] = text
+        return body
+
+    def _chunk(self, api, model, piece, usage=None):
+        """One streamed chunk; piece=None builds the final chunk carrying the token counts."""
+        done = piece is None
+        if api == "openai":
+            return {
+                "id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": {} if done else {"role": "assistant", "content": piece},
+                             "finish_reason": "stop" if done else None}],
+            }
+        chunk = {"model": model, "created_at": datetime.now(timezone.utc).isoformat(), "done": done}
+        if api == "chat":
+            chunk["message"] = {"role": "assistant", "content": piece or ""}
+        else:
+            chunk["response"] = piece or ""
+        if done:
+            chunk.update(done_reason="stop", prompt_eval_count=usage[0], eval_count=usage[1])
+        return chunk
+
+    def _write_event(self, api, payload):
+        line = json.dumps(payload, ensure_ascii=False)
+        self.wfile.write((f"data: {line}\n\n" if api == "openai" else line + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+
+def _content(content):
+    # OpenAI messages carry either a string or a list of {"type": "text", "text": ...} parts
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return str(content)
+
+
+def serve_mock_llm(port=0, delay=0.5, response_text=CANNED_RESPONSE, replay=None, tokens_per_second=None,
+                   requests_per_minute=None, malformed_rate=0.0, seed=0):
+    """Starts the mock server on a background thread; returns (server, base_url)."""
+    handler = type("ConfiguredMockLLMHandler", (MockLLMHandler,), {
+        "delay": delay,
+        "response_text": response_text,
+        "replay": replay,
+        "tokens_per_second": tokens_per_second,
+        "requests_per_minute": requests_per_minute,
+        "malformed_rate": malformed_rate,
+        "seed": seed,
+    })
+    server = MockLLMServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Mock Ollama / OpenAI-compatible server for offline annotation runs.")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--delay", type=float, default=0.5, help="seconds before the first token")
+    parser.add_argument("--replay", nargs="*", help="annotation CSVs to answer from (default: anottated/*.csv)")
+    parser.add_argument("--canned", action="store_true", help="always answer with the canned record instead")
+    parser.add_argument("--raw-text", default=os.path.join(here, "..", "raw_text"),
+                        help="raw_text folder, used to recognise which document a prompt holds")
+    parser.add_argument("--tokens-per-second", type=float, help="stream pacing (default: as fast as possible)")
+    parser.add_argument("--rpm", type=int, help="requests per minute before answering 429")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="share of answers with broken JSON")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    replay = None
+    if not args.canned:
+        paths = args.replay or sorted(glob.glob(os.path.join(here, "anottated", "*.csv")))
+        replay = ReplayBook(paths, args.raw_text)
+        print(f"📼 Replaying {sum(map(len, replay.records.values()))} records for {len(replay.records)} documents")
+    server, base_url = serve_mock_llm(args.port, args.delay, replay=replay, tokens_per_second=args.tokens_per_second,
+                                      requests_per_minute=args.rpm, malformed_rate=args.malformed_rate, seed=args.seed)
+    print(f"🤖 Mock LLM listening on {base_url} (set OLLAMA_HOST={base_url}, "
+          f"or LLM_BACKEND=openai LLM_BASE_URL={base_url}/v1)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"📊 {server.calls} calls, {dict(server.stats)}")
@@ -0,0 +1,259 @@
+import re
+import json
+import time
+import threading
+
+from .engine import estimate_tokens
+from metrics import METRICS
+from .template_extractor import FIELDS
+
+# --- SCHEMA ---
+INT_FIELDS = ("year", "lap_number")
+LIST_FIELDS = ("drivers_involved", "teams_involved")
+ALIASES = {"relevant_rule": "rule_violated"}  # the prompt offers both names
+KEEP = ("document_id",)                       # set on batched outputs (see prompts.build_batch_prompt)
+NULLS = ("", "null", "none", "n/a", "na", "not mentioned", "unknown")
+
+# --- REPAIRS (tried in order until json.loads succeeds) ---
+SMART_QUOTES = str.maketrans({"“": '"', "”": '"'})
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+PY_LITERAL = re.compile(r"(:\s*|\[\s*|,\s*)(None|NaN|undefined|True|False)\b")
+MISSING_COMMA = re.compile(r'("|\d|null|true|false|\]|\})(\s*\n\s*)(")')
+LITERALS = {"None": "null", "NaN": "null", "undefined": "null", "True": "true", "False": "false"}
+
+
+def strip_fences(text):
+    """Drops a leading ```json / ``` fence and a trailing ``` fence, each only if present."""
+    text = text.strip()
+    text = re.sub(r"^```[a-zA-Z]*\s*", "", text)
+    return re.sub(r"\s*```\s*$", "", text)
+
+
+# --- INCREMENTAL SCANNER ---
+class ObjectScanner:
+    """Cuts top-level JSON objects out of a token stream as soon as each one closes.
+
+    Anything between objects (fences, the enclosing array, commentary) is ignored, so
+    one broken object never costs the others.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._stack = []
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text):
+        done = []
+        for ch in text:
+            if not self._stack:
+                if ch == "{":
+                    self._stack.append("}")
+                    self._buffer = [ch]
+                continue
+            self._buffer.append(ch)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._stack.append("}" if ch == "{" else "]")
+            elif ch in "}]":
+                if self._stack[-1] == ch:
+                    self._stack.pop()
+                if not self._stack:
+                    done.append("".join(self._buffer))
+        return done
+
+    def finish(self):
+        """Returns the unterminated object left at the end of the stream (truncated output), if any."""
+        return "".join(self._buffer) if self._stack else None
+
+    def closers(self):
+        return ('"' if self._in_string else "") + "".join(reversed(self._stack))
+
+
+def repair_object(fragment):
+    """Parses one object, applying local fixes for common LLM defects; None if unrecoverable."""
+    candidates = [fragment]
+    text = fragment.translate(SMART_QUOTES)
+    candidates.append(text)
+    text = TRAILING_COMMA.sub(r"\1", text)
+    candidates.append(text)
+    text = PY_LITERAL.sub(lambda m: m.group(1) + LITERALS[m.group(2)], text)
+    candidates.append(text)
+    text = MISSING_COMMA.sub(r"\1,\2\3", text)
+    candidates.append(text)
+
+    scanner = ObjectScanner()
+    if not scanner.feed(text):  # truncated: close the open string / brackets
+        candidates.append(TRAILING_COMMA.sub(r"\1", text + scanner.closers()))
+
+    for candidate in candidates:
+        try:
+            parsed = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(parsed, dict):
+            return parsed
+    return None
+
+
+# --- VALIDATION ---
+def _is_null(value):
+    return value is None or (isinstance(value, str) and value.strip().lower() in NULLS)
+
+
+def validate_record(obj):
+    """Coerces a parsed object onto the 17-field schema (missing -> None, types fixed)."""
+    obj = {ALIASES.get(key, key): value for key, value in obj.items()}
+    record = {}
+    for field in FIELDS:
+        value = obj.get(field)
+        if _is_null(value) or value == []:
+            value = None
+        elif field in INT_FIELDS:
+            digits = re.search(r"\d+", str(value))
+            value = int(digits.group(0)) if digits else None
+        elif field in LIST_FIELDS:
+            items = value if isinstance(value, list) else re.split(r"\s*,\s*|\s+and\s+", str(value))
+            value = [str(item).strip() for item in items if not _is_null(item)] or None
+        elif isinstance(value, list):
+            value = ", ".join(str(item) for item in value)
+        elif not isinstance(value, str):
+            value = str(value)
+        record[field] = value
+    for key in KEEP:
+        if key in obj:
+            record[key] = obj[key]
+    return record
+
+
+# --- PARSE A (STREAMED) RESPONSE ---
+class OutputError(ValueError):
+    """The response held nothing usable, even after repair; `raw_output` is what came back."""
+
+    def __init__(self, message, raw_output):
+        super().__init__(message)
+        self.raw_output = raw_output
+
+
+def _parse_fragment(fragment, records, broken, stats):
+    try:
+        obj = json.loads(fragment)
+    except json.JSONDecodeError:
+        obj = repair_object(fragment)
+        if obj is not None and stats:
+            stats.add(repaired=1)
+    if obj is None:
+        broken.append(fragment)
+    elif obj:  # "{}" means nothing to extract
+        records.append(validate_record(obj))
+
+
+def parse_output(chunks, stats=None):
+    """Consumes an iterable of text chunks; returns (records, broken fragments, raw text).
+
+    Objects are validated as soon as they close in the stream. A fragment that cannot
+    be repaired locally is returned in `broken` so the caller can re-ask for just that.
+    """
+    scanner = ObjectScanner()
+    records, broken, raw = [], [], []
+    parse_seconds = 0.0  # only the scanning/validation, not the wait for the next chunk
+    for chunk in chunks:
+        start = time.perf_counter()
+        raw.append(chunk)
+        for fragment in scanner.feed(chunk):
+            _parse_fragment(fragment, records, broken, stats)
+        parse_seconds += time.perf_counter() - start
+    start = time.perf_counter()
+    tail = scanner.finish()
+    if tail:
+        _parse_fragment(tail, records, broken, stats)
+    METRICS.observe("parse", parse_seconds + time.perf_counter() - start)
+    if stats:
+        stats.add(responses=1, objects=len(records))
+    return records, broken, "".join(raw)
+
+
+def extract_records(stream, prompt, stats=None, source="llm"):
+    """Streams `prompt` through `stream` (prompt -> text chunks) and returns (records, raw output).
+
+    Broken objects are sent back once on their own (see `build_repair_prompt`) instead
+    of regenerating the whole answer. Raises OutputError when nothing usable came back.
+    `source` labels the call's metrics ("cache" for a replayed answer).
+    """
+    records, broken, raw_output = parse_output(METRICS.timed_chunks("llm.call", stream(prompt), source=source), stats)
+    METRICS.inc("llm.prompt_tokens", estimate_tokens(prompt), source=source)
+    METRICS.inc("llm.output_tokens", estimate_tokens(raw_output), source=source)
+    if broken:
+        if stats:
+            stats.add(reasked=len(broken))
+        repair_prompt = build_repair_prompt(broken)
+        fixed, still_broken, repair_output = parse_output(
+            METRICS.timed_chunks("llm.call", stream(repair_prompt), source="repair"), stats
+        )
+        METRICS.inc("llm.prompt_tokens", estimate_tokens(repair_prompt), source="repair")
+        METRICS.inc("llm.output_tokens", estimate_tokens(repair_output), source="repair")
+        records += fixed
+        if stats and still_broken:
+            stats.add(wasted_tokens=sum(estimate_tokens(fragment) for fragment in still_broken))
+    if not records and not is_empty_answer(raw_output):
+        raise OutputError("no valid JSON object in the response", raw_output)
+    return records, raw_output
+
+
+def is_empty_answer(raw_output):
+    """True when the model validly answered 'nothing to extract' ([] / null)."""
+    return strip_fences(raw_output) in ("[]", "null", "{}")
+
+
+def build_repair_prompt(fragments):
+    """Asks the model to re-emit only the objects that could not be parsed."""
+    listing = "\n\n".join(fragments)
+    return (
+        "The following JSON object(s) are malformed. Return them again, unchanged in content, "
+        "as one valid JSON array. Return **ONLY valid JSON**, no extra commentary.\n\n" + listing + "\n"
+    )
+
+
+# --- STATS ---
+class ParseStats:
+    """Thread-safe counters for how often outputs needed repair, a re-ask or a full retry."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.objects = 0
+        self.repaired = 0
+        self.reasked = 0
+        self.full_retries = 0
+        self.wasted_tokens = 0
+
+    def add(self, **counts):
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+        for name, count in counts.items():
+            METRICS.inc(f"parse.{name}", count)
+
+    def discard(self, raw_output):
+        """A whole response was thrown away and the chain re-run."""
+        self.add(full_retries=1, wasted_tokens=estimate_tokens(raw_output))
+
+    def summary(self):
+        with self._lock:
+            return {
+                "responses": self.responses,
+                "objects": self.objects,
+                "repaired": self.repaired,
+                "reasked": self.reasked,
+                "full_retries": self.full_retries,
+                "retry_rate": self.full_retries / self.responses if self.responses else 0.0,
+                "wasted_tokens": self.wasted_tokens,
+            }
@@ -0,0 +1,189 @@
+import os
+import re
+import ast
+import csv
+import json
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .annotation_store import COLUMN_ALIASES
+
+# --- TYPED SCHEMA ---
+# Low-cardinality text is dictionary-encoded (categorical in pandas), year/lap are real
+# ints and driver/team lists are list columns instead of stringified Python lists.
+DICT_STRING = pa.dictionary(pa.int32(), pa.string())
+SCHEMA = pa.schema([
+    ("type_of_document", DICT_STRING),
+    ("year", pa.int16()),
+    ("grand_prix", DICT_STRING),
+    ("description", pa.string()),
+    ("session_type", DICT_STRING),
+    ("track", DICT_STRING),
+    ("lap_number", pa.int16()),
+    ("turn_number", pa.string()),
+    ("safety_car_or_vsc_involved", DICT_STRING),
+    ("penalty_given", pa.string()),
+    ("type_of_incident", pa.string()),
+    ("was_contact_made", DICT_STRING),
+    ("immediate_advantage_gained", DICT_STRING),
+    ("drivers_involved", pa.list_(pa.string())),
+    ("teams_involved", pa.list_(pa.string())),
+    ("rule_violated", pa.string()),
+    ("decision_notes", pa.string()),
+    ("source_file", pa.string()),
+])
+# One folder per year; inside it rows are sorted by Grand Prix so per-GP filters can skip
+# row groups. A folder per GP as well is supported (partition_cols=["year", "grand_prix"])
+# but at ~50 rows per GP the extra files make full loads slower than the CSV.
+PARTITION_COLS = ["year"]
+PARTITION_TYPES = {"year": pa.int16(), "grand_prix": DICT_STRING}
+
+NULLS = ("", "null", "none", "nan", "n/a")
+# Partition values must be clean, so year and GP fall back to the document title
+# ("2024 Abu Dhabi Grand Prix - ..." / "2025_monaco_grand_prix_-_...") when a row is garbled.
+TITLE = re.compile(r"^((?:19|20)\d{2})[ _](.+?[ _]grand[ _]prix)", re.I)
+GRAND_PRIX = re.compile(r"^[\w .'-]{3,40} grand prix$", re.I)
+
+
+# --- VALUE COERCION ---
+def _text(value):
+    if value is None or str(value).strip().lower() in NULLS:
+        return None
+    return str(value).strip()
+
+
+def _int(value, pattern=r"\d+"):
+    match = re.search(pattern, str(value or ""))
+    return int(match.group(0)) if match else None
+
+
+def _list(value):
+    """"['A', 'B']" / '["A"]' / "A, B" / a real list -> ['A', 'B'] (None when empty)."""
+    if isinstance(value, list):
+        items = value
+    else:
+        text = _text(value)
+        if text is None:
+            return None
+        if text.startswith("["):
+            try:
+                items = json.loads(text)
+            except ValueError:
+                try:
+                    items = ast.literal_eval(text)
+                except (ValueError, SyntaxError):
+                    items = text.strip("[]").replace("'", "").split(",")
+        else:
+            items = text.split(",")
+        if not isinstance(items, (list, tuple)):
+            items = [items]
+    items = [str(item).strip() for item in items if _text(item) is not None]
+    return items or None
+
+
+def _grand_prix(value, title):
+    text = _text(value)
+    if text and GRAND_PRIX.match(text):
+        return text.title().replace("'S", "'s")
+    return title.group(2).replace("_", " ").title() if title else None
+
+
+def normalize_row(row):
+    """Maps one CSV/store row onto SCHEMA's columns and Python types."""
+    row = {COLUMN_ALIASES.get(key, key): value for key, value in row.items() if key}
+    title = TITLE.match(os.path.basename(_text(row.get("source_file")) or ""))
+    record = {}
+    for field in SCHEMA:
+        value = row.get(field.name)
+        if field.name == "year":
+            record[field.name] = _int(value, r"\b(?:19|20)\d{2}\b") or (int(title.group(1)) if title else None)
+        elif field.name == "grand_prix":
+            record[field.name] = _grand_prix(value, title)
+        elif field.name == "lap_number":
+            record[field.name] = _int(value)
+        elif pa.types.is_list(field.type):
+            record[field.name] = _list(value)
+        else:
+            record[field.name] = _text(value)
+    return record
+
+
+def to_table(rows):
+    return pa.Table.from_pylist([normalize_row(row) for row in rows], schema=SCHEMA)
+
+
+def read_csv_rows(path):
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+# --- WRITE / READ ---
+def _partitioning(partition_cols):
+    return ds.partitioning(pa.schema([(col, PARTITION_TYPES[col]) for col in partition_cols]), flavor="hive")
+
+
+def write_dataset(rows, root, partition_cols=PARTITION_COLS):
+    """Writes rows as a Hive-partitioned Parquet dataset (root/year=2024/part-0.parquet).
+
+    Rows without a year land in the __HIVE_DEFAULT_PARTITION__ folder. Returns the
+    number of rows written.
+    """
+    records = sorted(map(normalize_row, rows), key=lambda r: (r["grand_prix"] or "", r["source_file"] or ""))
+    table = pa.Table.from_pylist(records, schema=SCHEMA)
+    pq.write_to_dataset(
+        table, root, partitioning=_partitioning(partition_cols),
+        existing_data_behavior="delete_matching", compression="zstd",
+    )
+    return table.num_rows
+
+
+def read_dataset(root, columns=None, filters=None, partition_cols=PARTITION_COLS):
+    """Loads a dataset written by write_dataset back as a typed pandas DataFrame.
+
+    `filters` are pushed down to folders and row groups, e.g. [("year", "=", 2024)].
+    Year and lap stay integers (nullable Int16) rather than turning into floats.
+    """
+    import pandas as pd
+
+    table = pq.read_table(root, columns=columns, filters=filters, partitioning=_partitioning(partition_cols))
+    return table.to_pandas(types_mapper={pa.int16(): pd.Int16Dtype()}.get)
+
+
+if __name__ == "__main__":
+    import glob
+    import time
+    import argparse
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    root_dir = os.path.join(here, "..", "..")
+    default_inputs = sorted(glob.glob(os.path.join(here, "anottated", "*.csv")))
+    default_inputs += [os.path.join(root_dir, name) for name in ("Pdata.csv", "penalty22_data.csv", "penalty24_data.csv", "penalty25_data.csv")]
+
+    parser = argparse.ArgumentParser(description="Export annotation CSVs to partitioned, typed Parquet datasets.")
+    parser.add_argument("csvs", nargs="*", default=default_inputs)
+    parser.add_argument("--out", default=os.path.join(root_dir, "parquet"))
+    parser.add_argument("--benchmark", action="store_true", help="compare CSV vs Parquet load time and memory")
+    args = parser.parse_args()
+
+    for path in args.csvs:
+        if not os.path.exists(path):
+            continue
+        name = os.path.splitext(os.path.basename(path))[0]
+        target = os.path.join(args.out, name)
+        rows = write_dataset(read_csv_rows(path), target)
+        print(f"📦 {name}: {rows} rows -> {target}")
+
+        if args.benchmark:
+            import pandas as pd
+
+            start = time.perf_counter()
+            frame_csv = pd.read_csv(path, encoding="utf-8-sig")
+            csv_s = time.perf_counter() - start
+            start = time.perf_counter()
+            frame_pq = read_dataset(target)
+            pq_s = time.perf_counter() - start
+            csv_mb = frame_csv.memory_usage(deep=True).sum() / 1e6
+            pq_mb = frame_pq.memory_usage(deep=True).sum() / 1e6
+            print(f"   CSV {csv_s * 1000:.1f} ms / {csv_mb:.2f} MB  vs  Parquet {pq_s * 1000:.1f} ms / {pq_mb:.2f} MB")
@@ -0,0 +1,120 @@
+import os
+import re
+
+# --- ROUTES ---
+SKIP = "skip"                    # no penalty content: never sent to the LLM
+DETERMINISTIC = "deterministic"  # templated stewards' document: parsed without the LLM
+LLM = "llm"                      # everything else
+
+# Document types (the part of the title after the GP name) that never carry a penalty
+# decision: timing sheets, procedures, notes, parts/PU bookkeeping. Summonses and pre-race
+# procedures are not listed: in the labelled corpus some of them state a sanction (warning,
+# grid drop, time penalty) and `evaluate` must keep recall at 1.0, so they go to the LLM.
+# A PU notice that also reports a parc fermé issue can carry a pit lane start.
+SKIP_TITLE = re.compile(
+    r"^(?:"
+    r"entry list|championship points|curfew|circuit map|car display|automobile display|car presentation"
+    r"|event notes|race director'?s event notes|pirelli|post-race procedure"
+    r"|post-qualifying procedure|post-sprint"
+    r"|pu elements used|new pu elements(?!.*parc ferm)|rncs? used|new rncs|rnc issues"
+    r"|parts and parameters|fuel on board|timetable|sporting regulations|team managers"
+    r")"
+)
+
+# Classifications, grids and scrutineering reports only matter when the text mentions a penalty.
+PENALTY_FOOTNOTE_TITLE = re.compile(r"classification|starting grid|scrutineering")
+PENALTY_TEXT = re.compile(
+    r"\b(?:penalt(?:y|ies)|reprimand|drive[- ]through|stop(?: and |-)go|disqualified|fined?)\b", re.I
+)
+
+# Stewards' decisions follow a fixed layout (see template_extractor.py).
+TEMPLATED_TITLE = re.compile(r"^(?:offence|infringement|decision)\b")
+TEMPLATE_SECTIONS = [re.compile(rf"^\s*{name}\b", re.M) for name in ("No / Driver", "Fact", "Decision")]
+
+
+def document_type(filename):
+    """'2024 Abu Dhabi Grand Prix - Decision - Car 44 - ...txt' -> 'decision'.
+
+    Handles both title styles in raw_text (spaces in 2022-2024, snake_case in 2025).
+    """
+    title = os.path.splitext(os.path.basename(filename))[0].replace("_", " ").lower()
+    parts = [part.strip() for part in title.split(" - ")]
+    return parts[1] if len(parts) > 1 else title
+
+
+def route(filename, text):
+    """Decides how a document should be annotated: SKIP, DETERMINISTIC or LLM."""
+    doc_type = document_type(filename)
+
+    if TEMPLATED_TITLE.match(doc_type) and all(section.search(text) for section in TEMPLATE_SECTIONS):
+        return DETERMINISTIC
+    if PENALTY_FOOTNOTE_TITLE.search(doc_type) and not SKIP_TITLE.match(doc_type):
+        return LLM if PENALTY_TEXT.search(text) else SKIP
+    if SKIP_TITLE.match(doc_type):
+        return SKIP
+    return LLM
+
+
+# --- EVALUATION AGAINST EXISTING ANNOTATIONS ---
+def _has_penalty(rows):
+    return any((row.get("penalty_given") or "").strip().lower() not in ("", "none", "null", "n/a") for row in rows)
+
+
+def evaluate(annotation_csvs, raw_text_dir):
+    """Measures routing against annotated CSVs, treating any file with a penalty_given as positive.
+
+    Returns precision/recall of "sent for extraction" (LLM or deterministic) with respect to
+    penalty documents, the share of LLM calls avoided, and the penalty files that would be skipped.
+    """
+    import csv
+    from collections import defaultdict
+
+    routes, labels = {}, {}
+    for csv_path in annotation_csvs:
+        year = re.match(r"\d{4}", os.path.basename(csv_path)).group(0)
+        by_file = defaultdict(list)
+        with open(csv_path, "r", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                if row.get("source_file"):
+                    by_file[row["source_file"]].append(row)
+
+        for filename, rows in by_file.items():
+            path = os.path.join(raw_text_dir, year, filename)
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                routes[(year, filename)] = route(filename, f.read())
+            labels[(year, filename)] = labels.get((year, filename), False) or _has_penalty(rows)
+
+    kept = {key for key, r in routes.items() if r != SKIP}
+    positives = {key for key, label in labels.items() if label}
+    true_pos = kept & positives
+    return {
+        "documents": len(routes),
+        "skip": sum(r == SKIP for r in routes.values()),
+        "deterministic": sum(r == DETERMINISTIC for r in routes.values()),
+        "llm": sum(r == LLM for r in routes.values()),
+        "llm_call_reduction": len(routes) / max(1, sum(r == LLM for r in routes.values())),
+        "precision": len(true_pos) / len(kept) if kept else 0.0,
+        "recall": len(true_pos) / len(positives) if positives else 0.0,
+        "missed": sorted(positives - kept),
+    }
+
+
+if __name__ == "__main__":
+    import glob
+    import argparse
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Precision/recall of the pre-classifier against annotated CSVs.")
+    parser.add_argument("csvs", nargs="*", default=sorted(glob.glob(os.path.join(here, "anottated", "*.csv"))))
+    parser.add_argument("--raw-text", default=os.path.join(here, "..", "raw_text"))
+    args = parser.parse_args()
+
+    report = evaluate(args.csvs, args.raw_text)
+    print(f"📊 {report['documents']} annotated documents: {report['skip']} skip, "
+          f"{report['deterministic']} deterministic, {report['llm']} LLM "
+          f"({report['llm_call_reduction']:.1f}x fewer LLM calls)")
+    print(f"   precision {report['precision']:.3f}, recall {report['recall']:.3f} on documents with a penalty")
+    for year, filename in report["missed"]:
+        print(f"   ⚠️ would skip penalty document: {year}/{filename}")
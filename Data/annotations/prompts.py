@@ -0,0 +1,204 @@
+import os
+import json
+
+from .engine import estimate_tokens
+from .preclassify import document_type
+
+# Bump whenever SYSTEM_PREFIX or any example changes; it is part of the response-cache key.
+PROMPT_VERSION = "v2"
+
+# --- STATIC PREFIX ---
+# Identical bytes for every call, so backends with prefix / KV caching (Ollama keeps the
+# previous context, Gemini implicit caching) can reuse it instead of re-prefilling it.
+SYSTEM_PREFIX = """You are an F1 steward. The text below contains incident report(s).
+
+For each incident, extract these fields as a JSON array of objects (one object per incident).
+If a field is not mentioned, set it to null.
+
+Fields:
+- type_of_document (e.g. "technical delegate report", "stewards decision", "team report", "driver report" or anything else) [str]
+- year [int]
+- grand_prix [str]
+- description (brief summary of what happened) [str]
+- session_type (e.g. "FP1", "FP2", "Qualifying", "Race") [str]
+- track (if mentioned) [str]
+- lap_number (if mentioned) [int]
+- turn_number (if mentioned) [str]
+- safety_car_or_vsc_involved (if mentioned) [str]
+- penalty_given [str]
+- type_of_incident (if mentioned) [str]
+- was_contact_made (if mentioned) [str]
+- immediate_advantage_gained (if mentioned) [str]
+- drivers_involved (if mentioned) [list of str]
+- teams_involved (if mentioned) [list of str]
+- rule_violated or relevant_rule (if mentioned) [str]
+- decision_notes (any justification or rationale given) [str]
+
+Return **ONLY valid JSON**, no extra commentary.
+"""
+
+
+def _record(**fields):
+    keys = [
+        "type_of_document", "year", "grand_prix", "description", "session_type", "track",
+        "lap_number", "turn_number", "safety_car_or_vsc_involved", "penalty_given",
+        "type_of_incident", "was_contact_made", "immediate_advantage_gained",
+        "drivers_involved", "teams_involved", "rule_violated", "decision_notes",
+    ]
+    return {key: fields.get(key) for key in keys}
+
+
+# --- FEW-SHOT EXAMPLES (one short example per document kind) ---
+EXAMPLES = {
+    "decision": (
+        """2024 ABU DHABI GRAND PRIX
+From The Stewards Document 45
+No / Driver 1 - Max Verstappen
+Competitor Oracle Red Bull Racing
+Session Race
+Fact Car 1 caused a collision with Car 81 in turn 1.
+Infringement Breach of Appendix L, Chapter IV, Article 2 d) of the FIA International Sporting Code.
+Decision 10 second time penalty.
+Reason Car 1 attempted to overtake Car 81 on the inside into Turn 1 and was wholly at fault.""",
+        [_record(
+            type_of_document="Stewards decision", year=2024, grand_prix="Abu Dhabi Grand Prix",
+            description="Car 1 caused a collision with Car 81 in turn 1.", session_type="Race",
+            turn_number="1", penalty_given="10 second time penalty", type_of_incident="Causing a collision",
+            was_contact_made="Yes", drivers_involved=["Max Verstappen"], teams_involved=["Oracle Red Bull Racing"],
+            rule_violated="Appendix L, Chapter IV, Article 2 d) of the FIA International Sporting Code",
+            decision_notes="Car 1 was wholly at fault for the collision.",
+        )],
+    ),
+    "deleted_laps": (
+        """2024 ABU DHABI GRAND PRIX
+From The Stewards Document 35
+Session Qualifying
+Fact The cars below did not use the track at turns 1 and 14.
+No Turn Car Driver Competitor Time of Day Lap Time
+1 1 43 Franco Colapinto Williams Racing 18:06:05 1:24.411
+Decision Deletion of the lap times shown.""",
+        [_record(
+            type_of_document="Stewards decision", year=2024, grand_prix="Abu Dhabi Grand Prix",
+            description="Lap time deleted for not using the track.", session_type="Qualifying",
+            turn_number="1", penalty_given="Lap time deleted", type_of_incident="Track limits",
+            drivers_involved=["Franco Colapinto"], teams_involved=["Williams Racing"],
+            rule_violated="Article 33.3 of the FIA Formula One Sporting Regulations",
+        )],
+    ),
+    "classification": (
+        """2022 ABU DHABI GRAND PRIX
+FINAL STARTING GRID
+19 23 Alexander ALBON 1:26.028 Williams Racing
+* PENALTIES
+Car 3 - 3 place grid penalty - Causing a collision - Stewards' document no. 58 (2022 São Paulo Grand Prix)""",
+        [_record(
+            type_of_document="Final starting grid", year=2022, grand_prix="Abu Dhabi Grand Prix",
+            description="Car 3 starts with a 3 place grid penalty carried over from the São Paulo Grand Prix.",
+            session_type="Race", penalty_given="3 place grid penalty", type_of_incident="Causing a collision",
+            drivers_involved=["Car 3"], decision_notes="Stewards' document no. 58 (2022 São Paulo Grand Prix)",
+        )],
+    ),
+    "summons": (
+        """2024 MIAMI GRAND PRIX
+From The Stewards Document 40
+The driver of Car 20 is required to report to the Stewards at 17:30.
+Fact Entering the pit lane during a Safety Car period.""",
+        [_record(
+            type_of_document="Summons", year=2024, grand_prix="Miami Grand Prix",
+            description="Car 20 summoned for entering the pit lane during a Safety Car period.",
+            safety_car_or_vsc_involved="Yes", type_of_incident="Pit lane entry under Safety Car",
+            drivers_involved=["Car 20"],
+        )],
+    ),
+    "note": (
+        """2024 AUSTRALIAN GRAND PRIX
+From The FIA Formula One Race Director Document 17
+Note to Teams
+Drivers must stay below 1:33.0 between the Safety Car lines during reconnaissance laps.""",
+        [_record(
+            type_of_document="Race director's note", year=2024, grand_prix="Australian Grand Prix",
+            description="Maximum lap time of 1:33.0 between the Safety Car lines on reconnaissance laps.",
+            session_type="Race",
+        )],
+    ),
+}
+
+
+def detect_kind(filename):
+    """Maps a raw_text file name to the few-shot example that best matches it."""
+    doc_type = document_type(filename or "")
+    if doc_type.startswith("summons"):
+        return "summons"
+    # The whole title: 2025 files put it after the type ("infringement - qualifying deleted lap times")
+    title = os.path.splitext(os.path.basename(filename or ""))[0].replace("_", " ").lower()
+    if "deleted lap" in title or "track limits" in title:
+        return "deleted_laps"
+    if doc_type.startswith(("offence", "infringement", "decision")):
+        return "decision"
+    if "classification" in doc_type or "starting grid" in doc_type:
+        return "classification"
+    return "note"
+
+
+def build_prompt(input_text, filename=None):
+    """Returns (prompt, kind, estimated prompt tokens) for one document."""
+    kind = detect_kind(filename)
+    example_text, example_output = EXAMPLES[kind]
+    prompt = (
+        f"{SYSTEM_PREFIX}\nExample input:\n{example_text}\n\nExample output:\n"
+        f"{json.dumps(example_output, ensure_ascii=False)}\n\nIncident text:\n{input_text}\n"
+    )
+    return prompt, kind, estimate_tokens(prompt)
+
+
+# --- BATCHED PROMPTS (several short documents per request) ---
+BATCH_INSTRUCTIONS = """
+Several documents follow, each introduced by a line "=== DOCUMENT <id> ===".
+Return ONE JSON array covering all of them and add "document_id" (the id of the document
+the incident comes from) to every object. Every document must appear at least once.
+"""
+
+
+def build_batch_prompt(documents):
+    """Returns (prompt, estimated prompt tokens) for [(document_id, text), ...]."""
+    example_text, example_output = EXAMPLES["note"]
+    example_output = [dict(record, document_id=1) for record in example_output]
+    parts = [
+        f"{SYSTEM_PREFIX}{BATCH_INSTRUCTIONS}\nExample input:\n=== DOCUMENT 1 ===\n{example_text}\n\n"
+        f"Example output:\n{json.dumps(example_output, ensure_ascii=False)}\n\nDocuments:\n"
+    ]
+    for doc_id, text in documents:
+        parts.append(f"=== DOCUMENT {doc_id} ===\n{text.strip()}\n\n")
+    prompt = "".join(parts)
+    return prompt, estimate_tokens(prompt)
+
+
+def split_batch_output(records, document_ids):
+    """Groups a batched JSON array by document_id -> {document_id: [records...]}.
+
+    Records without a known id are dropped; ids missing from the result are simply
+    absent, so the caller can re-run those documents on their own.
+    """
+    known = {str(doc_id): doc_id for doc_id in document_ids}
+    grouped = {}
+    for record in records:
+        if not isinstance(record, dict):
+            continue
+        doc_id = known.get(str(record.pop("document_id", None)).strip())
+        if doc_id is not None:
+            grouped.setdefault(doc_id, []).append(record)
+    return grouped
+
+
+def pack_batches(sizes, max_tokens, max_documents=10):
+    """Greedily packs [(name, tokens), ...] into batches within a token budget, in order."""
+    batches, current, used = [], [], 0
+    for name, tokens in sizes:
+        if current and (used + tokens > max_tokens or len(current) >= max_documents):
+            batches.append(current)
+            current, used = [], 0
+        current.append(name)
+        used += tokens
+    if current:
+        batches.append(current)
+    return batches
@@ -0,0 +1,306 @@
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+
+from .annotation_store import COLUMN_ALIASES
+
+DEFAULT_INDEX = "search_index.sqlite"
+RECORD_FIELDS = (  # annotation fields worth searching; the full record is stored alongside
+    "penalty_given", "type_of_incident", "drivers_involved", "teams_involved",
+    "rule_violated", "description", "decision_notes",
+)
+TITLE_WEIGHT = 10.0  # a match in the document title counts 10x a match in its body
+YEAR = re.compile(r"^((?:19|20)\d{2})")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id      INTEGER PRIMARY KEY,
+    source_file TEXT NOT NULL UNIQUE,
+    year        INTEGER,
+    path        TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    mtime       REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    title, body, tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS records (
+    record_id   INTEGER PRIMARY KEY,
+    source_file TEXT NOT NULL,
+    year        INTEGER,
+    record_no   INTEGER NOT NULL,
+    data        TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_source ON records(source_file);
+CREATE INDEX IF NOT EXISTS records_year ON records(year);
+CREATE TABLE IF NOT EXISTS record_sets (
+    source_file TEXT PRIMARY KEY,
+    digest      TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5(
+    {fields}, tokenize = 'unicode61 remove_diacritics 2'
+);
+""".format(fields=", ".join(RECORD_FIELDS))
+
+
+# --- QUERY SYNTAX ---
+FTS_SYNTAX = re.compile(r'"|\*|\bAND\b|\bOR\b|\bNOT\b|\bNEAR\(|:')
+
+
+def to_match(query):
+    """Plain words -> an FTS5 query: every term required, "car 44" kept together as a phrase.
+
+    Queries already written in FTS5 syntax (quotes, OR/NOT, prefix*, column:) pass through.
+    """
+    if FTS_SYNTAX.search(query):
+        return query
+    terms = []
+    for word in re.findall(r"\w+", query):
+        if word.isdigit() and terms and not terms[-1][-1].isdigit():
+            terms[-1] = f"{terms[-1]} {word}"  # "car 44", "turn 4", "lap 12"
+        else:
+            terms.append(word)
+    return " ".join(f'"{term}"' for term in terms)
+
+
+def _text(value):
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    return "" if value is None else str(value)
+
+
+def _year(source_file, record=None):
+    value = (record or {}).get("year")
+    match = re.search(r"\b(?:19|20)\d{2}\b", str(value or "")) or YEAR.match(os.path.basename(source_file))
+    return int(match.group(0)) if match else None
+
+
+# --- INDEX ---
+class SearchIndex:
+    """SQLite FTS5 index over raw_text documents and their annotation records.
+
+    Documents are re-indexed only when their size/mtime changed and a file's records only
+    when their content digest changed, so `update_*` after new downloads or a new
+    annotation run only touches what is new. Queries rank documents with BM25 (title
+    matches weighted up) and add the score of their matching records.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    # --- incremental updates ---
+    def update_documents(self, raw_text_dir):
+        """Indexes new or changed .txt files under `raw_text_dir` (and its year folders); returns that count."""
+        known = {row[0]: row[1:] for row in self._conn.execute("SELECT path, size, mtime, doc_id FROM documents")}
+        changed = 0
+        with self._conn:
+            for folder, _, files in os.walk(raw_text_dir):
+                for filename in sorted(files):
+                    if not filename.endswith(".txt"):
+                        continue
+                    path = os.path.join(folder, filename)
+                    stat = os.stat(path)
+                    entry = known.get(path)
+                    if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime:
+                        continue
+                    with open(path, "r", encoding="utf-8", errors="replace") as f:
+                        body = f.read()
+                    self._index_document(path, filename, body, stat, entry[2] if entry else None)
+                    changed += 1
+        return changed
+
+    def _index_document(self, path, source_file, body, stat, doc_id):
+        if doc_id is None:
+            row = self._conn.execute("SELECT doc_id FROM documents WHERE source_file = ?", (source_file,)).fetchone()
+            doc_id = row[0] if row else None
+        if doc_id is not None:
+            self._conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (doc_id,))
+        cursor = self._conn.execute(
+            "INSERT OR REPLACE INTO documents (doc_id, source_file, year, path, size, mtime) VALUES (?, ?, ?, ?, ?, ?)",
+            (doc_id, source_file, _year(source_file), path, stat.st_size, stat.st_mtime),
+        )
+        title = os.path.splitext(source_file)[0].replace("_", " ")
+        self._conn.execute("INSERT INTO documents_fts (rowid, title, body) VALUES (?, ?, ?)", (cursor.lastrowid, title, body))
+
+    def update_records(self, rows):
+        """Indexes annotation rows (AnnotationStore.rows() or CSV dicts); returns files re-indexed."""
+        by_file = {}
+        for row in rows:
+            if row.get("source_file"):
+                by_file.setdefault(row["source_file"], []).append(row)
+        digests = dict(self._conn.execute("SELECT source_file, digest FROM record_sets"))
+        changed = 0
+        with self._conn:
+            for source_file, records in by_file.items():
+                digest = hashlib.sha1(json.dumps(records, sort_keys=True, default=str).encode()).hexdigest()
+                if digests.get(source_file) == digest:
+                    continue
+                self._replace_records(source_file, records)
+                self._conn.execute("INSERT OR REPLACE INTO record_sets VALUES (?, ?)", (source_file, digest))
+                changed += 1
+        return changed
+
+    def _replace_records(self, source_file, records):
+        old = [row[0] for row in self._conn.execute("SELECT record_id FROM records WHERE source_file = ?", (source_file,))]
+        self._conn.executemany("DELETE FROM records_fts WHERE rowid = ?", [(record_id,) for record_id in old])
+        self._conn.execute("DELETE FROM records WHERE source_file = ?", (source_file,))
+        for record_no, record in enumerate(records):
+            cursor = self._conn.execute(
+                "INSERT INTO records (source_file, year, record_no, data) VALUES (?, ?, ?, ?)",
+                (source_file, _year(source_file, record), record_no, json.dumps(record, ensure_ascii=False, default=str)),
+            )
+            self._conn.execute(
+                f"INSERT INTO records_fts (rowid, {', '.join(RECORD_FIELDS)}) VALUES (?{', ?' * len(RECORD_FIELDS)})",
+                (cursor.lastrowid, *(_text(record.get(field)) for field in RECORD_FIELDS)),
+            )
+
+    # --- queries ---
+    def search(self, query, limit=20, year=None, with_records=True):
+        """Ranked matches for `query` as dicts: source_file, year, score (lower is better), snippet, records."""
+        match = to_match(query)
+        year_filter, year_args = (" AND year = ?", (year,)) if year is not None else ("", ())
+        hits = {}
+        for source_file, doc_year, score, snippet in self._query(
+            f"""
+            SELECT d.source_file, d.year, bm25(documents_fts, {TITLE_WEIGHT}, 1.0),
+                   snippet(documents_fts, 1, '[', ']', '…', 12)
+            FROM documents_fts JOIN documents d ON d.doc_id = documents_fts.rowid
+            WHERE documents_fts MATCH ?{year_filter.replace('year', 'd.year')}
+            ORDER BY 3 LIMIT ?
+            """,
+            (match, *year_args, limit * 5),
+        ):
+            hits[source_file] = {"source_file": source_file, "year": doc_year, "score": score, "snippet": snippet}
+        for source_file, record_year, score in self._query(
+            f"""
+            SELECT r.source_file, r.year, bm25(records_fts)
+            FROM records_fts JOIN records r ON r.record_id = records_fts.rowid
+            WHERE records_fts MATCH ?{year_filter.replace('year', 'r.year')}
+            ORDER BY 3 LIMIT ?
+            """,
+            (match, *year_args, limit * 20),
+        ):
+            hit = hits.setdefault(source_file, {"source_file": source_file, "year": record_year, "score": 0.0, "snippet": None})
+            hit["record_score"] = min(hit.get("record_score", 0.0), score)
+        for hit in hits.values():
+            hit["score"] += hit.pop("record_score", 0.0)
+
+        ranked = sorted(hits.values(), key=lambda hit: hit["score"])[:limit]
+        if with_records:
+            for hit in ranked:
+                hit["records"] = self.records(hit["source_file"])
+        return ranked
+
+    def _query(self, sql, args):
+        try:
+            return self._conn.execute(sql, args).fetchall()
+        except sqlite3.OperationalError as e:
+            if "no such column" in str(e):  # "title:..." only exists on documents, "penalty_given:..." on records
+                return []
+            raise
+
+    def records(self, source_file):
+        return [
+            json.loads(row[0])
+            for row in self._conn.execute("SELECT data FROM records WHERE source_file = ? ORDER BY record_no", (source_file,))
+        ]
+
+    def counts(self):
+        return {
+            "documents": self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0],
+            "records": self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0],
+        }
+
+    def close(self):
+        self._conn.close()
+
+
+# --- BASELINE ---
+def linear_scan(query, raw_text_dir, csv_paths=()):
+    """What the index replaces: read every file and CSV and keep those containing all terms."""
+    import csv
+
+    terms = [term.lower() for term in re.findall(r'"([^"]+)"', to_match(query))]
+    matches = set()
+    for folder, _, files in os.walk(raw_text_dir):
+        for filename in files:
+            if filename.endswith(".txt"):
+                with open(os.path.join(folder, filename), "r", encoding="utf-8", errors="replace") as f:
+                    text = (filename + "\n" + f.read()).lower()
+                if all(term in text for term in terms):
+                    matches.add(filename)
+    for path in csv_paths:
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                text = " ".join(str(value) for value in row.values()).lower()
+                if all(term in text for term in terms):
+                    matches.add(row.get("source_file"))
+    return matches
+
+
+if __name__ == "__main__":
+    import csv
+    import glob
+    import argparse
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Search raw_text documents and their annotations.")
+    parser.add_argument("query", nargs="?", help='e.g. "pit lane speeding car 44" (FTS5 syntax also accepted)')
+    parser.add_argument("--index", default=DEFAULT_INDEX)
+    parser.add_argument("--raw-text", default=os.path.join(here, "..", "raw_text"))
+    parser.add_argument("--store", default="annotations.sqlite", help="annotation store to index, if it exists")
+    parser.add_argument("--csv", nargs="*", default=sorted(glob.glob(os.path.join(here, "anottated", "*.csv"))))
+    parser.add_argument("--year", type=int)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--no-update", action="store_true", help="query the index as it is")
+    parser.add_argument("--benchmark", action="store_true", help="compare the query with a linear scan")
+    args = parser.parse_args()
+
+    index = SearchIndex(args.index)
+    if not args.no_update:
+        start = time.perf_counter()
+        documents = index.update_documents(args.raw_text)
+        record_files = 0
+        for path in args.csv:
+            with open(path, "r", encoding="utf-8-sig", newline="") as f:
+                rows = [{COLUMN_ALIASES.get(key, key): value for key, value in row.items()} for row in csv.DictReader(f)]
+            record_files += index.update_records(rows)
+        if os.path.exists(args.store):
+            from .annotation_store import AnnotationStore
+
+            store = AnnotationStore(args.store)
+            record_files += index.update_records(store.rows())
+            store.close()
+        print(f"🗂️ Index updated in {time.perf_counter() - start:.2f}s: {documents} documents and "
+              f"{record_files} annotated files (re)indexed, {index.counts()}")
+
+    if args.query:
+        start = time.perf_counter()
+        hits = index.search(args.query, limit=args.limit, year=args.year)
+        elapsed = time.perf_counter() - start
+        print(f"🔍 {len(hits)} result(s) for {to_match(args.query)} in {elapsed * 1000:.1f} ms")
+        for hit in hits:
+            print(f"\n{hit['score']:8.2f}  {hit['source_file']}")
+            if hit["snippet"]:
+                print("          " + " ".join(hit["snippet"].split()))
+            for record in hit["records"]:
+                print(f"          - {_text(record.get('drivers_involved'))}: {record.get('penalty_given')}")
+
+        if args.benchmark:
+            runs = 20
+            start = time.perf_counter()
+            for _ in range(runs):
+                index.search(args.query, limit=args.limit, year=args.year)
+            indexed_ms = (time.perf_counter() - start) / runs * 1000
+            start = time.perf_counter()
+            scanned = linear_scan(args.query, args.raw_text, args.csv)
+            scan_ms = (time.perf_counter() - start) * 1000
+            print(f"\n⏱️ Index {indexed_ms:.1f} ms/query vs linear scan {scan_ms:.0f} ms "
+                  f"({len(scanned)} files contain every term) -> {scan_ms / indexed_ms:.0f}x")
+    index.close()
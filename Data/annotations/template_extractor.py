@@ -0,0 +1,133 @@
+import os
+import re
+
+# The annotation schema, in CSV column order (annotation_store.py appends source_file).
+FIELDS = [
+    "type_of_document", "year", "grand_prix", "description", "session_type",
+    "track", "lap_number", "turn_number", "safety_car_or_vsc_involved",
+    "penalty_given", "type_of_incident", "was_contact_made",
+    "immediate_advantage_gained", "drivers_involved", "teams_involved",
+    "rule_violated", "decision_notes",
+]
+
+# --- COMPILED PATTERNS ---
+# A stewards' decision reads "Label value" line by line. Labels may be glued to their
+# value by the PDF extraction ("InfringementBreach of ..."), but must not match words
+# that merely start with a label ("Decisions of the Stewards", "Competitors are ...").
+LABELS = ("No / Driver", "Competitor", "Time", "Session", "Fact", "Offence", "Infringement", "Decision", "Reason", "Note")
+LABEL_LINE = re.compile(r"^(%s)(?=[\s€0-9A-Z(]|$)\s*(.*)$" % "|".join(re.escape(label) for label in LABELS))
+HEADER = re.compile(r"^\s*(\d{4})\s+(.+?GRAND PRIX)\s*$", re.I | re.M)
+BODY_START = re.compile(r"determine the following:\s*$", re.M)
+BOILERPLATE = re.compile(r"^(?:Competitors are reminded|Decisions of the Stewards are taken)", re.M)
+DRIVER = re.compile(r"^\s*\d+\s*[-–]\s*(.+?)\s*$")
+LAP = re.compile(r"\blap\s+(\d+)\b", re.I)
+TURN = re.compile(r"\bturns?\s+(\d+[a-z]?(?:\s*(?:,|and|&)\s*\d+[a-z]?)*)", re.I)
+SAFETY_CAR = re.compile(r"\b(?:safety car|virtual safety car|VSC)\b", re.I)
+CONTACT = re.compile(r"\b(?:collision|collided|contact)\b", re.I)
+NO_CONTACT = re.compile(r"\bno contact\b", re.I)
+ADVANTAGE = re.compile(r"\b(?:no|without)\b[^.]{0,40}\badvantage\b|\b(gain(?:ed|ing)?)\b[^.]{0,30}\badvantage\b", re.I)
+NO_ACTION = re.compile(r"^\s*(?:no further action|no (?:other )?penalty)", re.I)
+BREACH_PREFIX = re.compile(r"^(?:alleged\s+)?breach(?:es)?\s+of\s+", re.I)
+TITLE_INCIDENT = re.compile(r"^(?:car\s+\d+|[a-z][\w\s&.'-]*team)$", re.I)
+
+
+def _clean(value):
+    return re.sub(r"\s+", " ", value).strip() or None
+
+
+def parse_sections(text):
+    """Splits the body of a templated decision into {label: [values...]} (labels can repeat)."""
+    match = BODY_START.search(text)
+    body = text[match.end():] if match else text
+    stop = BOILERPLATE.search(body)
+    if stop:
+        body = body[:stop.start()]
+
+    sections, current = {}, None
+    for line in body.splitlines():
+        found = LABEL_LINE.match(line.strip())
+        if found:
+            current = [found.group(2)]
+            sections.setdefault(found.group(1), []).append(current)
+        elif current is not None:
+            current.append(line)
+    return {label: [_clean(" ".join(lines)) for lines in values] for label, values in sections.items()}
+
+
+def _incident_from_filename(filename):
+    """'... - Offence - Car 44 - Pit lane speeding.txt' -> 'Pit lane speeding'."""
+    if not filename:
+        return None
+    title = os.path.splitext(os.path.basename(filename))[0]
+    if "_-_" in title:
+        title = title.replace("_", " ")
+    parts = [part.strip() for part in title.split(" - ")]
+    incident = parts[-1] if len(parts) > 2 else None
+    if not incident or TITLE_INCIDENT.match(incident):
+        return None
+    return incident[:1].upper() + incident[1:]
+
+
+# --- EXTRACTOR ---
+def extract_templated(text, filename=None):
+    """Fills the annotation schema from a templated Offence/Infringement/Decision document.
+
+    Returns a one-record list, or None when a required section is missing, in which case
+    the caller should fall back to the LLM.
+    """
+    header = HEADER.search(text)
+    sections = parse_sections(text)
+
+    def first(label):
+        values = sections.get(label)
+        return values[0] if values else None
+
+    fact = first("Fact")
+    decision = " ".join(v for v in sections.get("Decision", []) if v) or None
+    drivers = [m.group(1) for v in sections.get("No / Driver", []) if v and (m := DRIVER.match(v))]
+    teams = [v for v in sections.get("Competitor", []) if v]
+    if not (header and fact and decision and (drivers or teams)):
+        return None
+
+    reason = first("Reason") or ""
+    narrative = f"{fact} {reason}"
+    rule = first("Offence") or first("Infringement")
+    lap = LAP.search(narrative)
+    turn = TURN.search(fact) or TURN.search(reason)
+    advantage = ADVANTAGE.search(narrative)
+
+    record = dict.fromkeys(FIELDS)
+    record.update({
+        "type_of_document": "Stewards decision",
+        "year": int(header.group(1)),
+        "grand_prix": header.group(2).title(),
+        "description": fact,
+        "session_type": first("Session"),
+        "lap_number": int(lap.group(1)) if lap else None,
+        "turn_number": turn.group(1) if turn else None,
+        "safety_car_or_vsc_involved": "Yes" if SAFETY_CAR.search(narrative) else None,
+        "penalty_given": None if NO_ACTION.match(decision) else decision,
+        "type_of_incident": _incident_from_filename(filename) or fact,
+        "was_contact_made": "No" if NO_CONTACT.search(narrative) else ("Yes" if CONTACT.search(narrative) else None),
+        "immediate_advantage_gained": (("Yes" if advantage.group(1) else "No") if advantage else None),
+        "drivers_involved": drivers or None,
+        "teams_involved": teams or None,
+        "rule_violated": BREACH_PREFIX.sub("", rule).rstrip(".") if rule else None,
+        "decision_notes": reason or None,
+    })
+    return [record]
+
+
+if __name__ == "__main__":
+    import sys
+    import json
+    import time
+
+    for path in sys.argv[1:]:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        start = time.perf_counter()
+        records = extract_templated(text, path)
+        elapsed_us = (time.perf_counter() - start) * 1e6
+        print(f"--- {os.path.basename(path)} ({elapsed_us:.0f} µs)")
+        print(json.dumps(records, indent=2, ensure_ascii=False) if records else "❌ not templated: needs the LLM")
@@ -0,0 +1,375 @@
+import os
+import sys
+import glob
+import json
+import math
+import time
+import shutil
+import platform
+import resource
+import tempfile
+import subprocess
+from urllib.parse import quote, unquote
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+FIXTURES = os.path.join(HERE, "fixtures", "bench")
+DEFAULT_RESULTS = "benchmark_results.json"
+STAGES = ["listing", "download", "extract", "annotate", "search"]
+
+# A stage regresses when it is this much worse than the baseline (throughput, p95, peak
+# RSS or LLM calls per document); timings on a shared machine easily wobble by 10%.
+TOLERANCE = 0.20
+
+# Same selectors as panels.py, applied to a saved (already expanded) season page.
+PANEL_SELECTOR = ".decision-document-list > ul"
+DOCUMENT_LINK_SELECTOR = "a[href*='/decision-document/']"
+
+SEARCH_QUERIES = [
+    "collision", "track limits", "unsafe release", "car 44", "grid penalty", "pit lane speeding",
+    "yellow flag", "impeding", "reprimand", "safety car", "power unit", "parc ferme",
+    "Verstappen", "Hamilton", "Ferrari", "Monaco", "Article 33.4", "drive through", "technical delegate", "tyres",
+]
+
+
+# --- FIXTURES (regenerate with --make-fixtures; the output is checked in) ---
+def _pdf_string(line):
+    line = line.encode("latin-1", "replace").decode("latin-1")
+    return "(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def make_pdf(path, lines):
+    """Writes a minimal one-page PDF (Helvetica, no compression) holding `lines`, byte-for-byte reproducible."""
+    content = "BT /F1 9 Tf 40 800 Td 11 TL " + " ".join(f"{_pdf_string(line)} '" for line in lines) + " ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R "
+        "/Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(content.encode('latin-1'))} >>\nstream\n{content}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    out, offsets = "%PDF-1.4\n", []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out.encode("latin-1")))
+        out += f"{number} 0 obj\n{body}\nendobj\n"
+    xref = len(out.encode("latin-1"))
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n" + "".join(f"{o:010d} 00000 n \n" for o in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    with open(path, "w", encoding="latin-1", newline="\n") as f:
+        f.write(out)
+
+
+def make_fixtures(per_year=18, years=(2024, 2025), pdf_lines=70):
+    """Samples every n-th raw_text document of each year and builds the PDFs and listing page from them."""
+    shutil.rmtree(FIXTURES, ignore_errors=True)
+    pdf_dir = os.path.join(FIXTURES, "decision-document")
+    os.makedirs(pdf_dir)
+    panels = {}
+    for year in years:
+        source = os.path.join(HERE, "raw_text", str(year))
+        files = sorted(f for f in os.listdir(source) if f.endswith(".txt"))
+        sample = files[::max(1, len(files) // per_year)][:per_year]
+        target = os.path.join(FIXTURES, "raw_text", str(year))
+        os.makedirs(target)
+        for filename in sample:
+            shutil.copyfile(os.path.join(source, filename), os.path.join(target, filename))
+            with open(os.path.join(source, filename), "r", encoding="utf-8") as f:
+                lines = [line.strip() for line in f if line.strip()][:pdf_lines]
+            pdf_name = os.path.splitext(filename)[0] + ".pdf"
+            make_pdf(os.path.join(pdf_dir, pdf_name), lines)
+            grand_prix = filename.split(" - ")[0]
+            panels.setdefault(grand_prix, []).append(pdf_name)
+
+    items = []
+    for grand_prix, pdf_names in panels.items():
+        links = "".join(
+            f'<li><a href="/decision-document/{quote(name)}"><div class="title">{os.path.splitext(name)[0]}</div></a></li>'
+            for name in pdf_names
+        )
+        items.append(f'<ul><li class="event-title">{grand_prix}</li>{links}</ul>')
+    with open(os.path.join(FIXTURES, "listing.html"), "w", encoding="utf-8") as f:
+        f.write(
+            '<!DOCTYPE html>\n<html lang="en"><head><meta charset="utf-8"><title>FIA Documents - saved listing</title>'
+            "</head><body>\n<!-- Saved season listing with every GP panel expanded (benchmark.py fixture). -->\n"
+            '<div class="decision-document-list">\n' + "\n".join(items) + "\n</div></body></html>\n"
+        )
+    print(f"🧪 Fixtures: {sum(map(len, panels.values()))} documents in {len(panels)} GP panels under {FIXTURES}")
+
+
+def parse_listing(html):
+    """(grand_prix, title, href) for every document link of a saved season page."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    documents = []
+    for panel in soup.select(PANEL_SELECTOR):
+        title = panel.select_one(".event-title")
+        grand_prix = title.get_text(strip=True) if title else None
+        for link in panel.select(DOCUMENT_LINK_SELECTOR):
+            label = link.select_one(".title") or link
+            documents.append((grand_prix, label.get_text(strip=True), link["href"]))
+    return documents
+
+
+# --- STAGES: each returns (documents handled, per-item latencies in seconds, extra figures) ---
+def bench_listing(work_dir, options):
+    import bs4  # noqa: F401  (imported up front so the first run does not time the import)
+
+    with open(os.path.join(FIXTURES, "listing.html"), "r", encoding="utf-8") as f:
+        html = f.read()
+    start = time.perf_counter()
+    documents = parse_listing(html)
+    return len(documents), [time.perf_counter() - start], {}
+
+
+def bench_download(work_dir, options):
+    from fixture_server import serve_fixtures
+    from downloader import download_all
+    from metrics import METRICS
+
+    server, base_url = serve_fixtures(FIXTURES, delay=options["http_delay"])
+    try:
+        with open(os.path.join(FIXTURES, "listing.html"), "r", encoding="utf-8") as f:
+            documents = parse_listing(f.read())
+        jobs = [
+            (base_url + href, os.path.join(work_dir, "pdfs", grand_prix, unquote(href.rsplit("/", 1)[1])), title)
+            for grand_prix, title, href in documents
+        ]
+        stats = download_all(jobs, max_workers=options["download_workers"])
+    finally:
+        server.shutdown()
+        server.server_close()
+    return stats["files"], METRICS.samples("download"), {"failed": stats["failed"], "bytes": stats["bytes"]}
+
+
+def bench_extract(work_dir, options):
+    from raw_text.PDF2TXT import convert_all_pdfs
+    from metrics import METRICS
+
+    summary = convert_all_pdfs(
+        os.path.join(FIXTURES, "decision-document"), os.path.join(work_dir, "raw_text"), workers=options["workers"]
+    )
+    return summary["converted"], METRICS.samples("extract"), {"failed": len(summary["failed"])}
+
+
+_MOCK_LLM = []  # one mock server per process: annotator.py binds its client to it on import
+
+
+def bench_annotate(work_dir, options):
+    from annotations import mock_llm_server
+
+    if not _MOCK_LLM:
+        # Answers are the recorded anottated/ CSV records of each fixture document
+        replay = mock_llm_server.ReplayBook(
+            sorted(glob.glob(os.path.join(HERE, "annotations", "anottated", "*.csv"))), os.path.join(FIXTURES, "raw_text")
+        )
+        server, base_url = mock_llm_server.serve_mock_llm(
+            delay=options["llm_delay"], replay=replay, malformed_rate=options["malformed_rate"]
+        )
+        _MOCK_LLM.append(server)
+        os.environ["LLM_BACKEND"], os.environ["LLM_BASE_URL"] = "ollama", base_url
+    from annotations.annotator import process_folder
+    from annotations.annotation_store import AnnotationStore
+    from annotations.dedup import DedupIndex
+    from metrics import METRICS
+
+    calls_before = _MOCK_LLM[0].calls
+    store = AnnotationStore(os.path.join(work_dir, "annotations.sqlite"))
+    dedup = DedupIndex(os.path.join(work_dir, "dedup.sqlite"))
+    documents = 0
+    try:
+        for year in sorted(os.listdir(os.path.join(FIXTURES, "raw_text"))):
+            folder = os.path.join(FIXTURES, "raw_text", year)
+            documents += len(os.listdir(folder))
+            process_folder(folder, store, max_in_flight=options["in_flight"], batch_tokens=2000, dedup=dedup)
+    finally:
+        store.close()
+        dedup.close()
+    calls = _MOCK_LLM[0].calls - calls_before
+    return documents, METRICS.samples("request"), {
+        "llm_calls": calls,
+        "llm_calls_per_doc": calls / documents if documents else 0.0,
+        "prompt_tokens_per_doc": METRICS.counter("llm.prompt_tokens") / documents if documents else 0.0,
+    }
+
+
+def bench_search(work_dir, options):
+    from annotations.search_index import SearchIndex
+
+    index = SearchIndex(os.path.join(work_dir, "search_index.sqlite"))
+    try:
+        index.update_documents(os.path.join(FIXTURES, "raw_text"))
+        latencies = []
+        for _ in range(options["query_rounds"]):
+            for query in SEARCH_QUERIES:
+                start = time.perf_counter()
+                index.search(query, limit=20, with_records=False)
+                latencies.append(time.perf_counter() - start)
+    finally:
+        index.close()
+    return len(latencies), latencies, {}
+
+
+BENCHES = {
+    "listing": bench_listing,
+    "download": bench_download,
+    "extract": bench_extract,
+    "annotate": bench_annotate,
+    "search": bench_search,
+}
+
+
+# --- MEASUREMENT ---
+def percentile(values, q):
+    """Nearest-rank percentile (q in 0..100) of `values`; 0.0 when empty."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def run_stage(name, options):
+    """Runs one stage `repeat` times in this process (fresh work folder each time) and returns its figures."""
+    from metrics import METRICS
+
+    METRICS.keep_samples = True
+    walls, latencies, items, extra = [], [], 0, {}
+    for _ in range(options["repeat"]):
+        METRICS.reset()
+        work_dir = tempfile.mkdtemp(prefix=f"bench-{name}-")
+        try:
+            start = time.perf_counter()
+            items, samples, extra = BENCHES[name](work_dir, options)
+            walls.append(time.perf_counter() - start)
+            latencies.extend(samples)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    wall = sorted(walls)[len(walls) // 2]  # median run
+    return dict({
+        "items": items,
+        "seconds": wall,
+        "per_s": items / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "samples": len(latencies),
+        # ru_maxrss is in KiB on Linux; the children figure covers conversion worker processes
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "children_peak_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }, **extra)
+
+
+def run_all(stages, options, verbose=False):
+    """Runs every stage in its own interpreter, so peak RSS and imports are per stage."""
+    results = {}
+    for name in stages:
+        with tempfile.NamedTemporaryFile("r", suffix=".json", delete=False) as handle:
+            result_path = handle.name
+        command = [sys.executable, os.path.abspath(__file__), "--stage-worker", name, "--result-file", result_path,
+                   "--options", json.dumps(options)]
+        completed = subprocess.run(command, cwd=HERE, stdout=None if verbose else subprocess.DEVNULL,
+                                   stderr=None if verbose else subprocess.PIPE, text=True)
+        try:
+            if completed.returncode != 0:
+                results[name] = {"error": (completed.stderr or "").strip().splitlines()[-1:] or ["failed"]}
+                print(f"❌ {name}: {results[name]['error'][0]}")
+                continue
+            with open(result_path, "r", encoding="utf-8") as f:
+                results[name] = json.load(f)
+        finally:
+            os.remove(result_path)
+        r = results[name]
+        print(f"⏱️ {name:<9} {r['items']:>5} items  {r['seconds']:>7.2f}s  {r['per_s']:>8.1f}/s  "
+              f"p50 {r['p50_ms']:>8.2f}ms  p95 {r['p95_ms']:>8.2f}ms  peak RSS {r['peak_rss_mb']:>6.0f}MB"
+              + (f"  {r['llm_calls_per_doc']:.2f} LLM calls/doc" if "llm_calls_per_doc" in r else ""))
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Lists regressions of `results` against `baseline` (both as written by this script)."""
+    regressions = []
+    for name, current in results["stages"].items():
+        previous = baseline.get("stages", {}).get(name)
+        if not previous or "error" in previous or "error" in current:
+            continue
+        checks = [
+            ("per_s", current["per_s"] < previous["per_s"] * (1 - tolerance)),
+            ("p95_ms", current["p95_ms"] > previous["p95_ms"] * (1 + tolerance)),
+            ("peak_rss_mb", current["peak_rss_mb"] > previous["peak_rss_mb"] * (1 + tolerance)),
+            ("llm_calls_per_doc", current.get("llm_calls_per_doc", 0) > previous.get("llm_calls_per_doc", 0) + 1e-9),
+        ]
+        for metric, worse in checks:
+            if worse:
+                regressions.append((name, metric, previous.get(metric), current.get(metric)))
+    return regressions
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on the checked-in fixture corpus.")
+    parser.add_argument("--stages", nargs="*", default=STAGES, choices=STAGES)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage; the median run is reported")
+    parser.add_argument("--out", default=DEFAULT_RESULTS, help="where to write this run's results (JSON)")
+    parser.add_argument("--baseline", help="results JSON to compare against; exits 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--llm-delay", type=float, default=0.05, help="seconds the mock LLM takes per request")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="share of mock LLM answers with broken JSON")
+    parser.add_argument("--http-delay", type=float, default=0.01, help="seconds the fixture server takes per file")
+    parser.add_argument("--workers", type=int, default=1, help="PDF conversion processes")
+    parser.add_argument("--verbose", action="store_true", help="show the stages' own output")
+    parser.add_argument("--make-fixtures", action="store_true", help="rebuild fixtures/bench from raw_text and exit")
+    parser.add_argument("--stage-worker", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    parser.add_argument("--options", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.make_fixtures:
+        make_fixtures()
+        sys.exit(0)
+
+    if args.stage_worker:
+        result = run_stage(args.stage_worker, json.loads(args.options))
+        with open(args.result_file, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        sys.exit(0)
+
+    options = {
+        "repeat": args.repeat,
+        "llm_delay": args.llm_delay,
+        "malformed_rate": args.malformed_rate,
+        "http_delay": args.http_delay,
+        "workers": args.workers,
+        "download_workers": 8,
+        "in_flight": 4,
+        "query_rounds": 5,
+    }
+    results = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} CPUs)",
+        "options": options,
+        "stages": run_all(args.stages, options, verbose=args.verbose),
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Results written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, metric, before, after in regressions:
+            print(f"🔻 {name}: {metric} {before:.2f} -> {after:.2f}")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ No regressions against {args.baseline} (commit {baseline.get('commit')})")
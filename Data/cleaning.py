@@ -0,0 +1,285 @@
+import os
+import re
+import ast
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from annotations.annotation_store import COLUMN_ALIASES
+
+LIST_COLUMNS = ["drivers_involved", "teams_involved"]
+MOJIBAKE = re.compile(r"[ÃÂâ][\x80-\xbf€‚ƒ„…†‡ˆ‰Š‹ŒŽ‘’“”•–—˜™š›œžŸ¡-¿]")
+
+# --- ENTITY TABLES ---
+# driver_id, display name, three-letter code, race number per season (a tuple when a reserve raced
+# under several in one season), extra spellings seen in the LLM output.
+DRIVERS = [
+    ("max_verstappen", "Max Verstappen", "VER", {2022: 1, 2023: 1, 2024: 1, 2025: 1}, []),
+    ("sergio_perez", "Sergio Perez", "PER", {2022: 11, 2023: 11, 2024: 11}, []),
+    ("lewis_hamilton", "Lewis Hamilton", "HAM", {2022: 44, 2023: 44, 2024: 44, 2025: 44}, []),
+    ("george_russell", "George Russell", "RUS", {2022: 63, 2023: 63, 2024: 63, 2025: 63}, []),
+    ("charles_leclerc", "Charles Leclerc", "LEC", {2022: 16, 2023: 16, 2024: 16, 2025: 16}, []),
+    ("carlos_sainz", "Carlos Sainz", "SAI", {2022: 55, 2023: 55, 2024: 55, 2025: 55}, []),
+    ("lando_norris", "Lando Norris", "NOR", {2022: 4, 2023: 4, 2024: 4, 2025: 4}, []),
+    ("oscar_piastri", "Oscar Piastri", "PIA", {2023: 81, 2024: 81, 2025: 81}, ["piastrini", "piastrti", "piatri", "piatristi", "piatrzi"]),
+    ("daniel_ricciardo", "Daniel Ricciardo", "RIC", {2022: 3, 2023: 3, 2024: 3}, []),
+    ("fernando_alonso", "Fernando Alonso", "ALO", {2022: 14, 2023: 14, 2024: 14, 2025: 14}, []),
+    ("lance_stroll", "Lance Stroll", "STR", {2022: 18, 2023: 18, 2024: 18, 2025: 18}, []),
+    ("sebastian_vettel", "Sebastian Vettel", "VET", {2022: 5}, []),
+    ("esteban_ocon", "Esteban Ocon", "OCO", {2022: 31, 2023: 31, 2024: 31, 2025: 31}, []),
+    ("pierre_gasly", "Pierre Gasly", "GAS", {2022: 10, 2023: 10, 2024: 10, 2025: 10}, []),
+    ("yuki_tsunoda", "Yuki Tsunoda", "TSU", {2022: 22, 2023: 22, 2024: 22, 2025: 22}, ["yuki toda"]),
+    ("valtteri_bottas", "Valtteri Bottas", "BOT", {2022: 77, 2023: 77, 2024: 77}, []),
+    ("zhou_guanyu", "Zhou Guanyu", "ZHO", {2022: 24, 2023: 24, 2024: 24}, ["guanyu"]),
+    ("kevin_magnussen", "Kevin Magnussen", "MAG", {2022: 20, 2023: 20, 2024: 20}, ["magnusson", "magnusussen"]),
+    ("mick_schumacher", "Mick Schumacher", "MSC", {2022: 47}, []),
+    ("nico_hulkenberg", "Nico Hulkenberg", "HUL", {2022: 27, 2023: 27, 2024: 27, 2025: 27}, []),
+    ("alexander_albon", "Alexander Albon", "ALB", {2022: 23, 2023: 23, 2024: 23, 2025: 23}, ["albion"]),
+    ("nicholas_latifi", "Nicholas Latifi", "LAT", {2022: 6}, []),
+    ("nyck_de_vries", "Nyck de Vries", "DEV", {2022: 45, 2023: 21}, ["de vries"]),
+    ("logan_sargeant", "Logan Sargeant", "SAR", {2023: 2, 2024: 2}, []),
+    ("liam_lawson", "Liam Lawson", "LAW", {2023: 40, 2024: 30, 2025: 30}, []),
+    ("franco_colapinto", "Franco Colapinto", "COL", {2024: 43, 2025: 43}, ["franko colapinto"]),
+    ("oliver_bearman", "Oliver Bearman", "BEA", {2024: (38, 50), 2025: 87}, []),
+    ("jack_doohan", "Jack Doohan", "DOO", {2024: 61, 2025: 7}, ["dohan"]),
+    ("kimi_antonelli", "Andrea Kimi Antonelli", "ANT", {2025: 12}, ["antonelli"]),
+    ("gabriel_bortoleto", "Gabriel Bortoleto", "BOR", {2025: 5}, ["bortoletto"]),
+    ("isack_hadjar", "Isack Hadjar", "HAD", {2025: 6}, ["isack haddad"]),
+]
+
+# First matching pattern wins: Red Bull Racing must be tested before the junior team.
+TEAMS = [
+    ("red_bull", r"oracle red bull|red bull racing|^red bull$"),
+    ("rb", r"racing bulls|visa cash app|cash app rb|\brb f1\b|^rb$|alphatauri|bulls f1"),
+    ("ferrari", r"ferrari"),
+    ("mercedes", r"mercedes"),
+    ("mclaren", r"mclaren"),
+    ("alpine", r"alpine"),
+    ("aston_martin", r"aston martin"),
+    ("williams", r"williams"),
+    ("sauber", r"sauber|alfa romeo|stake f1"),
+    ("haas", r"haas"),
+]
+
+
+def _fold(text):
+    """Lowercase ASCII form used for matching ('Hülkenberg' -> 'hulkenberg')."""
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+
+
+def _build_name_patterns():
+    patterns = []
+    for driver_id, name, code, _, extra in DRIVERS:
+        spellings = {_fold(name), _fold(name.split()[-1])} | {_fold(e) for e in extra}
+        patterns.append((driver_id, re.compile(r"\b(?:%s)\b" % "|".join(map(re.escape, sorted(spellings))))))
+        patterns.append((driver_id, re.compile(r"^\s*%s\s*$" % code.lower())))
+    return patterns
+
+
+NAME_PATTERNS = _build_name_patterns()
+CAR_NUMBERS = {
+    f"{year}:{number}": driver_id
+    for driver_id, _, _, numbers, _ in DRIVERS
+    for year, season in numbers.items()
+    for number in (season if isinstance(season, tuple) else (season,))
+}
+TEAM_PATTERNS = [(team_id, re.compile(pattern)) for team_id, pattern in TEAMS]
+DRIVER_NAMES = {driver_id: name for driver_id, name, _, _, _ in DRIVERS}
+
+
+# --- PER-UNIQUE-VALUE HELPERS ---
+# Row counts grow with every season but distinct strings grow far slower, so string work
+# runs once per distinct value and the result is broadcast back with a vectorized take.
+def map_unique(series, func):
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    if len(uniques) == 0:
+        return pd.Series([None] * len(series), index=series.index, dtype=object)
+    values = np.empty(len(uniques) + 1, dtype=object)
+    values[:-1] = [func(value) for value in uniques]
+    values[-1] = None  # code -1 (missing) picks the trailing None
+    return pd.Series(values[codes], index=series.index, dtype=object)
+
+
+def fix_mojibake_text(text):
+    """'SÃ£o Paulo' -> 'São Paulo', 'â‚¬500' -> '€500' (UTF-8 read as cp1252); other text unchanged."""
+    if not isinstance(text, str) or not MOJIBAKE.search(text):
+        return text
+    for codec in ("cp1252", "latin-1"):
+        try:
+            return text.encode(codec).decode("utf-8")
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            continue
+    return text
+
+
+def parse_list_text(value):
+    """"['A', 'B']" / "A, B" / "{'driver': 'A'}" -> ['A', 'B'] (None when empty)."""
+    if isinstance(value, list):
+        items = value
+    elif not isinstance(value, str) or not value.strip() or value.strip().lower() in ("none", "null", "nan", "[]"):
+        return None
+    else:
+        try:
+            items = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            items = value
+        if isinstance(items, dict):
+            items = [" ".join(str(v) for v in items.values())]
+        elif not isinstance(items, (list, tuple)):
+            items = [str(items)]
+    items = [str(item).strip() for item in items if str(item).strip() and str(item).strip().lower() != "none"]
+    return items or None
+
+
+def resolve_driver_name(text):
+    """Driver id from a free-text mention without car numbers; None if no known driver."""
+    folded = _fold(text)
+    for driver_id, pattern in NAME_PATTERNS:
+        if pattern.search(folded):
+            return driver_id
+    return None
+
+
+def resolve_team(text):
+    folded = _fold(text)
+    for team_id, pattern in TEAM_PATTERNS:
+        if pattern.search(folded):
+            return team_id
+    return None
+
+
+def explode_mentions(lists):
+    """List column -> one stripped mention per row ("A and B", "A & B", "A, B" split), keeping the row index."""
+    items = lists.explode().dropna().astype(str)
+    mentions = items.str.split(r",|&|\band\b", regex=True).explode().str.strip()
+    return mentions[mentions != ""]
+
+
+def collect_ids(ids, index):
+    """Exploded ids -> sorted list of distinct ids per row of `index` (NaN where none resolved)."""
+    pairs = pd.DataFrame({"row": ids.index, "id": ids.to_numpy()}).drop_duplicates().sort_values(["row", "id"])
+    return pairs.groupby("row")["id"].agg(list).reindex(index)
+
+
+# --- VECTORIZED STEPS ---
+def fix_columns(df):
+    df = df.loc[:, [c for c in df.columns if not str(c).startswith("Unnamed")]]
+    # Seasons written with and without the typo both survive the concat: fold them together.
+    for typo, fixed in COLUMN_ALIASES.items():
+        if typo in df.columns and fixed in df.columns:
+            df[fixed] = df[fixed].fillna(df.pop(typo))
+    return df.rename(columns=COLUMN_ALIASES)
+
+
+def fix_encoding(df):
+    for column in df.columns:
+        if df[column].dtype == object or pd.api.types.is_string_dtype(df[column]):
+            df[column] = map_unique(df[column], fix_mojibake_text).where(df[column].notna(), None)
+    return df
+
+
+def resolve_entities(df):
+    """Adds driver_ids / team_ids list columns resolved through the lookup tables.
+
+    Mentions are exploded to one row each; car numbers ("Car 44", "44 - Lewis Hamilton")
+    are looked up per season, names and codes through the precomputed name patterns.
+    """
+    season = df["year"].astype("Int16").astype(str)
+    mentions = explode_mentions(df["drivers_involved"])
+    numbers = mentions.str.extract(r"^(?:driver of\s+)?(?:car|cars|number|driver)?\s*#?(\d{1,2})\b", flags=re.I)[0]
+    numbers = numbers.astype(str)  # a str column even when no row mentions a car number
+    by_number = (season.reindex(mentions.index) + ":" + numbers).map(CAR_NUMBERS)
+    by_name = map_unique(mentions, resolve_driver_name)
+    driver_ids = by_name.fillna(by_number).dropna()
+
+    team_ids = map_unique(explode_mentions(df["teams_involved"]), resolve_team).dropna()
+
+    df["driver_ids"] = collect_ids(driver_ids, df.index)
+    df["team_ids"] = collect_ids(team_ids, df.index)
+    return df
+
+
+def parse_penalties(df):
+    """Numeric and flag columns parsed from penalty_given with vectorized str.extract/contains."""
+    text = df["penalty_given"].fillna("").astype(str)
+    lower = text.str.lower()
+
+    amount = text.str.extract(r"(?:€\s*|\beur(?:os?)?\s*)(\d[\d,.\s]*\d|\d)|(\d[\d,.\s]*\d|\d)\s*(?:€|euros?\b|eur\b)", flags=re.I)
+    amount = amount[0].fillna(amount[1]).str.replace(r"[,.\s](?=\d{3}\b)", "", regex=True).str.replace(",", ".")
+    df["fine_eur"] = pd.to_numeric(amount, errors="coerce")
+    df["fine_suspended"] = df["fine_eur"].notna() & lower.str.contains("suspended")
+
+    df["time_penalty_s"] = pd.to_numeric(
+        lower.str.extract(r"(\d+)[\s-]*(?:seconds?|secs?|s)\b(?![^.;]*stop)")[0], errors="coerce"
+    )
+    df["stop_go_s"] = pd.to_numeric(lower.str.extract(r"(\d+)[\s-]*seconds?\s+stop[\s-]*(?:and|&)?[\s-]*go")[0], errors="coerce")
+    df["drive_through"] = lower.str.contains(r"drive[\s-]*through")
+    grid = lower.str.extract(r"(\d+)[\s-]*(?:grid\s+)?(?:place|position)s?\b|grid\s+(?:drop\s+of\s+)?(\d+)")
+    df["grid_places"] = pd.to_numeric(grid[0].fillna(grid[1]).where(lower.str.contains("grid")), errors="coerce")
+    df["back_of_grid"] = lower.str.contains(r"back of the (?:starting )?grid")
+    df["pit_lane_start"] = lower.str.contains(r"start(?:ing)?(?: the race)? from (?:the )?pit ?lane|pit ?lane start")
+    df["penalty_points"] = pd.to_numeric(lower.str.extract(r"(\d+)\s*penalty\s*points?")[0], errors="coerce")
+    df["lap_time_deleted"] = lower.str.contains(r"delet(?:ed|ion)")
+    df["reprimand"] = lower.str.contains("reprimand")
+    df["disqualified"] = lower.str.contains(r"disqualif")
+    df["no_further_action"] = lower.str.contains(r"no further action")
+    return df
+
+
+def fix_types(df):
+    title_year = df["source_file"].astype(str).str.extract(r"^((?:19|20)\d{2})")[0]
+    year = pd.to_numeric(df["year"], errors="coerce")
+    df["year"] = year.fillna(pd.to_numeric(title_year, errors="coerce")).astype("Int16")
+    df["lap_number"] = pd.to_numeric(
+        df["lap_number"].astype(str).str.extract(r"(\d+)")[0], errors="coerce"
+    ).astype("Int16")
+    for column in LIST_COLUMNS:
+        df[column] = map_unique(df[column], parse_list_text)
+    return df
+
+
+# --- PIPELINE ---
+def clean(df):
+    """Full cleaning pass: column typos, encoding, types, list columns, entities, penalties."""
+    df = fix_columns(df.copy())
+    df = fix_encoding(df)
+    df = fix_types(df)
+    df = resolve_entities(df)
+    return parse_penalties(df)
+
+
+def penalties(df):
+    """The notebook's filter: rows that describe a penalty."""
+    return df[df["penalty_given"].notna() & df["description"].notna()].copy()
+
+
+def load_seasons(paths):
+    """Reads the per-season CSVs and cleans them together in one pass."""
+    frames = [pd.read_csv(path, encoding="utf-8-sig", dtype=str) for path in paths]
+    return clean(pd.concat(frames, ignore_index=True, sort=False))
+
+
+if __name__ == "__main__":
+    import glob
+    import time
+    import argparse
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Clean and unify the per-season annotation CSVs.")
+    parser.add_argument("csvs", nargs="*", default=sorted(glob.glob(os.path.join(here, "annotations", "anottated", "*.csv"))))
+    parser.add_argument("--out", default="penalties_clean.csv")
+    parser.add_argument("--all-rows", action="store_true", help="keep rows without a penalty")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = load_seasons(args.csvs)
+    if not args.all_rows:
+        df = penalties(df)
+    elapsed = time.perf_counter() - start
+
+    unresolved = df["drivers_involved"].notna() & df["driver_ids"].isna()
+    print(f"🧹 {len(df)} rows from {len(args.csvs)} files cleaned in {elapsed * 1000:.0f} ms "
+          f"({unresolved.sum()} rows with drivers that did not resolve)")
+    df.to_csv(args.out, index=False)
+    print(f"💾 Saved to {args.out}")
@@ -0,0 +1,240 @@
+import os
+import time
+import hashlib
+import random
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import METRICS
+from paths import local_path
+
+BASE_URL = "https://www.fia.com"
+CHUNK_SIZE = 64 * 1024  # bytes written per streamed chunk
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+# --- SESSION: one keep-alive connection pool shared by every worker ---
+def make_session(pool_size=8):
+    """Creates a requests session whose connection pool can serve `pool_size` workers at once."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# --- PER-HOST LIMITER ---
+class HostLimiter:
+    """Caps the number of in-flight requests per host, independent of the worker count."""
+
+    def __init__(self, per_host=4):
+        self.per_host = per_host
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    def for_url(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.per_host)
+            return self._semaphores[host]
+
+
+# --- RUN-WIDE RATE LIMIT ---
+class RateLimiter:
+    """Thread-safe token bucket: at most `rate` requests per second (bursts up to `burst`).
+
+    One instance is shared by every browser and download worker of a run, so scraping
+    several seasons at once still presents a single polite client to the FIA site.
+    """
+
+    def __init__(self, rate=5.0, burst=5):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# --- FUNCTION: Download one file (streamed) with retries ---
+def download_file(
+    session, url, file_path, limiter=None, retries=3, backoff=1.0, timeout=30, headers=None, rate_limiter=None
+):
+    """Streams `url` to `file_path` in chunks and returns a dict describing the response.
+
+    The body goes to a `.part` file first and is only renamed into place once complete,
+    so an interrupted run never leaves a truncated PDF behind. The final name comes from
+    `paths.local_path`: a title too long to keep is shortened with a content-hash suffix
+    here, once, and result["path"] says where the file went. A 304 reply to a
+    conditional request leaves the existing file untouched.
+    """
+    if retries < 1:
+        raise ValueError(f"retries must be at least 1 (one attempt), got {retries}")
+    # Named after the URL, not the title, so the temporary file is short on every OS too
+    tmp_path = os.path.join(os.path.dirname(file_path), "." + hashlib.sha1(url.encode()).hexdigest()[:16] + ".part")
+    last_error = None
+
+    for attempt in range(retries):
+        if attempt:
+            METRICS.inc("download.retries")
+        semaphore = limiter.for_url(url) if limiter else None
+        if rate_limiter:
+            with METRICS.timer("download.rate_wait"):
+                rate_limiter.acquire()
+        start = time.perf_counter()
+        try:
+            if semaphore:
+                semaphore.acquire()
+                start = time.perf_counter()  # the per-host wait is not download time
+            try:
+                with session.get(url, stream=True, timeout=timeout, headers=headers) as r:
+                    if r.status_code in RETRY_STATUS:
+                        raise requests.HTTPError(f"HTTP {r.status_code}", response=r)
+                    r.raise_for_status()
+
+                    result = {
+                        "status": r.status_code,
+                        "bytes": 0,
+                        "etag": r.headers.get("ETag"),
+                        "last_modified": r.headers.get("Last-Modified"),
+                        "sha256": None,
+                        "path": None,
+                    }
+                    if r.status_code == 304:
+                        METRICS.observe("download", time.perf_counter() - start, outcome="not_modified")
+                        return result
+
+                    digest = hashlib.sha256()
+                    with open(tmp_path, "wb") as f:
+                        for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                            f.write(chunk)
+                            digest.update(chunk)
+                            result["bytes"] += len(chunk)
+                    result["sha256"] = digest.hexdigest()
+            finally:
+                if semaphore:
+                    semaphore.release()
+
+            result["path"] = local_path(file_path, result["sha256"])
+            os.replace(tmp_path, result["path"])
+            METRICS.observe("download", time.perf_counter() - start, outcome="ok")
+            METRICS.inc("download.bytes", result["bytes"])
+            return result
+
+        except requests.RequestException as e:
+            last_error = e
+            status = getattr(e.response, "status_code", None)
+            METRICS.observe("download", time.perf_counter() - start, outcome="error")
+            METRICS.inc("download.errors", status=status or type(e).__name__)
+            if status is not None and status not in RETRY_STATUS:
+                break  # 404 and friends will not get better by retrying
+            if attempt < retries - 1:
+                time.sleep(backoff * (2 ** attempt) + random.uniform(0, backoff))
+
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    raise last_error
+
+
+# --- MAIN DOWNLOADER ---
+def download_all(
+    jobs, max_workers=8, per_host=4, retries=3, backoff=1.0, manifest=None, revalidate=False, rate_limiter=None
+):
+    """Downloads every `(url, file_path, title)` job on a bounded thread pool and returns throughput stats.
+
+    With a `manifest`, documents already on disk are skipped; `revalidate=True` instead
+    re-checks them with a conditional GET and only rewrites files the server reports changed.
+    A shared `rate_limiter` caps the request rate across every worker. stats["paths"] maps
+    each downloaded URL to the file it was stored as (see `download_file`); the manifest
+    also records it against the document's original title, so `Manifest.path_for(title)`
+    finds it. A `(url, file_path)` job without a title falls back to the file name stem.
+    """
+    jobs = list(jobs)
+    session = make_session(pool_size=max_workers)
+    limiter = HostLimiter(per_host=per_host)
+
+    downloaded, skipped, not_modified, total_bytes, failed, paths = 0, 0, 0, 0, [], {}
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+        for job in jobs:
+            url, file_path = job[:2]
+            title = job[2] if len(job) > 2 else os.path.splitext(os.path.basename(file_path))[0]
+            headers = None
+            if manifest is not None and manifest.is_current(url, file_path):
+                if not revalidate:
+                    skipped += 1
+                    continue
+                headers = manifest.conditional_headers(url)
+
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            future = pool.submit(
+                download_file, session, url, file_path, limiter, retries, backoff, 30, headers, rate_limiter
+            )
+            futures[future] = (url, file_path, title)
+
+        for future in as_completed(futures):
+            url, file_path, title = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failed.append(url)
+                print(f"❌ Failed: {url} — {e}")
+                continue
+
+            if result["status"] == 304:
+                not_modified += 1
+                if manifest is not None:
+                    manifest.touch(url)
+                continue
+
+            total_bytes += result["bytes"]
+            downloaded += 1
+            paths[url] = result["path"]
+            if manifest is not None:
+                previous = manifest.get(url)
+                if previous and previous["local_path"] != result["path"] and os.path.exists(previous["local_path"]):
+                    os.remove(previous["local_path"])  # changed on revalidation: the old copy is stale
+                manifest.record(
+                    url, result["path"], result["etag"], result["last_modified"], result["bytes"], result["sha256"],
+                    title=title,
+                )
+            print(f"⬇️ Downloaded: {result['path']}")
+
+    session.close()
+    elapsed = time.perf_counter() - start
+    stats = {
+        "files": downloaded,
+        "skipped": skipped,
+        "not_modified": not_modified,
+        "failed": len(failed),
+        "bytes": total_bytes,
+        "seconds": elapsed,
+        "files_per_s": downloaded / elapsed if elapsed else 0.0,
+        "mb_per_s": total_bytes / (1024 * 1024) / elapsed if elapsed else 0.0,
+        "failed_urls": failed,
+        "paths": paths,
+    }
+    print(
+        f"\n📊 {downloaded} files, {total_bytes / (1024 * 1024):.1f} MB in {elapsed:.1f}s "
+        f"({stats['files_per_s']:.1f} files/s, {stats['mb_per_s']:.2f} MB/s), "
+        f"{skipped} skipped, {not_modified} not modified, {len(failed)} failed"
+    )
+    return stats
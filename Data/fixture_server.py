@@ -0,0 +1,63 @@
+import os
+import time
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+
+# --- LOCAL STAND-IN FOR www.fia.com ---
+# Serves a folder of fixture PDFs over HTTP so the downloader can be exercised
+# (and timed) without touching the FIA site. `delay` simulates round-trip latency.
+class FixtureServer(ThreadingHTTPServer):
+    """The HTTP server plus what its handlers share: planned errors and a log of the requests."""
+
+    def __init__(self, address, handler, errors=None):
+        super().__init__(address, handler)
+        self.lock = threading.Lock()
+        self.errors = {path: list(statuses) for path, statuses in (errors or {}).items()}
+        self.requests = []  # (path, headers) of every GET, e.g. to check conditional requests
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    delay = 0.0
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests.append((self.path, dict(self.headers)))
+            planned = self.server.errors.get(self.path)
+            status = planned.pop(0) if planned else None
+        if self.delay:
+            time.sleep(self.delay)
+        if status:
+            self.send_error(status)
+            return
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output readable
+
+
+def serve_fixtures(directory, port=0, delay=0.0, errors=None):
+    """Starts a threaded HTTP server for `directory` in the background; returns (server, base_url).
+
+    `errors` maps a URL path to the status codes it answers, in order, before serving the
+    file (e.g. {"/a.pdf": [503, 429]}), to exercise the downloader's retries.
+    """
+    handler = type("DelayedFixtureHandler", (FixtureHandler,), {"delay": delay})
+    server = FixtureServer(("127.0.0.1", port), partial(handler, directory=directory), errors)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    import sys
+
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.getcwd()
+    server, base_url = serve_fixtures(folder, port=8000)
+    print(f"📡 Serving {folder} at {base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,151 @@
+import os
+import time
+import sqlite3
+import threading
+
+from paths import local_path
+
+DEFAULT_MANIFEST = "manifest.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    url             TEXT PRIMARY KEY,
+    local_path      TEXT NOT NULL,
+    title           TEXT,
+    etag            TEXT,
+    last_modified   TEXT,
+    size            INTEGER,
+    sha256          TEXT,
+    first_run       INTEGER REFERENCES runs(run_id),
+    checked_at      REAL
+);
+CREATE INDEX IF NOT EXISTS documents_first_run ON documents(first_run);
+"""
+# Created after the column migration below, so it also works on manifests made before titles were kept
+TITLE_INDEX = "CREATE INDEX IF NOT EXISTS documents_title ON documents(title);"
+
+
+# --- DOWNLOAD MANIFEST ---
+class Manifest:
+    """SQLite record of every downloaded FIA document, keyed by URL.
+
+    FIA documents do not change once published, so a URL already in the manifest
+    (with its file still on disk) can be skipped outright, or revalidated with a
+    conditional GET using the stored ETag / Last-Modified. It is also the table from a
+    document's original title to the name it was stored under (see paths.py).
+    """
+
+    def __init__(self, path=DEFAULT_MANIFEST):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(SCHEMA)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(documents)")}
+        if "title" not in columns:
+            self._conn.execute("ALTER TABLE documents ADD COLUMN title TEXT")
+        self._conn.execute(TITLE_INDEX)
+        self.run_id = None
+        self._paths = None  # title -> local_path, loaded on first lookup
+
+    def start_run(self):
+        """Opens a new run; documents first recorded from now on are tagged with it."""
+        with self._lock, self._conn:
+            cur = self._conn.execute("INSERT INTO runs (started_at) VALUES (?)", (time.time(),))
+        self.run_id = cur.lastrowid
+        return self.run_id
+
+    def get(self, url):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM documents WHERE url = ?", (url,)).fetchone()
+        return dict(row) if row else None
+
+    def is_current(self, url, file_path):
+        """True when `url` was downloaded before and its file is still where we left it.
+
+        `file_path` is the requested path; a long title was stored under its shortened
+        name, which is recomputed from the recorded content hash.
+        """
+        entry = self.get(url)
+        if not entry:
+            return False
+        expected = local_path(file_path, entry["sha256"]) if entry["sha256"] else file_path
+        return entry["local_path"] == expected and os.path.exists(expected)
+
+    def conditional_headers(self, url):
+        """Builds If-None-Match / If-Modified-Since headers from the stored validators."""
+        entry = self.get(url)
+        headers = {}
+        if entry:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record(self, url, local_path, etag=None, last_modified=None, size=None, sha256=None, title=None):
+        """Inserts or refreshes a document; `first_run` is kept from the first time it was seen."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO documents (url, local_path, title, etag, last_modified, size, sha256, first_run, checked_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    local_path = excluded.local_path,
+                    title = COALESCE(excluded.title, documents.title),
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    size = excluded.size,
+                    sha256 = excluded.sha256,
+                    checked_at = excluded.checked_at
+                """,
+                (url, local_path, title, etag, last_modified, size, sha256, self.run_id, time.time()),
+            )
+            if self._paths is not None and title:
+                self._paths[title] = local_path
+
+    # --- title -> on-disk name ---
+    def path_for(self, title):
+        """Where the document originally titled `title` is stored (None if never downloaded).
+
+        Titles are the document titles shown on the FIA listing (`download_all` jobs carry
+        them). The table is read into a dict once, so lookups are O(1).
+        """
+        if self._paths is None:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT title, local_path FROM documents WHERE title IS NOT NULL ORDER BY checked_at"
+                ).fetchall()
+            self._paths = {row["title"]: row["local_path"] for row in rows}
+        return self._paths.get(title)
+
+    def touch(self, url):
+        """Marks a document as revalidated (e.g. after a 304) without changing its contents."""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE documents SET checked_at = ? WHERE url = ?", (time.time(), url))
+
+    def new_documents(self, run_id=None):
+        """Returns the documents first downloaded in `run_id` (default: the latest run)."""
+        with self._lock:
+            if run_id is None:
+                run_id = self._conn.execute("SELECT MAX(run_id) FROM runs").fetchone()[0]
+            rows = self._conn.execute(
+                "SELECT * FROM documents WHERE first_run = ? ORDER BY url", (run_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        self._conn.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    manifest = Manifest(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_MANIFEST)
+    for doc in manifest.new_documents():
+        print(doc["local_path"])
+    manifest.close()
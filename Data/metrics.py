@@ -0,0 +1,377 @@
+import os
+import re
+import sys
+import json
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+# Shared by every stage. Data/ is the import root: downloader.py and pipeline.py import it
+# directly, and so do the annotations/ and raw_text/ packages, which are run from here
+# (e.g. `python -m annotations.annotator`).
+
+# Upper bounds (seconds) of the latency buckets: a download or LLM call lands in the
+# seconds-to-minutes range, prompt building and parsing in the millisecond range.
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, float("inf"))
+PREFIX = "etl_"
+
+TRACE_ENV = "ETL_TRACE"      # JSON-lines trace file (appended to)
+PROFILE_ENV = "ETL_PROFILE"  # folder for sampled stacks; unset = profiler off
+PROFILE_STAGES_ENV = "ETL_PROFILE_STAGES"  # optional comma list limiting which stages are sampled
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+# --- REGISTRY ---
+class Metrics:
+    """Thread-safe counters and latency histograms, with an optional JSON-lines trace.
+
+    `inc` counts things (bytes, tokens, retries, errors), `observe`/`timer` record how
+    long a step took. Both take keyword labels (backend=..., outcome=...). Every event
+    is also appended to the trace file when one is set, so a run can be replayed
+    afterwards; `prometheus()` renders the totals in the Prometheus text format.
+    """
+
+    def __init__(self, trace_path=None, keep_samples=False):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}  # key -> [count, sum, max, per-bucket counts]
+        self.keep_samples = keep_samples  # also keep every observation, for exact percentiles (benchmark.py)
+        self._samples = {}
+        self._trace_path = trace_path
+        self._trace = None
+        self._server = None
+
+    # --- recording ---
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._write("count", name, value, labels)
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            entry = self._histograms.get(key)
+            if entry is None:
+                entry = self._histograms[key] = [0, 0.0, 0.0, [0] * len(BUCKETS)]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    entry[3][i] += 1
+                    break
+            if self.keep_samples:
+                self._samples.setdefault(key, []).append(seconds)
+            self._write("timer", name, seconds, labels)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Times the block; labels can still be set inside it (`with timer(...) as labels`).
+
+        A block that raises is recorded with outcome="error" unless it set an outcome.
+        """
+        start = time.perf_counter()
+        try:
+            yield labels
+        except BaseException:
+            labels.setdefault("outcome", "error")
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed_chunks(self, name, chunks, **labels):
+        """Wraps a streamed response: records the time spent waiting on chunks and to the first one."""
+        start = time.perf_counter()
+        waited, first = 0.0, None
+        iterator = iter(chunks)
+        try:
+            while True:
+                before = time.perf_counter()
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    waited += time.perf_counter() - before
+                    return
+                waited += time.perf_counter() - before
+                if first is None:
+                    first = time.perf_counter() - start
+                yield chunk
+        finally:
+            self.observe(name, waited, **labels)
+            if first is not None:
+                self.observe(name + ".first_chunk", first, **labels)
+
+    # --- trace ---
+    def open_trace(self, path):
+        with self._lock:
+            if self._trace:
+                self._trace.close()
+            self._trace, self._trace_path = None, path
+
+    def _write(self, kind, name, value, labels):
+        # Called with the lock held; the file is opened on the first event, so a
+        # process that records nothing (e.g. a conversion worker) never touches it.
+        if not self._trace_path:
+            return
+        if self._trace is None:
+            self._trace = open(self._trace_path, "a", encoding="utf-8", buffering=1)
+        event = {"ts": round(time.time(), 6), "kind": kind, "name": name, "value": value,
+                 "thread": threading.current_thread().name}
+        if labels:
+            event["labels"] = labels
+        self._trace.write(json.dumps(event, default=str) + "\n")
+
+    # --- reading ---
+    def snapshot(self):
+        """Totals as plain data: {"counters": [...], "timers": [...]} (e.g. for a run report)."""
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            timers = [
+                {"name": name, "labels": dict(labels), "count": count, "seconds": total,
+                 "mean": total / count, "max": peak, "p95": _quantile(buckets, count, 0.95, peak)}
+                for (name, labels), (count, total, peak, buckets) in sorted(self._histograms.items())
+            ]
+        return {"counters": counters, "timers": timers}
+
+    def samples(self, name, **labels):
+        """Every observation of `name` (across label sets, or only those matching `labels`) when keep_samples is on."""
+        wanted = set(_key(name, labels)[1])
+        with self._lock:
+            return [
+                value for (key_name, key_labels), values in self._samples.items()
+                if key_name == name and wanted <= set(key_labels) for value in values
+            ]
+
+    def counter(self, name, **labels):
+        """Total of counter `name` over its label sets (or only those matching `labels`)."""
+        wanted = set(_key(name, labels)[1])
+        with self._lock:
+            return sum(
+                value for (key_name, key_labels), value in self._counters.items()
+                if key_name == name and wanted <= set(key_labels)
+            )
+
+    def reset(self):
+        with self._lock:
+            self._counters, self._histograms, self._samples = {}, {}, {}
+
+    def prometheus(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((k, (c, s, m, list(b))) for k, (c, s, m, b) in self._histograms.items())
+        typed = set()
+        for (name, labels), value in counters:
+            metric = PREFIX + _metric_name(name) + "_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_labels(labels)} {value}")
+        for (name, labels), (count, total, _, buckets) in histograms:
+            metric = PREFIX + _metric_name(name) + "_seconds"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            cumulative = 0
+            for bound, n in zip(BUCKETS, buckets):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{metric}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{metric}_sum{_labels(labels)} {total}")
+            lines.append(f"{metric}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serves `prometheus()` at http://host:port/metrics from a daemon thread."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self._server.server_address[1]
+
+    def print_summary(self):
+        data = self.snapshot()
+        if data["timers"]:
+            print(f"⏱️ {'step':<34} {'calls':>7} {'total s':>9} {'mean ms':>9} {'p95 ms':>9} {'max ms':>9}")
+            for t in data["timers"]:
+                print(f"   {_title(t):<34} {t['count']:>7} {t['seconds']:>9.2f} {t['mean'] * 1000:>9.1f} "
+                      f"{t['p95'] * 1000:>9.1f} {t['max'] * 1000:>9.1f}")
+        if data["counters"]:
+            print("🔢 " + ", ".join(f"{_title(c)}={c['value']:g}" for c in data["counters"]))
+
+    def close(self):
+        with self._lock:
+            if self._trace:
+                self._trace.close()
+                self._trace = None
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _metric_name(name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{_metric_name(k)}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+def _title(entry):
+    labels = ",".join(f"{k}={v}" for k, v in entry["labels"].items())
+    return entry["name"] + (f"[{labels}]" if labels else "")
+
+
+def _quantile(buckets, count, q, peak):
+    """Upper bound of the bucket holding the q-quantile (capped at the largest value seen)."""
+    rank, seen = q * count, 0
+    for bound, n in zip(BUCKETS, buckets):
+        seen += n
+        if seen >= rank:
+            return min(bound, peak)
+    return peak
+
+
+METRICS = Metrics(os.environ.get(TRACE_ENV))
+
+
+# --- SAMPLING PROFILER (opt-in) ---
+class SamplingProfiler:
+    """Samples the stacks of the given threads every `interval` seconds from a helper thread.
+
+    Unlike cProfile it does not hook every call, so the stage runs at nearly full speed;
+    the result is a count per stack, written in the collapsed format flamegraph.pl and
+    speedscope read ("outer;inner;leaf count").
+    """
+
+    def __init__(self, thread_ids=None, interval=0.005):
+        self.thread_ids = thread_ids or [threading.get_ident()]
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in self.thread_ids:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[";".join(reversed(stack))] += 1
+
+
+_PROFILES = {}  # stage -> Counter of stacks sampled in this process so far
+
+
+def profiling_enabled(stage):
+    if not os.environ.get(PROFILE_ENV):
+        return False
+    stages = os.environ.get(PROFILE_STAGES_ENV)
+    return not stages or stage in stages.split(",")
+
+
+@contextmanager
+def profiled(stage, interval=0.005):
+    """Samples the calling thread while the block runs, when ETL_PROFILE names a folder.
+
+    Stacks accumulate per stage and process and are rewritten to
+    <ETL_PROFILE>/<stage>-<pid>.folded after every block, so conversion workers each
+    leave one file. Does nothing (one environment lookup) when profiling is off.
+    """
+    if not profiling_enabled(stage):
+        yield
+        return
+    profiler = SamplingProfiler(interval=interval).start()
+    try:
+        yield
+    finally:
+        stacks = _PROFILES.setdefault(stage, Counter())
+        stacks.update(profiler.stop())
+        folder = os.environ[PROFILE_ENV]
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"{stage}-{os.getpid()}.folded"), "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def top_functions(folded_paths, limit=15):
+    """Functions by share of samples where they were on top of the stack (self time)."""
+    own, total = Counter(), 0
+    for path in folded_paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                stack, _, count = line.rstrip("\n").rpartition(" ")
+                own[stack.split(";")[-1]] += int(count)
+                total += int(count)
+    return [(name, count / total) for name, count in own.most_common(limit)] if total else []
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+
+    parser = argparse.ArgumentParser(description="Summarise a metrics trace or sampled profiles.")
+    parser.add_argument("--trace", help="JSON-lines trace written via ETL_TRACE / pipeline.py --trace")
+    parser.add_argument("--profile", help="folder of .folded files written via ETL_PROFILE / pipeline.py --profile")
+    args = parser.parse_args()
+
+    if args.trace:
+        replay = Metrics()
+        with open(args.trace, "r", encoding="utf-8") as f:
+            for line in f:
+                event = json.loads(line)
+                record = replay.observe if event["kind"] == "timer" else replay.inc
+                record(event["name"], event["value"], **event.get("labels", {}))
+        replay.print_summary()
+    if args.profile:
+        folded = glob.glob(os.path.join(args.profile, "*.folded"))
+        for stage in sorted({os.path.basename(path).rsplit("-", 1)[0] for path in folded}):
+            print(f"🔥 {stage}:")
+            for name, share in top_functions(glob.glob(os.path.join(args.profile, f"{stage}-*.folded"))):
+                print(f"   {share:>6.1%}  {name}")
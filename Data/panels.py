@@ -0,0 +1,167 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
+
+# Relative selectors: they only depend on the document list's own markup, not on
+# where the site's layout happens to place it (the old /html/body/div[4]/... XPath).
+DOCUMENT_LIST_CLASS = "decision-document-list"
+PANEL_SELECTOR = ".decision-document-list > ul"
+DOCUMENT_LINK_SELECTOR = "a[href*='/decision-document/']"
+COOKIE_BUTTON_XPATH = "//button[contains(text(), 'Accept All')]"
+
+
+# --- BROWSER SETUP ---
+def make_driver(headless=True):
+    """Starts a Chrome instance; headless by default so several can run side by side."""
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1920,1080")
+    driver = webdriver.Chrome(options=options)
+    if not headless:
+        driver.maximize_window()
+    return driver
+
+
+def open_season_page(driver, url, timeout=20):
+    """Loads a season page, waits for the document list and dismisses the cookie banner if shown."""
+    driver.get(url)
+    WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.CLASS_NAME, DOCUMENT_LIST_CLASS)))
+
+    try:
+        cookie_button = WebDriverWait(driver, 3).until(EC.element_to_be_clickable((By.XPATH, COOKIE_BUTTON_XPATH)))
+        driver.execute_script("arguments[0].click();", cookie_button)
+        WebDriverWait(driver, 3).until(EC.staleness_of(cookie_button))
+        print("✅ Dismissed cookie banner")
+    except TimeoutException:
+        pass  # no banner (or it did not go away, which does not block the JS clicks below)
+
+
+def count_panels(driver):
+    return len(driver.find_elements(By.CSS_SELECTOR, PANEL_SELECTOR))
+
+
+def _panel_loaded(index):
+    """Wait condition: panel `index` (0-based) contains at least one document link."""
+
+    def condition(driver):
+        try:
+            panel = driver.find_elements(By.CSS_SELECTOR, PANEL_SELECTOR)[index]
+            return bool(panel.find_elements(By.CSS_SELECTOR, DOCUMENT_LINK_SELECTOR))
+        except (IndexError, StaleElementReferenceException):
+            return False
+
+    return condition
+
+
+# --- PANEL EXPANSION ---
+def expand_panels(driver, indices=None, timeout=20):
+    """Clicks each GP panel and waits until its document list has actually rendered.
+
+    Clicks are fired first for every panel so their requests overlap, then each panel is
+    awaited; the page is never idle-waited for a fixed time. Returns the indices that
+    failed to load within `timeout`.
+    """
+    if indices is None:
+        indices = range(count_panels(driver))
+    indices = list(indices)
+
+    for i in indices:
+        panel = driver.find_elements(By.CSS_SELECTOR, PANEL_SELECTOR)[i]
+        driver.execute_script("arguments[0].scrollIntoView(true); arguments[0].click();", panel)
+
+    failed = []
+    for i in indices:
+        try:
+            WebDriverWait(driver, timeout, poll_frequency=0.2).until(_panel_loaded(i))
+            print(f"Expanded panel {i + 1}")
+        except TimeoutException:
+            failed.append(i)
+            print(f"⚠️ Panel {i + 1} did not load its documents within {timeout}s")
+    return failed
+
+
+# Reads one expanded panel straight from the live DOM: its GP title plus every document link.
+PANEL_DOCUMENTS_JS = """
+const panel = arguments[0];
+const title = panel.querySelector('.event-title');
+return {
+    grand_prix: title ? title.textContent.trim() : null,
+    documents: Array.from(panel.querySelectorAll(arguments[1])).map(a => ({
+        title: (a.querySelector('.title') || a).textContent.trim(),
+        href: a.getAttribute('href'),
+    })),
+};
+"""
+
+
+def iter_panel_documents(driver, indices=None, timeout=20, rate_limiter=None):
+    """Expands panels like `expand_panels` but yields each panel's documents as soon as it loads.
+
+    Yields `(grand_prix, [{"title": ..., "href": ...}, ...])` per panel, read from the DOM,
+    so the full page source never has to be dumped and re-parsed.
+    """
+    if indices is None:
+        indices = range(count_panels(driver))
+    indices = list(indices)
+
+    for i in indices:
+        if rate_limiter:
+            rate_limiter.acquire()
+        panel = driver.find_elements(By.CSS_SELECTOR, PANEL_SELECTOR)[i]
+        driver.execute_script("arguments[0].scrollIntoView(true); arguments[0].click();", panel)
+
+    for i in indices:
+        try:
+            WebDriverWait(driver, timeout, poll_frequency=0.2).until(_panel_loaded(i))
+        except TimeoutException:
+            print(f"⚠️ Panel {i + 1} did not load its documents within {timeout}s")
+            continue
+        panel = driver.find_elements(By.CSS_SELECTOR, PANEL_SELECTOR)[i]
+        found = driver.execute_script(PANEL_DOCUMENTS_JS, panel, DOCUMENT_LINK_SELECTOR)
+        yield found["grand_prix"], found["documents"]
+
+
+def _expand_share(url, worker, workers, headless, timeout):
+    """One pool worker: opens its own browser and expands every `workers`-th panel."""
+    driver = make_driver(headless=headless)
+    try:
+        open_season_page(driver, url)
+        indices = range(worker, count_panels(driver), workers)
+        expand_panels(driver, indices, timeout=timeout)
+        return driver.page_source
+    finally:
+        driver.quit()
+
+
+def expand_season(url, browsers=1, headless=True, timeout=20):
+    """Expands every GP panel of a season page and returns the rendered page source(s).
+
+    With `browsers > 1` the panels are split across that many browser instances running
+    in parallel; each returns its own page source holding the panels it expanded.
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=browsers) as pool:
+        futures = [pool.submit(_expand_share, url, w, browsers, headless, timeout) for w in range(browsers)]
+        sources = [f.result() for f in futures]
+    print(f"⏱️ Expanded season page with {browsers} browser(s) in {time.perf_counter() - start:.1f}s")
+    return sources
+
+
+if __name__ == "__main__":
+    import argparse
+    import pathlib
+
+    fixture = pathlib.Path(__file__).with_name("fixtures") / "season_page.html"
+    parser = argparse.ArgumentParser(description="Benchmark GP panel expansion.")
+    parser.add_argument("--url", default=fixture.resolve().as_uri())
+    parser.add_argument("--browsers", type=int, default=1)
+    parser.add_argument("--show", action="store_true", help="run with a visible browser window")
+    args = parser.parse_args()
+
+    expand_season(args.url, browsers=args.browsers, headless=not args.show)
@@ -0,0 +1,59 @@
+import os
+import re
+
+# --- ON-DISK NAMES FOR DOWNLOADED DOCUMENTS ---
+# The name is fixed once, when a document is downloaded (see downloader.download_file),
+# and recorded in the manifest next to the original title, so nothing ever has to walk
+# the tree and rename files afterwards. Annotations are keyed by file name, so a name
+# that changed later would look like a new, unannotated document.
+
+# Longest file name kept as published. With Data/pdfs/<year>/<gp folder>/ in front this
+# stays under Windows' 260-character MAX_PATH for a checkout at a reasonable depth, and
+# far below the 255-byte name limit of ext4/APFS/NTFS. The longest FIA titles seen so far
+# are ~130 characters, so existing downloads keep their names.
+MAX_NAME_LENGTH = 150
+HASH_LENGTH = 10  # hex digits of the content sha256 appended to shortened names
+
+UNSAFE = re.compile(r'[<>:"/\\|?*\x00-\x1f]')  # not allowed in Windows file names
+RESERVED = {"con", "prn", "aux", "nul", *(f"com{i}" for i in range(1, 10)), *(f"lpt{i}" for i in range(1, 10))}
+
+
+def safe_stem(stem, ext=""):
+    """A name stem every OS accepts: no reserved characters, not CON/NUL/..., and (without an
+    extension after it) no trailing dots or spaces, which Windows would silently drop."""
+    stem = UNSAFE.sub("_", stem)
+    if not ext:
+        stem = stem.rstrip(". ")
+    if stem.lower().rstrip(". ") in RESERVED:
+        stem = "_" + stem
+    return stem or "document"
+
+
+def slug(stem, limit):
+    """`stem` cut to at most `limit` characters at a word boundary, keeping its words and separators."""
+    if len(stem) <= limit:
+        return stem
+    cut = stem[:limit + 1]
+    boundary = max(cut.rfind(" "), cut.rfind("_"))
+    cut = cut[:boundary] if boundary >= limit // 2 else stem[:limit]
+    return cut.rstrip(" -_.,")
+
+
+def local_path(path, sha256=None, max_name=MAX_NAME_LENGTH):
+    """Where a document requested at `path` is stored, given the sha256 of its content.
+
+    Names that are safe and short enough are kept as published; longer ones become the
+    title cut at a word boundary plus "-<first HASH_LENGTH hex digits of the sha256>",
+    so two long titles sharing a prefix still get different names and re-downloading
+    the same content always lands on the same name.
+    """
+    folder, name = os.path.split(path)
+    stem, ext = os.path.splitext(name)
+    if not ext.strip(". "):
+        stem, ext = stem + ext, ""
+    stem = safe_stem(stem, ext)
+    if len(stem) + len(ext) <= max_name:
+        return os.path.join(folder, stem + ext)
+    if not sha256:
+        raise ValueError(f"{name!r} is too long to keep and no content hash was given to shorten it")
+    return os.path.join(folder, f"{slug(stem, max_name - len(ext) - HASH_LENGTH - 1)}-{sha256[:HASH_LENGTH]}{ext}")
@@ -0,0 +1,401 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+
+# Stage code lives next to its data, in the raw_text and annotations packages
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+from metrics import METRICS, PROFILE_ENV, PROFILE_STAGES_ENV, profiled
+
+DEFAULT_STATE = "pipeline.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    stage       TEXT NOT NULL,
+    artifact    TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    built_at    REAL NOT NULL,
+    PRIMARY KEY (stage, artifact)
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at  REAL NOT NULL,
+    report      TEXT
+);
+"""
+
+# --- STAGE RESULTS ---
+SKIPPED = "skipped"  # no input changed since the last successful build
+REBUILT = "rebuilt"
+PARTIAL = "partial"  # rebuilt, but some inputs failed: they keep their old fingerprint and are retried next run
+FAILED = "failed"
+BLOCKED = "blocked"  # an upstream stage failed
+
+
+# --- FINGERPRINTS ---
+def file_fingerprint(path, content=False):
+    """size:mtime (cheap, for the thousands of PDFs/texts) or a sha256 of small derived files."""
+    if content:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def files_under(root, extension):
+    paths = []
+    for folder, _, files in os.walk(root):
+        paths.extend(os.path.join(folder, f) for f in sorted(files) if f.lower().endswith(extension))
+    return paths
+
+
+class Stage:
+    """One pipeline step.
+
+    `inputs()` returns {artifact: fingerprint} for everything the stage reads; `action(changed)`
+    rebuilds from the artifacts whose fingerprint moved and may return the subset that
+    succeeded (None means all of them). A `streaming` stage starts as soon as its upstream
+    stages start and keeps picking up their new outputs until they finish.
+    """
+
+    def __init__(self, name, inputs, action, after=(), streaming=False):
+        self.name = name
+        self.inputs = inputs
+        self.action = action
+        self.after = tuple(after)
+        self.streaming = streaming
+
+
+# --- RUNNER ---
+class Pipeline:
+    """Runs stages as a dependency graph, rebuilding only what is downstream of a change.
+
+    The fingerprint of every input a stage consumed is kept in SQLite, so a stage only
+    ever sees the artifacts that are new or changed since it last succeeded. Stages that
+    do not depend on each other run concurrently, each in its own thread.
+    """
+
+    def __init__(self, stages, state_path=DEFAULT_STATE, poll_seconds=5.0):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            missing = [name for name in stage.after if name not in self.stages]
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown stage(s) {missing}")
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(state_path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    # --- fingerprint state ---
+    def built(self, stage_name):
+        """{artifact: fingerprint} of everything the stage has built successfully so far."""
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT artifact, fingerprint FROM artifacts WHERE stage = ?", (stage_name,)
+            ))
+
+    def changed(self, stage, current, force=False):
+        """The entries of `current` ({artifact: fingerprint}) the stage has not built yet."""
+        built = self.built(stage.name)
+        return {artifact: fp for artifact, fp in current.items() if force or built.get(artifact) != fp}
+
+    def _record(self, stage, fingerprints):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?)",
+                [(stage.name, artifact, fp, now) for artifact, fp in fingerprints.items()],
+            )
+
+    # --- scheduling ---
+    def run(self, only=None, force=()):
+        """Runs the graph (or the stages in `only` and what they need); returns the run report."""
+        selected = self._closure(only) if only else list(self.stages)
+        started = {name: threading.Event() for name in selected}
+        finished = {name: threading.Event() for name in selected}
+        results = {}
+        run_start = time.time()
+
+        def run_stage(name):
+            stage = self.stages[name]
+            upstream = [dep for dep in stage.after if dep in finished]
+            result = {"stage": name, "status": SKIPPED, "inputs": 0, "rebuilt": 0, "passes": 0, "seconds": 0.0}
+            results[name] = result
+            start = None
+            try:
+                if stage.streaming:
+                    for dep in upstream:
+                        started[dep].wait()
+                else:
+                    for dep in upstream:
+                        finished[dep].wait()
+                    if any(results[dep]["status"] in (FAILED, BLOCKED) for dep in upstream):
+                        result["status"] = BLOCKED
+                        return
+                started[name].set()
+                start = time.perf_counter()
+                self._run_passes(stage, upstream, finished, result, force=name in force)
+            except Exception as e:
+                result["status"] = FAILED
+                result["error"] = f"{type(e).__name__}: {e}"
+                print(f"❌ Stage {name} failed: {result['error']}")
+            finally:
+                if start is not None:
+                    result["seconds"] = time.perf_counter() - start
+                started[name].set()
+                finished[name].set()
+
+        with ThreadPoolExecutor(max_workers=len(selected)) as pool:
+            list(pool.map(run_stage, selected))
+
+        report = {
+            "started_at": run_start,
+            "seconds": time.time() - run_start,
+            "stages": [results[name] for name in selected],
+            "metrics": METRICS.snapshot(),
+        }
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO runs (started_at, report) VALUES (?, ?)", (run_start, json.dumps(report)))
+        return report
+
+    def _run_passes(self, stage, upstream, finished, result, force=False):
+        # A streaming stage re-checks its inputs every `poll_seconds` while upstream stages
+        # are still producing, and makes one last pass once they are all done. Inputs that
+        # failed are not retried within the same run.
+        attempted = {}
+        while True:
+            upstream_done = all(finished[dep].is_set() for dep in upstream)
+            with METRICS.timer("stage.inputs", stage=stage.name):
+                current = stage.inputs()
+            changed = {
+                artifact: fp for artifact, fp in self.changed(stage, current, force=force).items()
+                if attempted.get(artifact) != fp
+            }
+            result["inputs"] = len(current)
+            if changed:
+                print(f"▶️ {stage.name}: {len(changed)} changed input(s)")
+                attempted.update(changed)
+                with METRICS.timer("stage", stage=stage.name), profiled(stage.name):
+                    succeeded = stage.action(sorted(changed))
+                done = changed if succeeded is None else {a: changed[a] for a in succeeded if a in changed}
+                self._record(stage, done)
+                result["rebuilt"] += len(done)
+                result["passes"] += 1
+                if len(done) < len(changed):
+                    result["incomplete"] = result.get("incomplete", 0) + len(changed) - len(done)
+                result["status"] = PARTIAL if result.get("incomplete") else REBUILT
+            if upstream_done or not stage.streaming:
+                break
+            for dep in upstream:
+                finished[dep].wait(self.poll_seconds)
+
+    def _closure(self, names):
+        needed, stack = [], list(names)
+        while stack:
+            name = stack.pop()
+            if name not in needed:
+                needed.append(name)
+                stack.extend(self.stages[name].after)
+        return [name for name in self.stages if name in needed]
+
+    def close(self):
+        self._conn.close()
+
+
+def print_report(report):
+    print(f"\n📋 Pipeline run: {report['seconds']:.1f}s")
+    print(f"   {'stage':<10} {'status':<8} {'inputs':>7} {'rebuilt':>8} {'passes':>7} {'seconds':>8}")
+    for r in report["stages"]:
+        print(f"   {r['stage']:<10} {r['status']:<8} {r['inputs']:>7} {r['rebuilt']:>8} {r['passes']:>7} {r['seconds']:>8.1f}"
+              + (f"  {r['error']}" if r.get("error") else "")
+              + (f"  ({r['incomplete']} to retry)" if r.get("incomplete") else ""))
+
+
+# --- THE F1 DOCUMENTS PIPELINE: scrape -> convert -> annotate -> export -> clean / index ---
+def build_pipeline(root=HERE, years=(2022, 2023, 2024, 2025), scrape=False, annotator="ollama",
+                   workers=None, state_path=DEFAULT_STATE):
+    """The four scripts wired as one graph, with every path derived from `root` (the Data folder).
+
+    pdfs/<year>/<gp>/*.pdf -> raw_text/<year>/*.txt -> annotations.sqlite -> annotations.csv
+    -> penalties_clean.csv, plus the search index over raw_text and the store.
+    """
+    pdf_dir = os.path.join(root, "pdfs")
+    text_dir = os.path.join(root, "raw_text")
+    store_path = os.path.join(root, "annotations", "annotations.sqlite")
+    legacy_dir = os.path.join(root, "annotations", "anottated")  # CSVs annotated before the store existed
+    export_csv = os.path.join(root, "annotations", "annotations.csv")
+    clean_csv = os.path.join(root, "penalties_clean.csv")
+    year_dirs = [os.path.join(text_dir, str(year)) for year in years]
+
+    def text_path(pdf_path):
+        # PDFs are filed per GP, texts flat per year (the layout the annotators read).
+        year = os.path.relpath(pdf_path, pdf_dir).split(os.sep)[0]
+        return os.path.join(text_dir, year, os.path.splitext(os.path.basename(pdf_path))[0] + ".txt")
+
+    def store_fingerprint():
+        if not os.path.exists(store_path):
+            return {}
+        from annotations.annotation_store import AnnotationStore
+
+        store = AnnotationStore(store_path)
+        try:
+            return {"annotations.sqlite": store.fingerprint()}
+        finally:
+            store.close()
+
+    # scrape: no inputs to fingerprint (the FIA site is the input), so it runs when asked for
+    def scrape_inputs():
+        return {"fia.com": str(time.time())} if scrape else {}
+
+    def scrape_action(_):
+        from Scraper import main as scrape_main
+
+        scrape_main(list(years), output_dir=pdf_dir, index_path=os.path.join(root, "document_index.csv"),
+                    manifest_path=os.path.join(root, "manifest.sqlite"))
+
+    def pdf_inputs():
+        paths = [p for p in files_under(pdf_dir, ".pdf")
+                 if os.path.relpath(p, pdf_dir).split(os.sep)[0] in {str(y) for y in years}]
+        return {p: file_fingerprint(p) for p in paths}
+
+    def convert_action(changed):
+        from raw_text.PDF2TXT import convert_all_pdfs, EXTRACTOR_VERSION, EXTRACT_SETTINGS
+        from raw_text.conversion_cache import ConversionCache
+
+        cache = ConversionCache(os.path.join(root, "conversion_cache.sqlite"), EXTRACTOR_VERSION, EXTRACT_SETTINGS)
+        try:
+            stats = convert_all_pdfs(None, None, workers=workers or os.cpu_count() or 1, cache=cache,
+                                     jobs=[(p, text_path(p)) for p in changed])
+        finally:
+            cache.close()
+        return [p for p in changed if p not in set(stats["failed"])]
+
+    def text_inputs():
+        paths = [p for d in year_dirs if os.path.isdir(d) for p in files_under(d, ".txt")]
+        return {p: file_fingerprint(p) for p in paths}
+
+    def annotate_action(changed):
+        module = importlib.import_module("annotations." + ("annotatorGemini" if annotator == "gemini" else "annotator"))
+        from annotations.annotation_store import AnnotationStore, FAILED as FAILED_JOB, EMPTY
+        from annotations.dedup import DedupIndex
+
+        new_store = not os.path.exists(store_path)
+        store = AnnotationStore(store_path)
+        dedup = DedupIndex(os.path.join(root, "annotations", "dedup.sqlite"))
+        try:
+            if new_store and os.path.isdir(legacy_dir):
+                # First run: files already in the old per-season CSVs count as done.
+                for name in sorted(os.listdir(legacy_dir)):
+                    if name.endswith(".csv"):
+                        imported = store.import_csv(os.path.join(legacy_dir, name))
+                        print(f"📥 Imported {imported} annotated file(s) from {name}")
+            # Only text that changed since it was annotated is redone; a file this stage has never
+            # built keeps whatever the store already holds for it.
+            built = pipeline.built("annotate")
+            store.reset(os.path.basename(p) for p in changed if p in built)
+            by_folder = {}
+            for path in changed:
+                by_folder.setdefault(os.path.dirname(path), []).append(os.path.basename(path))
+            for folder, files in sorted(by_folder.items()):
+                module.process_folder(folder, store, batch_tokens=2000, dedup=dedup, files=files)
+            failed = store.finished_files((FAILED_JOB, EMPTY))
+        finally:
+            store.close()
+            dedup.close()
+        # Files the LLM failed on keep their old fingerprint, so the next run retries them.
+        return [p for p in changed if os.path.basename(p) not in failed]
+
+    def export_action(_):
+        from annotations.annotation_store import AnnotationStore
+
+        store = AnnotationStore(store_path)
+        try:
+            print(f"📤 Exported {store.export_csv(export_csv)} annotation(s) to {export_csv}")
+        finally:
+            store.close()
+
+    def export_inputs():
+        return {"annotations.csv": file_fingerprint(export_csv, content=True)} if os.path.exists(export_csv) else {}
+
+    def clean_action(_):
+        from cleaning import load_seasons, penalties
+
+        df = penalties(load_seasons([export_csv]))
+        df.to_csv(clean_csv, index=False)
+        print(f"🧹 Wrote {len(df)} cleaned penalty rows to {clean_csv}")
+
+    def index_inputs():
+        return {**text_inputs(), **store_fingerprint()}
+
+    def index_action(_):
+        from annotations.search_index import SearchIndex
+        from annotations.annotation_store import AnnotationStore
+
+        index = SearchIndex(os.path.join(root, "annotations", "search_index.sqlite"))
+        try:
+            documents = index.update_documents(text_dir)
+            records = 0
+            if os.path.exists(store_path):
+                store = AnnotationStore(store_path)
+                records = index.update_records(store.rows())
+                store.close()
+            print(f"🗂️ Search index: {documents} documents, {records} annotated files updated")
+        finally:
+            index.close()
+
+    stages = [
+        Stage("scrape", scrape_inputs, scrape_action),
+        Stage("convert", pdf_inputs, convert_action, after=["scrape"]),
+        Stage("annotate", text_inputs, annotate_action, after=["convert"], streaming=True),
+        Stage("export", store_fingerprint, export_action, after=["annotate"]),
+        Stage("clean", export_inputs, clean_action, after=["export"]),
+        Stage("index", index_inputs, index_action, after=["annotate"]),
+    ]
+    pipeline = Pipeline(stages, state_path=state_path)
+    return pipeline
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the scrape -> convert -> annotate -> clean pipeline incrementally.")
+    parser.add_argument("--root", default=HERE, help="Data folder holding pdfs/, raw_text/ and annotations/")
+    parser.add_argument("--years", type=int, nargs="+", default=[2022, 2023, 2024, 2025])
+    parser.add_argument("--scrape", action="store_true", help="fetch new documents from the FIA site first")
+    parser.add_argument("--annotator", choices=["ollama", "gemini"], default="ollama")
+    parser.add_argument("--only", nargs="*", help="run just these stages (and the ones they depend on)")
+    parser.add_argument("--force", nargs="*", default=[], help="rebuild these stages from all their inputs")
+    parser.add_argument("--workers", type=int, help="PDF conversion processes")
+    parser.add_argument("--state", default=DEFAULT_STATE)
+    parser.add_argument("--report", help="also write the run report as JSON to this path")
+    parser.add_argument("--trace", help="append every timing/counter event to this JSON-lines file")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port while running")
+    parser.add_argument("--profile", help="write sampled stacks of the CPU-bound stages to this folder")
+    parser.add_argument("--profile-stages", nargs="*", default=["extract", "convert", "clean", "index"],
+                        help="stages sampled with --profile")
+    args = parser.parse_args()
+
+    if args.trace:
+        METRICS.open_trace(args.trace)
+    if args.metrics_port:
+        print(f"📈 Metrics at http://127.0.0.1:{METRICS.serve(args.metrics_port)}/metrics")
+    if args.profile:
+        # Via the environment so the conversion worker processes sample themselves too.
+        os.environ[PROFILE_ENV] = os.path.abspath(args.profile)
+        os.environ[PROFILE_STAGES_ENV] = ",".join(args.profile_stages)
+
+    pipeline = build_pipeline(args.root, args.years, scrape=args.scrape, annotator=args.annotator,
+                              workers=args.workers, state_path=args.state)
+    report = pipeline.run(only=args.only, force=set(args.force))
+    pipeline.close()
+    print_report(report)
+    METRICS.print_summary()
+    METRICS.close()
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
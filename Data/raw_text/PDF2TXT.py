@@ -1,40 +1,154 @@
 import os
+import csv
+import time
 import pdfplumber
+from collections import defaultdict
+from importlib.metadata import version
+from concurrent.futures import ProcessPoolExecutor
+from .conversion_cache import ConversionCache, file_sha256
+from .extractors import make_extractor
 
-def pdf_to_text(pdf_path, txt_path):
-    with pdfplumber.open(pdf_path) as pdf:
-        text = "\n".join(page.extract_text() or "" for page in pdf.pages)
-    with open(txt_path, "w", encoding="utf-8") as f:
-        f.write(text)
+from metrics import METRICS, profiled
+
+# Bump EXTRACTOR_VERSION whenever pdf_to_text changes how text is produced; together
+# with EXTRACT_SETTINGS it keys the conversion cache, so old outputs get re-extracted.
+EXTRACTOR_VERSION = f"pdfplumber-{pdfplumber.__version__}/pypdfium2-{version('pypdfium2')}/3"
+EXTRACT_SETTINGS = {"backend": "auto", "max_pages": 3, "max_paths_per_page": 40, "min_chars": 40}
 
-def convert_all_pdfs(input_dir, output_dir):
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+extractor = make_extractor(**EXTRACT_SETTINGS)
 
+def pdf_to_text(pdf_path, txt_path):
+    """Writes the PDF's text page by page; returns (backend used, pages, seconds, unmapped glyph counts)."""
+    return extractor.write_text(pdf_path, txt_path)
+
+def find_pdfs(input_dir, output_dir):
+    """Lists (pdf_path, txt_path) pairs, mirroring the input tree under output_dir."""
+    jobs = []
     for root, _, files in os.walk(input_dir):
-        for file in files:
+        for file in sorted(files):
             if file.lower().endswith(".pdf"):
                 pdf_path = os.path.join(root, file)
                 relative_path = os.path.relpath(pdf_path, input_dir)
                 txt_file = os.path.splitext(relative_path)[0] + ".txt"
-                txt_path = os.path.join(output_dir, txt_file)
+                jobs.append((pdf_path, os.path.join(output_dir, txt_file)))
+    return jobs
+
+def convert_one(job):
+    """Converts a single PDF; any failure is returned instead of raised so it stays with that file."""
+    pdf_path, txt_path = job
+    try:
+        # Ensure output subfolders exist
+        os.makedirs(os.path.dirname(txt_path), exist_ok=True)
+        # Runs in the worker process: with ETL_PROFILE set, each worker leaves its own
+        # extract-<pid>.folded stack samples (see metrics.profiled).
+        with profiled("extract"):
+            timing = pdf_to_text(pdf_path, txt_path + ".part")
+        # Written under a temporary name and renamed when complete, so a stage reading the
+        # output folder concurrently (see pipeline.py) never sees a half-written .txt
+        os.replace(txt_path + ".part", txt_path)
+        return pdf_path, None, timing
+    except Exception as e:
+        if os.path.exists(txt_path + ".part"):
+            os.remove(txt_path + ".part")
+        return pdf_path, f"{type(e).__name__}: {e}", None
+
+def convert_all_pdfs(input_dir, output_dir, workers=1, chunksize=8, cache=None, log_path=None, jobs=None):
+    """Converts every PDF under input_dir; workers > 1 spreads the work over a process pool.
+
+    pdfplumber's layout analysis is CPU-bound, so processes (not threads) are used. Tasks
+    are handed out `chunksize` at a time and results come back in submission order, so
+    progress lines read the same as a serial run. With a `cache`, PDFs whose content was
+    already converted by the current extractor version are skipped. `log_path` appends
+    one CSV row per converted PDF recording which backend handled it and how long it took.
+    `jobs` ((pdf_path, txt_path) pairs) converts just those instead of walking input_dir.
+    """
+    if jobs is None:
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        jobs = find_pdfs(input_dir, output_dir)
+    pdf_hashes = {}
+    if cache is not None:
+        pending = []
+        for pdf_path, txt_path in jobs:
+            pdf_hashes[pdf_path] = file_sha256(pdf_path)
+            if not cache.lookup(pdf_hashes[pdf_path], txt_path):
+                pending.append((pdf_path, txt_path))
+        print(f"Cache: {len(jobs) - len(pending)} of {len(jobs)} PDFs already converted")
+        METRICS.inc("extract.cached", len(jobs) - len(pending))
+        jobs = pending
+
+    txt_paths = dict(jobs)
+    total = len(jobs)
+    failed = []
+    timings = []
+    start = time.perf_counter()
+
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(convert_one, jobs, chunksize=chunksize)
+    else:
+        pool = None
+        results = map(convert_one, jobs)
+
+    try:
+        for i, (pdf_path, error, timing) in enumerate(results, start=1):
+            if error:
+                failed.append(pdf_path)
+                METRICS.inc("extract.errors", error=error.split(":")[0])
+                print(f"[{i}/{total}] Failed to convert {pdf_path}: {error}")
+            else:
+                backend, pages, seconds, unmapped = timing
+                timings.append((pdf_path, backend, pages, seconds))
+                # Timed in the worker; recorded here so the parent holds every stage's metrics
+                METRICS.observe("extract", seconds, backend=backend)
+                METRICS.inc("extract.pages", pages, backend=backend)
+                print(f"[{i}/{total}] Converted ({backend}, {seconds:.2f}s): {pdf_path}")
+                if unmapped:
+                    METRICS.inc("extract.unmapped_glyphs", sum(unmapped.values()), backend=backend)
+                    glyphs = ", ".join(f"(cid:{cid}) x{n}" for cid, n in sorted(unmapped.items(), key=lambda kv: -kv[1]))
+                    print(f"    Warning: unmapped glyphs left in the text: {glyphs}")
+                if cache is not None:
+                    cache.store(pdf_hashes[pdf_path], txt_paths[pdf_path])
+    finally:
+        if pool:
+            pool.shutdown()
 
-                # Ensure output subfolders exist
-                os.makedirs(os.path.dirname(txt_path), exist_ok=True)
+    elapsed = time.perf_counter() - start
+    print(f"Converted {total - len(failed)}/{total} PDFs in {elapsed:.1f}s with {workers} worker(s)")
 
-                try:
-                    print(f"Converting: {pdf_path}")
-                    pdf_to_text(pdf_path, txt_path)
-                except Exception as e:
-                    print(f"Failed to convert {pdf_path}: {e}")
+    per_backend = defaultdict(lambda: [0, 0.0])
+    for _, backend, _, seconds in timings:
+        per_backend[backend][0] += 1
+        per_backend[backend][1] += seconds
+    for backend, (count, seconds) in sorted(per_backend.items()):
+        print(f"  {backend}: {count} PDFs, {seconds:.1f}s total, {seconds / count:.3f}s per PDF")
 
+    if log_path and timings:
+        write_header = not os.path.exists(log_path)
+        with open(log_path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if write_header:
+                writer.writerow(["pdf_path", "backend", "pages", "seconds"])
+            writer.writerows(timings)
 
+    return {
+        "converted": total - len(failed),
+        "failed": failed,
+        "seconds": elapsed,
+        "backends": {backend: count for backend, (count, _) in per_backend.items()},
+    }
 
 
 
 # Example usage
-x = [2022,2023,2024,2025]
-for year in x:
-    input_dir = f"folder loc here"
-    output_dir = f"folder loc here"
-    convert_all_pdfs(input_dir, output_dir)
+if __name__ == "__main__":
+    cache = ConversionCache("conversion_cache.sqlite", EXTRACTOR_VERSION, EXTRACT_SETTINGS)
+    print(f"Evicted {cache.evict_stale()} stale cache entries")
+    x = [2022,2023,2024,2025]
+    for year in x:
+        input_dir = f"folder loc here"
+        output_dir = f"folder loc here"
+        convert_all_pdfs(
+            input_dir, output_dir, workers=os.cpu_count() or 1, cache=cache, log_path="extraction_log.csv"
+        )
+    cache.close()
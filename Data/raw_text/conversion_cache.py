@@ -0,0 +1,97 @@
+import os
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversions (
+    pdf_sha256      TEXT NOT NULL,
+    extractor_key   TEXT NOT NULL,
+    txt_path        TEXT NOT NULL,
+    txt_sha256      TEXT NOT NULL,
+    converted_at    REAL NOT NULL,
+    PRIMARY KEY (pdf_sha256, extractor_key)
+);
+"""
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def extractor_key(version, settings):
+    """Identifies an extractor configuration; changing the version or any setting invalidates old entries."""
+    blob = json.dumps(settings or {}, sort_keys=True)
+    return f"{version}:{hashlib.sha256(blob.encode('utf-8')).hexdigest()[:16]}"
+
+
+# --- CONVERSION CACHE ---
+class ConversionCache:
+    """Remembers which PDF contents have already been converted, and by which extractor.
+
+    Entries are keyed by (PDF sha256, extractor key), so a renamed or re-downloaded but
+    identical PDF is still a hit, while a new extractor version or setting is a miss.
+    """
+
+    def __init__(self, path, version, settings=None):
+        self.path = path
+        self.key = extractor_key(version, settings)
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(SCHEMA)
+
+    def lookup(self, pdf_sha256, txt_path):
+        """Makes `txt_path` hold the cached text for this PDF if possible; returns True on a hit.
+
+        A hit whose text lives at another path (same PDF under another name) is copied over.
+        Entries whose text file vanished or was edited are dropped and count as a miss.
+        """
+        row = self._conn.execute(
+            "SELECT txt_path, txt_sha256 FROM conversions WHERE pdf_sha256 = ? AND extractor_key = ?",
+            (pdf_sha256, self.key),
+        ).fetchone()
+        if not row:
+            return False
+
+        cached_path, txt_sha256 = row
+        if not os.path.exists(cached_path) or file_sha256(cached_path) != txt_sha256:
+            with self._conn:
+                self._conn.execute(
+                    "DELETE FROM conversions WHERE pdf_sha256 = ? AND extractor_key = ?", (pdf_sha256, self.key)
+                )
+            return False
+
+        if os.path.abspath(cached_path) != os.path.abspath(txt_path):
+            os.makedirs(os.path.dirname(txt_path) or ".", exist_ok=True)
+            shutil.copyfile(cached_path, txt_path)
+        return True
+
+    def store(self, pdf_sha256, txt_path):
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO conversions VALUES (?, ?, ?, ?, ?)",
+                (pdf_sha256, self.key, txt_path, file_sha256(txt_path), time.time()),
+            )
+
+    def evict_stale(self, max_age_days=None):
+        """Drops entries from other extractor versions/settings, with missing text files, or
+        (optionally) older than `max_age_days`. Returns the number of entries removed."""
+        rows = self._conn.execute("SELECT pdf_sha256, extractor_key, txt_path, converted_at FROM conversions").fetchall()
+        cutoff = time.time() - max_age_days * 86400 if max_age_days is not None else None
+
+        stale = [
+            (pdf_sha256, key)
+            for pdf_sha256, key, txt_path, converted_at in rows
+            if key != self.key or not os.path.exists(txt_path) or (cutoff is not None and converted_at < cutoff)
+        ]
+        with self._conn:
+            self._conn.executemany("DELETE FROM conversions WHERE pdf_sha256 = ? AND extractor_key = ?", stale)
+        return len(stale)
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,162 @@
+import re
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+
+import pdfplumber
+import pypdfium2 as pdfium
+import pypdfium2.raw as pdfium_c
+
+# pdfplumber emits "(cid:N)" for glyphs it cannot map to unicode. In the FIA documents
+# (cid:120) is the Wingdings bullet. Other ids depend on the embedded font and may stand
+# for real characters, so they are left in the text and counted rather than dropped.
+CID_GLYPHS = {"120": "•"}
+CID_PATTERN = re.compile(r"\(cid:(\d+)\)")
+
+# AutoExtractor's own settings; not layout settings for pdfplumber's extract_text
+AUTO_OPTIONS = ("max_pages", "max_paths_per_page", "min_chars")
+
+
+def clean_text(text, unmapped=None):
+    """Replaces known (cid:N) glyphs; unknown ones are kept and tallied in the `unmapped` Counter."""
+    def replace(match):
+        cid = match.group(1)
+        if cid in CID_GLYPHS:
+            return CID_GLYPHS[cid]
+        if unmapped is not None:
+            unmapped[cid] += 1
+        return match.group(0)
+
+    return CID_PATTERN.sub(replace, text)
+
+
+# --- BACKENDS: each yields the text of one page at a time ---
+class Extractor(ABC):
+    name = "base"
+
+    @abstractmethod
+    def pages(self, pdf_path):
+        """Yields the raw text of each page of `pdf_path`."""
+
+    def write_text(self, pdf_path, txt_path):
+        """Streams cleaned text to `txt_path` page by page.
+
+        Returns (backend name, pages, seconds, unmapped) where `unmapped` counts the
+        (cid:N) glyphs per id that were left in the text.
+        """
+        start = time.perf_counter()
+        pages, _, unmapped = _write_pages(self, pdf_path, txt_path)
+        return self.name, pages, time.perf_counter() - start, dict(unmapped)
+
+
+class PdfplumberExtractor(Extractor):
+    """Full character-level layout analysis. Slow, but handles tables and columns well."""
+
+    name = "pdfplumber"
+
+    def __init__(self, **settings):
+        self.settings = settings
+
+    def pages(self, pdf_path):
+        with pdfplumber.open(pdf_path) as pdf:
+            for page in pdf.pages:
+                yield page.extract_text(**self.settings) or ""
+                page.close()  # drop the cached layout objects of finished pages
+
+
+class PdfiumExtractor(Extractor):
+    """PDFium's native text layer: an order of magnitude faster, fine for plain prose."""
+
+    name = "pdfium"
+
+    def pages(self, pdf_path):
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            for page in pdf:
+                textpage = page.get_textpage()
+                yield textpage.get_text_range().replace("\r\n", "\n")
+                textpage.close()
+                page.close()
+        finally:
+            pdf.close()
+
+
+def is_simple_layout(pdf_path, max_pages=3, max_paths_per_page=40):
+    """Cheap structural check: short documents with few ruled lines/boxes (i.e. no tables).
+
+    Summonses, offences and decisions pass; classifications, entry lists and timing
+    sheets draw hundreds of path objects per page and are left to pdfplumber.
+    """
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        if len(pdf) > max_pages:
+            return False
+        for page in pdf:
+            paths = sum(1 for _ in page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_PATH], max_depth=1))
+            page.close()
+            if paths > max_paths_per_page:
+                return False
+        return True
+    finally:
+        pdf.close()
+
+
+# --- AUTO SELECTION ---
+class AutoExtractor(Extractor):
+    """Uses the fast backend for simple layouts and pdfplumber for everything else.
+
+    The fast path also falls back to pdfplumber when it comes back (nearly) empty,
+    e.g. for documents whose text layer PDFium cannot decode.
+    """
+
+    name = "auto"
+
+    def __init__(self, fast=None, full=None, max_pages=3, max_paths_per_page=40, min_chars=40):
+        self.fast = fast or PdfiumExtractor()
+        self.full = full or PdfplumberExtractor()
+        self.max_pages = max_pages
+        self.max_paths_per_page = max_paths_per_page
+        self.min_chars = min_chars
+
+    def choose(self, pdf_path):
+        try:
+            simple = is_simple_layout(pdf_path, self.max_pages, self.max_paths_per_page)
+        except Exception:
+            simple = False
+        return self.fast if simple else self.full
+
+    def pages(self, pdf_path):
+        """Pages from the backend `choose` picks (without write_text's fallback on empty text)."""
+        return self.choose(pdf_path).pages(pdf_path)
+
+    def write_text(self, pdf_path, txt_path):
+        start = time.perf_counter()
+        backend = self.choose(pdf_path)
+        pages, chars, unmapped = _write_pages(backend, pdf_path, txt_path)
+
+        if backend is self.fast and chars < self.min_chars:
+            backend = self.full
+            pages, chars, unmapped = _write_pages(backend, pdf_path, txt_path)
+        return backend.name, pages, time.perf_counter() - start, dict(unmapped)
+
+
+def _write_pages(backend, pdf_path, txt_path):
+    pages, chars, unmapped = 0, 0, Counter()
+    with open(txt_path, "w", encoding="utf-8") as f:
+        for i, text in enumerate(backend.pages(pdf_path)):
+            text = clean_text(text, unmapped)
+            f.write(text if i == 0 else "\n" + text)
+            pages += 1
+            chars += len(CID_PATTERN.sub("", text).strip())
+    return pages, chars, unmapped
+
+
+def make_extractor(backend="auto", **options):
+    """Builds an extractor from settings, e.g. make_extractor("auto", max_pages=3)."""
+    if backend == "auto":
+        return AutoExtractor(**options)
+    if backend == "pdfium":
+        return PdfiumExtractor()
+    if backend == "pdfplumber":
+        return PdfplumberExtractor(**{key: value for key, value in options.items() if key not in AUTO_OPTIONS})
+    raise ValueError(f"Unknown extractor backend: {backend}")
@@ -0,0 +1,71 @@
+import csv
+
+from annotations.annotation_store import AnnotationStore, COLUMNS, DONE, SKIPPED, EMPTY, FAILED
+
+RECORD = {"year": 2024, "grand_prix": "Miami Grand Prix", "penalty_given": "Fine",
+          "drivers_involved": ["Lewis Hamilton"], "teams_involved": ["Mercedes"]}
+
+
+def test_writes_are_buffered_until_flush(tmp_path):
+    path = str(tmp_path / "store.sqlite")
+    store = AnnotationStore(path, batch_size=3)
+    store.save("a.txt", [RECORD])
+    store.mark("b.txt", SKIPPED)
+    assert store.is_finished("a.txt") and store.is_finished("b.txt")  # answered from the buffer
+
+    other = AnnotationStore(path)
+    assert other.counts() == {}  # nothing on disk yet
+    store.save("c.txt", [])  # third file: the batch is flushed
+    assert other.counts() == {DONE: 1, SKIPPED: 1, EMPTY: 1}
+    assert not other.is_finished("c.txt")  # empty answers are retried
+    other.close()
+    store.close()
+
+
+def test_reset_and_finished_files(tmp_path):
+    store = AnnotationStore(str(tmp_path / "store.sqlite"))
+    store.save("a.txt", [RECORD])
+    store.mark("b.txt", FAILED, error="timeout")
+    assert store.finished_files() == {"a.txt"}
+    assert store.finished_files((FAILED,)) == {"b.txt"}
+    before = store.fingerprint()
+    store.reset(["a.txt"])
+    assert not store.is_finished("a.txt")
+    assert store.fingerprint() != before
+    store.close()
+
+
+def test_export_and_import_round_trip(tmp_path):
+    store = AnnotationStore(str(tmp_path / "store.sqlite"))
+    store.save("a.txt", [RECORD, dict(RECORD, penalty_given="Reprimand")])
+    store.save("a.txt", [RECORD])  # a redo replaces the file's records
+    store.save("b.txt", [dict(RECORD, drivers_involved=["Max Verstappen", "Sergio Perez"])])
+    assert store.export_csv(str(tmp_path / "out.csv")) == 2
+    assert store.records("b.txt")[0]["drivers_involved"] == ["Max Verstappen", "Sergio Perez"]
+    store.close()
+
+    with open(tmp_path / "out.csv", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == COLUMNS
+    assert [row["source_file"] for row in rows] == ["a.txt", "b.txt"]
+
+    copy = AnnotationStore(str(tmp_path / "copy.sqlite"))
+    assert copy.import_csv(str(tmp_path / "out.csv")) == 2
+    assert copy.finished_files() == {"a.txt", "b.txt"}
+    assert copy.records("b.txt")[0]["drivers_involved"] == ["Max Verstappen", "Sergio Perez"]
+    assert copy.records("a.txt")[0]["year"] == 2024
+    copy.close()
+
+
+def test_import_maps_the_misspelled_legacy_headers(tmp_path):
+    legacy = tmp_path / "2022_annotations.csv"
+    with open(legacy, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["year", "penalty_given", "immediat_advantage_gained", "drivers_invovled", "source_file"])
+        writer.writerow(["2022", "Fine", "No", "['Charles Leclerc']", "x.txt"])
+    store = AnnotationStore(str(tmp_path / "store.sqlite"))
+    assert store.import_csv(str(legacy)) == 1
+    [record] = store.records("x.txt")
+    assert record["immediate_advantage_gained"] == "No"
+    assert record["drivers_involved"] == "['Charles Leclerc']"  # Python-style list text is kept as is
+    store.close()
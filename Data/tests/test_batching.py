@@ -0,0 +1,63 @@
+import json
+
+from annotations.engine import estimate_tokens
+from annotations.llm_annotator import LLMAnnotator
+from annotations.prompts import SYSTEM_PREFIX, build_batch_prompt, split_batch_output, pack_batches
+
+
+def test_pack_batches_keeps_order_and_the_token_budget():
+    sizes = [("a", 300), ("b", 300), ("c", 500), ("d", 100), ("e", 900), ("f", 1200)]
+    batches = pack_batches(sizes, max_tokens=1000)
+    assert batches == [["a", "b"], ["c", "d"], ["e"], ["f"]]  # an oversized document still gets its own request
+    tokens = dict(sizes)
+    assert all(sum(tokens[n] for n in batch) <= 1000 for batch in batches if len(batch) > 1)
+
+
+def test_pack_batches_caps_documents_per_batch():
+    sizes = [(str(i), 10) for i in range(25)]
+    assert [len(batch) for batch in pack_batches(sizes, max_tokens=10000, max_documents=10)] == [10, 10, 5]
+
+
+def test_build_batch_prompt_numbers_the_documents():
+    prompt, tokens = build_batch_prompt([(1, "First text.\n"), (2, "  Second text.  ")])
+    assert prompt.startswith(SYSTEM_PREFIX)
+    assert prompt.endswith("=== DOCUMENT 1 ===\nFirst text.\n\n=== DOCUMENT 2 ===\nSecond text.\n\n")
+    assert tokens == estimate_tokens(prompt)
+
+
+def test_split_batch_output_drops_unknown_and_missing_ids():
+    records = [
+        {"document_id": 1, "penalty_given": "Fine"},
+        {"document_id": "2", "penalty_given": "Reprimand"},
+        {"document_id": " 1 ", "penalty_given": "Warning"},
+        {"document_id": 7, "penalty_given": "out of range"},
+        {"penalty_given": "no id"},
+        {"document_id": None, "penalty_given": "null id"},
+        "not an object",
+    ]
+    grouped = split_batch_output(records, range(1, 4))
+    assert grouped == {1: [{"penalty_given": "Fine"}, {"penalty_given": "Warning"}], 2: [{"penalty_given": "Reprimand"}]}
+    assert 3 not in grouped  # absent, so the caller re-runs it on its own
+
+
+class BatchChain:
+    """Answers batch prompts for documents 1 and 7 only, and single-document prompts with one record."""
+
+    def __init__(self):
+        self.prompts = []
+
+    def stream(self, prompt):
+        self.prompts.append(prompt)
+        if "=== DOCUMENT" in prompt:
+            yield json.dumps([{"document_id": 1, "penalty_given": "Fine"}, {"document_id": 7, "penalty_given": "x"}])
+        else:
+            yield json.dumps([{"penalty_given": "Reprimand"}])
+
+
+def test_documents_missing_from_a_batch_are_annotated_on_their_own():
+    chain = BatchChain()
+    results = LLMAnnotator(chain, "fake").annotate_batch([("a.txt", "First text."), ("b.txt", "Second text.")])
+    assert [r["penalty_given"] for r in results["a.txt"]] == ["Fine"]
+    assert [r["penalty_given"] for r in results["b.txt"]] == ["Reprimand"]
+    assert len(chain.prompts) == 2
+    assert chain.prompts[1].rstrip().endswith("Second text.")
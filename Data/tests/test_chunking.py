@@ -0,0 +1,63 @@
+from annotations.chunking import chunk_text, split_blocks, merge_records, HEADER_LINES
+from annotations.engine import estimate_tokens
+
+HEADER = "2024 MIAMI GRAND PRIX\n3 - 5 May 2024\nFrom The Stewards Document 41\n"
+
+
+def document(pages=6, lines_per_page=30):
+    text = HEADER
+    for page in range(1, pages + 1):
+        text += "INCIDENT SUMMARY\n"
+        text += "".join(f"Car {page} line {n} with some words about the incident.\n" for n in range(lines_per_page))
+        text += f"{page}\n"
+    return text
+
+
+def test_blocks_keep_every_line():
+    text = document()
+    blocks = split_blocks(text)
+    assert "".join(blocks) == text
+    assert blocks[0] == HEADER
+    assert [block.split("\n")[-2] for block in blocks[1:]] == ["1", "2", "3", "4", "5", "6"]
+
+
+def test_short_documents_are_one_chunk():
+    assert chunk_text(HEADER + "Fine of 500 euros.\n") == [HEADER + "Fine of 500 euros.\n"]
+
+
+def test_long_documents_split_on_page_boundaries_with_the_header():
+    text = document()
+    chunks = chunk_text(text, max_tokens=800)
+    assert len(chunks) > 1
+    header = "".join(text.splitlines(keepends=True)[:HEADER_LINES])
+    for chunk in chunks:
+        assert estimate_tokens(chunk) <= 800 + 1
+        assert chunk.startswith(header)
+    # Without the repeated header, the chunks are the document again.
+    body = chunks[0] + "".join(c[len(header) + len("...\n"):] for c in chunks[1:])
+    assert body == text
+    assert all(c.rstrip().split("\n")[-1].isdigit() for c in chunks[:-1])
+
+
+def test_oversized_block_falls_back_to_lines_and_characters():
+    text = HEADER + "x" * 10000 + "\n"
+    chunks = chunk_text(text, max_tokens=500)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(c) <= 501 for c in chunks)
+
+
+def test_merge_folds_records_of_the_same_incident():
+    first = [{"drivers_involved": ["Lando Norris"], "penalty_given": "5 second time penalty", "lap_number": 12,
+              "turn_number": None, "teams_involved": ["McLaren"]}]
+    second = [
+        {"drivers_involved": "lando norris", "penalty_given": "5 Second Time Penalty", "lap_number": "12",
+         "turn_number": "4", "teams_involved": "McLaren, Red Bull Racing"},
+        {"drivers_involved": ["Max Verstappen"], "penalty_given": None, "lap_number": None, "turn_number": None},
+        "not a record",
+    ]
+    merged = merge_records([first, None, second])
+    assert len(merged) == 2
+    assert merged[0]["turn_number"] == "4"
+    assert merged[0]["lap_number"] == 12
+    assert merged[0]["teams_involved"] == ["McLaren", "Red Bull Racing"]
+    assert merged[1]["drivers_involved"] == ["Max Verstappen"]
@@ -0,0 +1,101 @@
+import csv
+
+import pandas as pd
+import pytest
+
+from cleaning import load_seasons, fix_mojibake_text, parse_list_text, penalties
+
+HEADER = ["year", "grand_prix", "description", "penalty_given", "drivers_involved", "teams_involved", "source_file",
+          "lap_number"]
+
+
+def write_csv(path, header, rows):
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(row + [None] * (len(header) - len(row)) for row in rows)
+    return str(path)
+
+
+def test_fix_mojibake_text():
+    assert fix_mojibake_text("SÃ£o Paulo Grand Prix") == "São Paulo Grand Prix"
+    assert fix_mojibake_text("Fine of â‚¬5,000") == "Fine of €5,000"
+    assert fix_mojibake_text("Nico Hülkenberg") == "Nico Hülkenberg"
+    assert fix_mojibake_text(None) is None
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("['Lewis Hamilton', 'George Russell']", ["Lewis Hamilton", "George Russell"]),
+    ("Lewis Hamilton", ["Lewis Hamilton"]),
+    ("{'driver': 'Car', 'number': 44}", ["Car 44"]),
+    ("['None', '']", None),
+    ("[]", None),
+    ("null", None),
+    (None, None),
+])
+def test_parse_list_text(value, expected):
+    assert parse_list_text(value) == expected
+
+
+def load_one(tmp_path, rows):
+    return load_seasons([write_csv(tmp_path / "season.csv", HEADER, rows)])
+
+
+def test_car_numbers_resolve_per_season(tmp_path):
+    df = load_one(tmp_path, [
+        ["2024", "Abu Dhabi Grand Prix", "d", "Fine", "['Car 61']", None, "a.txt"],
+        ["2024", "Abu Dhabi Grand Prix", "d", "Fine", "['Car 7']", None, "b.txt"],
+        ["2025", "Miami Grand Prix", "d", "Fine", "['Car 7']", None, "c.txt"],
+        ["2024", "São Paulo Grand Prix", "d", "Fine", "['Car 50']", None, "d.txt"],
+        ["2024", "Saudi Arabian Grand Prix", "d", "Fine", "['Car 38']", None, "e.txt"],
+        ["2024", "Miami Grand Prix", "d", "Fine", "['44 - Lewis Hamilton', 'Car 4 and Piastrini']", None, "f.txt"],
+        ["2023", "Miami Grand Prix", "d", "Fine", "['Car 40']", "['Scuderia AlphaTauri', 'Oracle Red Bull Racing']", "g.txt"],
+    ])
+    ids = dict(zip(df["source_file"], df["driver_ids"]))
+    assert ids["a.txt"] == ["jack_doohan"]
+    assert pd.isna(ids["b.txt"])  # nobody raced #7 in 2024
+    assert ids["c.txt"] == ["jack_doohan"]
+    assert ids["d.txt"] == ["oliver_bearman"]
+    assert ids["e.txt"] == ["oliver_bearman"]
+    assert ids["f.txt"] == ["lando_norris", "lewis_hamilton", "oscar_piastri"]
+    assert ids["g.txt"] == ["liam_lawson"]
+    assert df.loc[df["source_file"] == "g.txt", "team_ids"].iloc[0] == ["rb", "red_bull"]
+
+
+def test_fines_and_durations(tmp_path):
+    df = load_one(tmp_path, [
+        ["2024", "x", "d", "Fine of €5,000", None, None, "a.txt"],
+        ["2024", "x", "d", "A fine of 25.000 Euros, 12,500 suspended", None, None, "b.txt"],
+        ["2024", "x", "d", "5 second time penalty and 2 penalty points", None, None, "c.txt"],
+        ["2024", "x", "d", "10 second stop and go penalty", None, None, "d.txt"],
+        ["2024", "x", "d", "Drop of 3 grid positions for the next race", None, None, "e.txt"],
+        ["2024", "x", "d", "Drive-through penalty", None, None, "f.txt"],
+        ["2024", "x", "d", "Start from pit lane", None, None, "g.txt"],
+        ["2024", "x", "d", "Pit lane start", None, None, "h.txt"],
+        ["2024", "x", "d", "Required to start the race from the pit lane", None, None, "i.txt"],
+    ])
+    row = df.set_index("source_file")
+    assert row.loc["a.txt", "fine_eur"] == 5000
+    assert row.loc["b.txt", "fine_eur"] == 25000 and row.loc["b.txt", "fine_suspended"]
+    assert row.loc["c.txt", "time_penalty_s"] == 5 and row.loc["c.txt", "penalty_points"] == 2
+    assert row.loc["d.txt", "stop_go_s"] == 10 and pd.isna(row.loc["d.txt", "time_penalty_s"])
+    assert row.loc["e.txt", "grid_places"] == 3
+    assert row.loc["f.txt", "drive_through"]
+    assert row[["pit_lane_start"]].loc[["g.txt", "h.txt", "i.txt"]].all().all()
+    assert not row.loc["a.txt", "pit_lane_start"]
+
+
+def test_typo_columns_are_folded_across_seasons(tmp_path):
+    old = write_csv(tmp_path / "2022.csv", ["year", "description", "penalty_given", "drivers_invovled",
+                                            "immediat_advantage_gained", "source_file", "Unnamed: 0", "lap_number", "teams_involved"],
+                    [["2022", "d", "Fine", "['Car 5']", "No", "2022 Miami Grand Prix - Decision.txt", "0"]])
+    new = write_csv(tmp_path / "2024.csv", ["year", "description", "penalty_given", "drivers_involved",
+                                            "immediate_advantage_gained", "source_file", "lap_number", "teams_involved"],
+                    [["", "d", None, "['Car 44']", "Yes", "2024 Miami Grand Prix - Decision.txt"]])
+    df = load_seasons([old, new])
+    assert "drivers_invovled" not in df.columns and "immediat_advantage_gained" not in df.columns
+    assert not any(str(c).startswith("Unnamed") for c in df.columns)
+    assert list(df["immediate_advantage_gained"]) == ["No", "Yes"]
+    assert list(df["driver_ids"]) == [["sebastian_vettel"], ["lewis_hamilton"]]
+    assert list(df["year"]) == [2022, 2024]  # missing year read from the title
+    assert len(penalties(df)) == 1
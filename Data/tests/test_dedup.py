@@ -0,0 +1,84 @@
+from annotations.dedup import DedupIndex, base_title, event_of
+
+DRIVERS = ["Verstappen", "Norris", "Leclerc", "Piastri", "Sainz", "Hamilton", "Russell", "Perez", "Alonso",
+           "Stroll", "Tsunoda", "Ricciardo", "Hulkenberg", "Magnussen", "Albon", "Sargeant", "Gasly", "Ocon"]
+
+
+def classification(status, penalty=None):
+    lines = ["2024 MIAMI GRAND PRIX", f"{status} RACE CLASSIFICATION"]
+    lines += [f"{i + 1} {name} finished in {90 + i} minutes {i * 7 % 60} seconds after {57 - i % 3} laps"
+              for i, name in enumerate(DRIVERS)]
+    if penalty:
+        lines.append(penalty)
+    return "\n".join(lines) + "\n"
+
+
+def write(folder, files):
+    for name, text in files.items():
+        (folder / name).write_text(text, encoding="utf-8")
+
+
+def test_titles():
+    assert event_of("2024_miami_grand_prix_-_final_race_classification.txt") == "2024 miami grand prix"
+    assert base_title("2024 Miami Grand Prix - Provisional Race Classification.txt") == "race classification"
+    assert base_title("2024 Miami Grand Prix - Final Race Classification V2_0.txt") == "race classification"
+
+
+def test_latest_issue_represents_the_cluster(tmp_path):
+    write(tmp_path, {
+        "2024 Miami Grand Prix - Provisional Race Classification.txt": classification("PROVISIONAL"),
+        "2024 Miami Grand Prix - Final Race Classification.txt": classification("FINAL"),
+        "2024 Miami Grand Prix - Decision - Car 44.txt": "The Stewards fine the driver of Car 44 EUR 5000.\n",
+    })
+    index = DedupIndex(str(tmp_path / "dedup.sqlite"))
+    pending = [p.name for p in tmp_path.glob("*.txt")]
+    assert index.duplicates_of(str(tmp_path), pending) == {
+        "2024 Miami Grand Prix - Provisional Race Classification.txt": "2024 Miami Grand Prix - Final Race Classification.txt",
+    }
+    index.close()
+
+
+def test_an_annotated_issue_is_preferred(tmp_path):
+    provisional = "2024 Miami Grand Prix - Provisional Race Classification.txt"
+    final = "2024 Miami Grand Prix - Final Race Classification.txt"
+    write(tmp_path, {provisional: classification("PROVISIONAL"), final: classification("FINAL")})
+    index = DedupIndex(str(tmp_path / "dedup.sqlite"))
+    assert index.duplicates_of(str(tmp_path), [final], annotated=[provisional]) == {final: provisional}
+    index.close()
+
+
+def test_a_new_penalty_line_is_annotated_on_its_own(tmp_path):
+    write(tmp_path, {
+        "2024 Miami Grand Prix - Provisional Race Classification.txt": classification("PROVISIONAL"),
+        "2024 Miami Grand Prix - Final Race Classification.txt":
+            classification("FINAL", "Car 55 received a 5 second time penalty"),
+    })
+    index = DedupIndex(str(tmp_path / "dedup.sqlite"))
+    assert index.duplicates_of(str(tmp_path), [p.name for p in tmp_path.glob("*.txt")]) == {}
+    index.close()
+
+
+def test_other_events_are_never_merged(tmp_path):
+    write(tmp_path, {
+        "2024 Miami Grand Prix - Provisional Race Classification.txt": classification("PROVISIONAL"),
+        "2024 Imola Grand Prix - Final Race Classification.txt": classification("FINAL"),
+    })
+    index = DedupIndex(str(tmp_path / "dedup.sqlite"))
+    assert index.duplicates_of(str(tmp_path), [p.name for p in tmp_path.glob("*.txt")]) == {}
+    index.close()
+
+
+def test_signatures_are_only_computed_for_new_files(tmp_path):
+    folder = tmp_path / "raw_text"
+    folder.mkdir()
+    names = [f"2024 Miami Grand Prix - {status} Race Classification.txt" for status in ("Provisional", "Final", "Official")]
+    write(folder, {names[0]: classification("PROVISIONAL"), names[1]: classification("FINAL")})
+    index = DedupIndex(str(tmp_path / "dedup.sqlite"))
+    assert index.update(str(folder)) == 2
+    index.close()
+
+    write(folder, {names[2]: classification("OFFICIAL")})
+    index = DedupIndex(str(tmp_path / "dedup.sqlite"))
+    assert index.update(str(folder)) == 1
+    assert index.clusters() == [sorted(names)]
+    index.close()
@@ -0,0 +1,105 @@
+import os
+
+import pytest
+import requests
+
+from downloader import download_file, download_all, make_session
+from fixture_server import serve_fixtures
+from manifest import Manifest
+from paths import MAX_NAME_LENGTH
+
+LONG_TITLE = "2024 Miami Grand Prix - Decision - " + "Car 44 - Unsafe release in the pit lane " * 5
+
+
+@pytest.fixture
+def site(tmp_path):
+    """A fixture folder of two small PDFs served over HTTP; yields (folder, start) where start(errors) serves it."""
+    folder = tmp_path / "site"
+    folder.mkdir()
+    (folder / "a.pdf").write_bytes(b"%PDF-1.4 a" * 1000)
+    (folder / "b.pdf").write_bytes(b"%PDF-1.4 b" * 10)
+    servers = []
+
+    def start(errors=None):
+        server, base_url = serve_fixtures(str(folder), errors=errors)
+        servers.append(server)
+        return server, base_url
+
+    yield folder, start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def part_files(folder):
+    return [name for name in os.listdir(folder) if name.endswith(".part")]
+
+
+def test_download_all_writes_complete_files(site, tmp_path):
+    folder, start = site
+    _, base_url = start()
+    out = tmp_path / "pdfs"
+    jobs = [(f"{base_url}/{name}", str(out / name)) for name in ("a.pdf", "b.pdf")]
+    stats = download_all(jobs, max_workers=2)
+    assert (stats["files"], stats["failed"], stats["bytes"]) == (2, 0, 10100)
+    assert (out / "a.pdf").read_bytes() == (folder / "a.pdf").read_bytes()
+    assert stats["paths"] == {url: path for url, path in jobs}
+    assert part_files(out) == []
+
+
+def test_retries_429_and_5xx_then_succeeds(site, tmp_path):
+    _, start = site
+    server, base_url = start(errors={"/a.pdf": [503, 429]})
+    session = make_session()
+    result = download_file(session, f"{base_url}/a.pdf", str(tmp_path / "a.pdf"), retries=3, backoff=0.01)
+    session.close()
+    assert result["status"] == 200 and result["bytes"] == 10000
+    assert [path for path, _ in server.requests] == ["/a.pdf"] * 3
+    assert part_files(tmp_path) == []
+
+
+def test_gives_up_after_the_last_retry_without_a_partial_file(site, tmp_path):
+    _, start = site
+    server, base_url = start(errors={"/a.pdf": [500, 502, 504]})
+    out = tmp_path / "pdfs"
+    out.mkdir()
+    session = make_session()
+    with pytest.raises(requests.HTTPError):
+        download_file(session, f"{base_url}/a.pdf", str(out / "a.pdf"), retries=3, backoff=0.01)
+    session.close()
+    assert len(server.requests) == 3
+    assert os.listdir(out) == []
+
+
+def test_404_is_not_retried(site, tmp_path):
+    _, start = site
+    server, base_url = start()
+    session = make_session()
+    with pytest.raises(requests.HTTPError):
+        download_file(session, f"{base_url}/missing.pdf", str(tmp_path / "missing.pdf"), retries=3, backoff=0.01)
+    session.close()
+    assert len(server.requests) == 1
+
+
+def test_changed_document_replaces_its_old_file(site, tmp_path):
+    folder, start = site
+    _, base_url = start()
+    url = f"{base_url}/a.pdf"
+    manifest = Manifest(str(tmp_path / "manifest.sqlite"))
+    manifest.start_run()
+    requested = str(tmp_path / "pdfs" / (LONG_TITLE.strip() + ".pdf"))
+
+    first = download_all([(url, requested)], manifest=manifest)["paths"][url]
+    assert len(os.path.basename(first)) <= MAX_NAME_LENGTH  # shortened with a content-hash suffix
+
+    served = folder / "a.pdf"
+    served.write_bytes(b"%PDF-1.4 corrected" * 100)
+    later = served.stat().st_mtime + 3600
+    os.utime(served, (later, later))
+    second = download_all([(url, requested)], manifest=manifest, revalidate=True)["paths"][url]
+
+    assert second != first
+    assert not os.path.exists(first)
+    assert open(second, "rb").read() == served.read_bytes()
+    assert manifest.get(url)["local_path"] == second
+    manifest.close()
@@ -0,0 +1,65 @@
+import time
+
+from annotations.engine import RateLimiter, run_concurrently, is_throttle_error
+
+
+def test_throttle_halves_the_rate_and_backs_off_exponentially():
+    limiter = RateLimiter(requests_per_minute=60, base_backoff=1.0, max_backoff=3.0)
+    pauses = [limiter.throttle() for _ in range(4)]
+    # base * 2**(strike - 1), capped, plus up to 25% jitter
+    for pause, expected in zip(pauses, [1.0, 2.0, 3.0, 3.0]):
+        assert expected <= pause <= expected * 1.25
+    assert limiter.throttled == 4
+    assert limiter._factor == 0.1  # never below a tenth of the nominal rate
+
+
+def test_recover_restores_the_rate_slowly():
+    limiter = RateLimiter(requests_per_minute=60)
+    limiter.throttle()
+    limiter.recover()
+    assert limiter._strikes == 0
+    assert abs(limiter._factor - 0.55) < 1e-9
+    for _ in range(20):
+        limiter.recover()
+    assert limiter._factor == 1.0
+    # after a recovery the backoff starts from the base again
+    assert limiter.throttle() <= limiter.base_backoff * 1.25
+
+
+def test_acquire_waits_out_a_pause():
+    limiter = RateLimiter(base_backoff=0.2)
+    pause = limiter.throttle()
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= pause - 0.01
+
+
+def test_acquire_spends_the_buckets():
+    limiter = RateLimiter(tokens_per_minute=6000)  # 100 tokens/s
+    start = time.monotonic()
+    limiter.acquire(6000)  # the bucket starts full
+    assert time.monotonic() - start < 0.05
+    limiter.acquire(20)  # then refills at the nominal rate
+    assert 0.15 <= time.monotonic() - start < 0.5
+
+
+def test_throttle_errors_are_retried_other_errors_are_final():
+    asked = {}
+
+    def work(item):
+        asked[item] = asked.get(item, 0) + 1
+        if item == "busy" and asked[item] == 1:
+            raise RuntimeError("429 Too Many Requests")
+        if item == "bad":
+            raise ValueError("not JSON")
+        return item.upper()
+
+    results = {}
+    summary = run_concurrently(["ok", "busy", "bad"], work, lambda i, r, e: results.setdefault(i, (r, e)),
+                               limiter=RateLimiter(base_backoff=0.01))
+    assert results["ok"] == ("OK", None)
+    assert results["busy"] == ("BUSY", None)
+    assert isinstance(results["bad"][1], ValueError)
+    assert asked == {"ok": 1, "busy": 2, "bad": 1}
+    assert (summary["done"], summary["failed"], summary["throttled"]) == (2, 1, 1)
+    assert is_throttle_error(TimeoutError()) and not is_throttle_error(ValueError("bad input"))
@@ -0,0 +1,21 @@
+import pytest
+
+from annotations.llm_backends import make_llm
+
+
+def test_gemini_rejects_a_base_url(monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "key")
+    with pytest.raises(ValueError):
+        make_llm("gemini", base_url="http://127.0.0.1:11435")
+
+
+def test_gemini_always_needs_a_key(monkeypatch):
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    with pytest.raises(RuntimeError):
+        make_llm("gemini")
+
+
+def test_openai_needs_a_key_or_a_local_server(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    with pytest.raises(RuntimeError):
+        make_llm("openai")
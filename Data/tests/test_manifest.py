@@ -0,0 +1,103 @@
+import os
+
+import pytest
+
+from downloader import download_all
+from fixture_server import serve_fixtures
+from manifest import Manifest
+
+
+@pytest.fixture
+def served(tmp_path):
+    folder = tmp_path / "site"
+    folder.mkdir()
+    for name in ("a.pdf", "b.pdf", "c.pdf"):
+        (folder / name).write_bytes(b"%PDF-1.4 " + name.encode())
+    server, base_url = serve_fixtures(str(folder))
+    yield server, base_url
+    server.shutdown()
+    server.server_close()
+
+
+def jobs(base_url, out, names):
+    return [(f"{base_url}/{name}", str(out / name)) for name in names]
+
+
+def test_second_run_revalidates_with_conditional_requests(served, tmp_path):
+    server, base_url = served
+    out = tmp_path / "pdfs"
+    manifest = Manifest(str(tmp_path / "manifest.sqlite"))
+    manifest.start_run()
+    assert download_all(jobs(base_url, out, ["a.pdf", "b.pdf"]), manifest=manifest)["files"] == 2
+    url = f"{base_url}/a.pdf"
+    assert manifest.is_current(url, str(out / "a.pdf"))
+    assert "If-Modified-Since" in manifest.conditional_headers(url)
+
+    # Without revalidation a known document is not even requested.
+    server.requests.clear()
+    stats = download_all(jobs(base_url, out, ["a.pdf", "b.pdf"]), manifest=manifest)
+    assert (stats["skipped"], server.requests) == (2, [])
+
+    manifest.start_run()
+    checked_before = manifest.get(url)["checked_at"]
+    stats = download_all(jobs(base_url, out, ["a.pdf", "b.pdf"]), manifest=manifest, revalidate=True)
+    assert (stats["not_modified"], stats["files"]) == (2, 0)
+    assert len(server.requests) == 2
+    assert all(headers.get("If-Modified-Since") == manifest.get(f"{base_url}{path}")["last_modified"]
+               for path, headers in server.requests)
+    assert manifest.get(url)["checked_at"] > checked_before
+    manifest.close()
+
+
+def test_etag_is_sent_as_if_none_match(tmp_path):
+    manifest = Manifest(str(tmp_path / "manifest.sqlite"))
+    manifest.record("https://www.fia.com/x.pdf", str(tmp_path / "x.pdf"), etag='"abc"', last_modified=None)
+    assert manifest.conditional_headers("https://www.fia.com/x.pdf") == {"If-None-Match": '"abc"'}
+    assert manifest.conditional_headers("https://www.fia.com/unknown.pdf") == {}
+    manifest.close()
+
+
+def test_a_deleted_file_is_downloaded_again(served, tmp_path):
+    _, base_url = served
+    out = tmp_path / "pdfs"
+    manifest = Manifest(str(tmp_path / "manifest.sqlite"))
+    download_all(jobs(base_url, out, ["a.pdf"]), manifest=manifest)
+    os.remove(out / "a.pdf")
+    assert not manifest.is_current(f"{base_url}/a.pdf", str(out / "a.pdf"))
+    assert download_all(jobs(base_url, out, ["a.pdf"]), manifest=manifest)["files"] == 1
+    manifest.close()
+
+
+def test_new_documents_are_those_first_seen_in_a_run(served, tmp_path):
+    _, base_url = served
+    out = tmp_path / "pdfs"
+    manifest = Manifest(str(tmp_path / "manifest.sqlite"))
+    first = manifest.start_run()
+    download_all(jobs(base_url, out, ["a.pdf", "b.pdf"]), manifest=manifest)
+    second = manifest.start_run()
+    download_all(jobs(base_url, out, ["a.pdf", "b.pdf", "c.pdf"]), manifest=manifest, revalidate=True)
+
+    def names(documents):
+        return [os.path.basename(doc["local_path"]) for doc in documents]
+
+    assert names(manifest.new_documents(first)) == ["a.pdf", "b.pdf"]
+    assert names(manifest.new_documents(second)) == ["c.pdf"]
+    assert names(manifest.new_documents()) == ["c.pdf"]
+    manifest.close()
+
+
+def test_path_for_finds_a_document_by_its_listing_title(served, tmp_path):
+    _, base_url = served
+    out = tmp_path / "pdfs"
+    path = str(tmp_path / "manifest.sqlite")
+    manifest = Manifest(path)
+    title = "2024 Miami Grand Prix - Decision - Car 44 - Unsafe release"
+    download_all([(f"{base_url}/a.pdf", str(out / "a.pdf"), title), (f"{base_url}/b.pdf", str(out / "b.pdf"))],
+                 manifest=manifest)
+    manifest.close()
+
+    manifest = Manifest(path)  # read back from the table, not the in-memory map
+    assert manifest.path_for(title) == str(out / "a.pdf")
+    assert manifest.path_for("a") is None  # the href slug is not the title
+    assert manifest.path_for("b") == str(out / "b.pdf")  # a job without a title falls back to the file name
+    manifest.close()
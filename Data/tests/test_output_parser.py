@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+from annotations.output_parser import (
+    repair_object, parse_output, extract_records, build_repair_prompt, OutputError, ParseStats,
+)
+from annotations.llm_annotator import LLMAnnotator
+from annotations.llm_cache import ResponseCache
+
+GOOD = {"type_of_document": "Decision", "year": "2024", "lap_number": "Lap 12",
+        "drivers_involved": "Max Verstappen and Lando Norris", "penalty_given": "N/A"}
+BROKEN = '{type_of_document: "Decision", year: 2024, "lap_number": 3}'  # unquoted keys: no local fix
+
+
+def answer(*objects):
+    return "```json\n[" + ",\n".join(objects) + "]\n```"
+
+
+def chunked(text, size=7):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("fragment", [
+    '{"year": 2024, "track": "Imola",}',
+    '{"year": 2024, "track": None, "was_contact_made": True}',
+    '{"year": 2024\n "track": "Imola"}',
+    '{"year": 2024, "track": “Imola”}',
+    '{"year": 2024, "track": "Imo',
+])
+def test_repair_object_fixes_common_defects(fragment):
+    assert repair_object(fragment)["year"] == 2024
+
+
+def test_repair_object_gives_up_on_unquoted_keys():
+    assert repair_object(BROKEN) is None
+
+
+def test_parse_output_validates_objects_as_they_stream():
+    stats = ParseStats()
+    records, broken, raw = parse_output(chunked(answer(json.dumps(GOOD), '{"year": 2023,}')), stats)
+    assert broken == []
+    assert raw == answer(json.dumps(GOOD), '{"year": 2023,}')
+    assert records[0]["year"] == 2024 and records[0]["lap_number"] == 12
+    assert records[0]["drivers_involved"] == ["Max Verstappen", "Lando Norris"]
+    assert records[0]["penalty_given"] is None
+    assert len(records[0]) == 17
+    assert records[1]["year"] == 2023
+    assert (stats.responses, stats.objects, stats.repaired) == (1, 2, 1)
+
+
+def test_only_broken_objects_are_reasked():
+    asked = []
+
+    def stream(prompt):
+        asked.append(prompt)
+        if prompt.startswith("The following JSON object(s) are malformed"):
+            return chunked('[{"type_of_document": "Decision", "year": 2024, "lap_number": 3}]')
+        return chunked(answer(json.dumps(GOOD), BROKEN))
+
+    stats = ParseStats()
+    records, raw = extract_records(stream, "PROMPT", stats)
+    assert asked == ["PROMPT", build_repair_prompt([BROKEN])]
+    assert [r["lap_number"] for r in records] == [12, 3]
+    assert raw == answer(json.dumps(GOOD), BROKEN)
+    assert stats.reasked == 1 and stats.full_retries == 0
+
+
+def test_nothing_usable_raises_but_an_empty_answer_does_not():
+    with pytest.raises(OutputError) as error:
+        extract_records(lambda p: ["I could not find any penalties."], "PROMPT")
+    assert error.value.raw_output == "I could not find any penalties."
+    assert extract_records(lambda p: ["```json\n[]\n```"], "PROMPT") == ([], "```json\n[]\n```")
+
+
+class FakeChain:
+    def __init__(self, answers):
+        self.answers = answers
+        self.prompts = []
+
+    def stream(self, prompt):
+        self.prompts.append(prompt)
+        for key, text in self.answers.items():
+            if prompt.startswith(key):
+                return iter(chunked(text))
+        return iter(chunked(answer(json.dumps(GOOD), BROKEN)))
+
+
+def test_cached_raw_output_is_reparsed_with_its_repair(tmp_path):
+    repaired = '[{"type_of_document": "Decision", "year": 2024, "lap_number": 3}]'
+    chain = FakeChain({"The following JSON object(s) are malformed": repaired})
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    text = "The Stewards, having received a report from the Race Director, decide ..."
+    first = LLMAnnotator(chain, "fake").annotate_text(text, cache=cache, delay=0)
+    assert len(chain.prompts) == 2  # the answer and one repair re-ask
+
+    again = FakeChain({})
+    second = LLMAnnotator(again, "fake").annotate_text(text, cache=cache, delay=0)
+    cache.close()
+    assert again.prompts == []
+    assert second == first
+    assert [r["lap_number"] for r in second] == [12, 3]
@@ -0,0 +1,68 @@
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from annotations.parquet_export import write_dataset, read_dataset, normalize_row
+
+ROWS = [
+    {"type_of_document": "Stewards decision", "year": "2024", "grand_prix": "Miami Grand Prix", "session_type": "Race",
+     "lap_number": "Lap 12", "penalty_given": "5 second time penalty", "drivers_invovled": "['Lewis Hamilton']",
+     "teams_invovled": '["Mercedes"]', "immediat_advantage_gained": "No",
+     "source_file": "2024 Miami Grand Prix - Decision - Car 44.txt"},
+    {"type_of_document": "Stewards decision", "year": "2025", "grand_prix": "Oracle Red Bull Racing",  # garbled GP
+     "session_type": "Qualifying", "lap_number": "", "penalty_given": "Reprimand",
+     "drivers_involved": "Max Verstappen, Yuki Tsunoda", "teams_involved": "N/A",
+     "source_file": "2025_monaco_grand_prix_-_decision_-_car_1.txt"},
+    {"type_of_document": "Summons", "year": "not mentioned", "grand_prix": "", "penalty_given": "none",
+     "source_file": "summons.txt"},  # no year anywhere
+]
+
+
+def test_normalize_row_falls_back_to_the_title():
+    record = normalize_row(ROWS[1])
+    assert (record["year"], record["grand_prix"]) == (2025, "Monaco Grand Prix")
+    assert record["drivers_involved"] == ["Max Verstappen", "Yuki Tsunoda"]
+    assert record["teams_involved"] is None
+    assert record["lap_number"] is None
+
+    garbled = normalize_row({"year": "nan", "grand_prix": "x", "source_file": "2024 Abu Dhabi Grand Prix - Note.txt"})
+    assert (garbled["year"], garbled["grand_prix"]) == (2024, "Abu Dhabi Grand Prix")
+
+
+def test_round_trip_keeps_types_and_partitions_by_year(tmp_path):
+    root = str(tmp_path / "dataset")
+    assert write_dataset(ROWS, root) == 3
+    assert sorted(os.listdir(root)) == ["year=2024", "year=2025", "year=__HIVE_DEFAULT_PARTITION__"]
+
+    schema = pq.read_schema(os.path.join(root, "year=2024", os.listdir(os.path.join(root, "year=2024"))[0]))
+    assert str(schema.field("lap_number").type) == "int16"
+    assert str(schema.field("session_type").type) == "dictionary<values=string, indices=int32, ordered=0>"
+    assert str(schema.field("drivers_involved").type) == "list<element: string>"
+
+    frame = read_dataset(root).sort_values("source_file", na_position="last").reset_index(drop=True)
+    assert len(frame) == 3
+    assert frame["year"].dtype == pd.Int16Dtype() and frame["lap_number"].dtype == pd.Int16Dtype()
+    assert isinstance(frame["session_type"].dtype, pd.CategoricalDtype)
+    assert isinstance(frame["grand_prix"].dtype, pd.CategoricalDtype)
+
+    miami = frame[frame["source_file"].str.startswith("2024")].iloc[0]
+    assert (miami["year"], miami["lap_number"]) == (2024, 12)
+    assert list(miami["drivers_involved"]) == ["Lewis Hamilton"]
+    assert list(miami["teams_involved"]) == ["Mercedes"]
+    assert miami["immediate_advantage_gained"] == "No"
+
+    no_year = frame[frame["source_file"] == "summons.txt"].iloc[0]
+    assert pd.isna(no_year["year"]) and pd.isna(no_year["penalty_given"])
+
+    only_2025 = read_dataset(root, filters=[("year", "=", 2025)])
+    assert list(only_2025["grand_prix"]) == ["Monaco Grand Prix"]
+
+
+def test_rewriting_a_year_replaces_it(tmp_path):
+    root = str(tmp_path / "dataset")
+    write_dataset(ROWS, root)
+    write_dataset([dict(ROWS[0], penalty_given="Fine")], root)
+    frame = read_dataset(root, filters=[("year", "=", 2024)])
+    assert list(frame["penalty_given"]) == ["Fine"]
+    assert len(read_dataset(root)) == 3
@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from paths import local_path, MAX_NAME_LENGTH, HASH_LENGTH
+
+SHA_A = "a" * 64
+SHA_B = "b" * 64
+
+
+def test_short_safe_names_are_kept():
+    path = os.path.join("pdfs", "2024", "2024 Miami Grand Prix - Decision - Car 44 - Speeding.pdf")
+    assert local_path(path, SHA_A) == path
+
+
+def test_long_names_are_cut_at_a_word_and_hashed():
+    title = "2024 Miami Grand Prix - Decision - " + "Unsafe release in the pit lane " * 8
+    name = os.path.basename(local_path(os.path.join("pdfs", title.strip() + ".pdf"), SHA_A))
+    assert len(name) <= MAX_NAME_LENGTH
+    assert name.endswith(f"-{SHA_A[:HASH_LENGTH]}.pdf")
+    assert name.startswith("2024 Miami Grand Prix - Decision - Unsafe release")
+    assert not name[:-len(f"-{SHA_A[:HASH_LENGTH]}.pdf")].endswith((" ", "-"))
+
+
+def test_colliding_long_prefixes_get_different_names():
+    prefix = "2024 Miami Grand Prix - Decision - " + "Car 44 " * 30
+    first = local_path(prefix + "- Speeding.pdf", SHA_A)
+    second = local_path(prefix + "- Impeding.pdf", SHA_B)
+    assert first != second
+    # The same content always lands on the same name.
+    assert local_path(prefix + "- Speeding.pdf", SHA_A) == first
+
+
+def test_long_name_without_a_hash_is_an_error():
+    with pytest.raises(ValueError):
+        local_path("x" * (MAX_NAME_LENGTH + 1) + ".pdf")
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("CON.pdf", "_CON.pdf"),
+    ("nul", "_nul"),
+    ("com1.txt", "_com1.txt"),
+    ('Car 1: "Red Bull"?.pdf', "Car 1_ _Red Bull__.pdf"),
+    ("Summons. ", "Summons"),
+])
+def test_reserved_names_and_characters(name, expected):
+    assert local_path(name, SHA_A) == expected
@@ -0,0 +1,53 @@
+import os
+
+from pipeline import Pipeline, Stage, SKIPPED, REBUILT, PARTIAL, files_under, file_fingerprint
+
+
+def make_pipeline(tmp_path, calls, fail=()):
+    source = tmp_path / "source"
+
+    def inputs():
+        return {p: file_fingerprint(p, content=True) for p in files_under(str(source), ".txt")}
+
+    def action(changed):
+        calls.append([os.path.basename(p) for p in changed])
+        return [p for p in changed if os.path.basename(p) not in fail]
+
+    return Pipeline([Stage("copy", inputs, action)], state_path=str(tmp_path / "state.sqlite"))
+
+
+def status(report):
+    return {r["stage"]: (r["status"], r["rebuilt"]) for r in report["stages"]}
+
+
+def test_unchanged_inputs_are_skipped(tmp_path):
+    (tmp_path / "source").mkdir()
+    for name in ("a.txt", "b.txt"):
+        (tmp_path / "source" / name).write_text(name)
+    calls = []
+    pipeline = make_pipeline(tmp_path, calls)
+    assert status(pipeline.run()) == {"copy": (REBUILT, 2)}
+    assert status(pipeline.run()) == {"copy": (SKIPPED, 0)}
+
+    (tmp_path / "source" / "b.txt").write_text("edited")
+    assert status(pipeline.run()) == {"copy": (REBUILT, 1)}
+    assert calls == [["a.txt", "b.txt"], ["b.txt"]]
+    assert set(pipeline.built("copy")) == set(files_under(str(tmp_path / "source"), ".txt"))
+
+    assert status(pipeline.run(force={"copy"})) == {"copy": (REBUILT, 2)}
+    pipeline.close()
+
+
+def test_failed_inputs_are_retried_next_run(tmp_path):
+    (tmp_path / "source").mkdir()
+    for name in ("a.txt", "b.txt"):
+        (tmp_path / "source" / name).write_text(name)
+    calls = []
+    pipeline = make_pipeline(tmp_path, calls, fail={"b.txt"})
+    assert status(pipeline.run()) == {"copy": (PARTIAL, 1)}
+    pipeline.close()
+
+    pipeline = make_pipeline(tmp_path, calls)
+    assert status(pipeline.run()) == {"copy": (REBUILT, 1)}
+    assert calls == [["a.txt", "b.txt"], ["b.txt"]]
+    pipeline.close()
@@ -0,0 +1,32 @@
+import os
+import glob
+
+from annotations.preclassify import evaluate, route, document_type, SKIP, DETERMINISTIC, LLM
+
+DATA = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ANNOTATED = sorted(glob.glob(os.path.join(DATA, "annotations", "anottated", "*.csv")))
+
+
+def test_no_labelled_penalty_document_is_skipped():
+    # The pre-classifier only exists to save LLM calls; it must never cost penalty data.
+    report = evaluate(ANNOTATED, os.path.join(DATA, "raw_text"))
+    assert report["documents"] > 2000
+    assert report["missed"] == []
+    assert report["recall"] == 1.0
+
+
+def test_document_type_handles_both_title_styles():
+    assert document_type("2024 Abu Dhabi Grand Prix - Decision - Car 44 - Impeding.txt") == "decision"
+    assert document_type("2025_miami_grand_prix_-_summons_-_car_23_-_pit_lane_incident.txt") == "summons"
+
+
+def test_routes():
+    assert route("2024 Miami Grand Prix - Entry List.txt", "No / Driver / Team") == SKIP
+    assert route("2024 Miami Grand Prix - Summons - Car 20 - Pit lane.txt", "The Stewards summon") == LLM
+    assert route("2024 Miami Grand Prix - Pre-Race Procedure.txt", "Cars must leave the pit lane") == LLM
+    assert route("2024 Miami Grand Prix - P1 Classification.txt", "1 VER 1:29.001") == SKIP
+    assert route("2024 Miami Grand Prix - P1 Classification.txt", "Car 4 - 5 second time penalty") == LLM
+    assert route("2022 Belgian Grand Prix - New PU elements for this Event, Parc Fermé issue.txt", "") == LLM
+    assert route("2022 Belgian Grand Prix - New PU elements for this Event.txt", "") == SKIP
+    templated = "No / Driver 44 - Lewis Hamilton\nFact Speeding\nDecision Fine"
+    assert route("2024 Miami Grand Prix - Decision - Car 44 - Speeding.txt", templated) == DETERMINISTIC
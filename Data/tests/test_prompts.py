@@ -0,0 +1,66 @@
+import pytest
+
+from annotations import llm_annotator
+from annotations.annotation_store import AnnotationStore
+from annotations.engine import estimate_tokens
+from annotations.llm_annotator import LLMAnnotator
+from annotations.prompts import SYSTEM_PREFIX, EXAMPLES, build_prompt, detect_kind
+
+TEXT = "2024 MIAMI GRAND PRIX\nThe driver of Car 20 is required to report to the Stewards.\n"
+
+
+@pytest.mark.parametrize("filename, kind", [
+    ("2024 Miami Grand Prix - Summons - Car 20 - Pit lane entry.txt", "summons"),
+    ("2025_miami_grand_prix_-_summons_-_car_10_-_alleged_failing_to_slow_for_yellow_flags.txt", "summons"),
+    ("2024 Austrian Grand Prix - Provisional Sprint Classification.txt", "classification"),
+    ("2025_chinese_grand_prix_-_final_starting_grid.txt", "classification"),
+    ("2024 Miami Grand Prix - Qualifying Deleted Lap Time - Yellow Flags.txt", "deleted_laps"),
+    ("2025_monaco_grand_prix_-_infringement_-_qualifying_deleted_lap_times.txt", "deleted_laps"),
+    ("2025_miami_grand_prix_-_decision_-_car_44_-_alleged_causing_a_collision.txt", "decision"),
+    ("2024 Belgian Grand Prix - Post-Race Procedure.txt", "note"),
+    (None, "note"),
+])
+def test_detect_kind(filename, kind):
+    assert detect_kind(filename) == kind
+
+
+def test_every_kind_shares_the_same_prefix_bytes():
+    filenames = {
+        "decision": "x - Decision - Car 1.txt", "deleted_laps": "x - Race deleted lap times.txt",
+        "classification": "x - Final Race Classification.txt", "summons": "x - Summons - Car 1.txt", "note": None,
+    }
+    assert set(filenames) == set(EXAMPLES)
+    prefix = SYSTEM_PREFIX.encode("utf-8")
+    for kind, filename in filenames.items():
+        prompt, built_kind, _ = build_prompt(TEXT, filename)
+        assert built_kind == kind
+        assert prompt.encode("utf-8")[:len(prefix)] == prefix
+
+
+def test_build_prompt_estimates_its_tokens():
+    prompt, _, tokens = build_prompt(TEXT, "x - Summons - Car 20.txt")
+    assert tokens == estimate_tokens(prompt)
+    assert prompt.endswith(f"Incident text:\n{TEXT}\n")
+
+
+class EmptyChain:
+    def stream(self, prompt):
+        yield "[]"
+
+
+def test_each_prompt_is_built_once(tmp_path, monkeypatch):
+    folder = tmp_path / "2024"
+    folder.mkdir()
+    for car in (20, 22):
+        (folder / f"2024 Miami Grand Prix - Summons - Car {car} - Pit lane entry.txt").write_text(TEXT * 5)
+    built = []
+
+    def counting_build_prompt(input_text, filename=None):
+        built.append(filename)
+        return build_prompt(input_text, filename)
+
+    monkeypatch.setattr(llm_annotator, "build_prompt", counting_build_prompt)
+    store = AnnotationStore(str(tmp_path / "store.sqlite"))
+    LLMAnnotator(EmptyChain(), "fake").process_folder(str(folder), store, tokens_per_minute=100000)
+    assert sorted(built) == sorted(p.name for p in folder.iterdir())
+    store.close()
@@ -0,0 +1,61 @@
+import os
+
+from annotations.search_index import SearchIndex, to_match
+
+MIAMI = "2024 Miami Grand Prix - Decision - Car 44 - Pit lane speeding.txt"
+IMOLA = "2025_emilia_romagna_grand_prix_-_decision_-_car_22_-_impeding.txt"
+
+
+def files(root):
+    (root / "2024").mkdir(parents=True, exist_ok=True)
+    (root / "2025").mkdir(exist_ok=True)
+    (root / "2024" / MIAMI).write_text("Car 44 exceeded the pit lane speed limit by 3.1 km/h. Fine.\n")
+    (root / "2025" / IMOLA).write_text("Car 22 impeded Car 4 at Turn 7 during qualifying.\n")
+
+
+def names(hits):
+    return [hit["source_file"] for hit in hits]
+
+
+def test_to_match():
+    assert to_match("car 44 pit lane") == '"car 44" "pit" "lane"'
+    assert to_match('"unsafe release" OR impeding') == '"unsafe release" OR impeding'
+
+
+def test_documents_are_indexed_once_until_they_change(tmp_path):
+    root = tmp_path / "raw_text"
+    files(root)
+    index = SearchIndex(str(tmp_path / "search.sqlite"))
+    assert index.update_documents(str(root)) == 2
+    assert index.update_documents(str(root)) == 0
+    assert names(index.search("car 44")) == [MIAMI]
+    assert names(index.search("car 22", year=2024)) == []
+    assert names(index.search("car 22", year=2025)) == [IMOLA]
+
+    path = root / "2024" / MIAMI
+    path.write_text("Car 44 was released unsafely into the fast lane.\n")
+    os.utime(path, ns=(0, path.stat().st_mtime_ns + 10**9))
+    assert index.update_documents(str(root)) == 1
+    assert index.counts()["documents"] == 2
+    assert names(index.search("speed limit")) == []
+    assert names(index.search("released unsafely")) == [MIAMI]
+    index.close()
+
+
+def test_records_are_reindexed_only_when_their_content_changes(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.sqlite"))
+    rows = [
+        {"source_file": MIAMI, "year": 2024, "penalty_given": "Fine of 200 euros", "drivers_involved": '["Lewis Hamilton"]'},
+        {"source_file": IMOLA, "year": 2025, "penalty_given": "Reprimand", "drivers_involved": '["Yuki Tsunoda"]'},
+    ]
+    assert index.update_records(rows) == 2
+    assert index.update_records(rows) == 0
+    assert names(index.search("hamilton")) == [MIAMI]
+
+    rows[0] = dict(rows[0], penalty_given="Drop of 3 grid positions")
+    assert index.update_records(rows) == 1
+    assert index.counts()["records"] == 2
+    assert names(index.search("euros")) == []
+    [hit] = index.search("grid positions")
+    assert hit["source_file"] == MIAMI and hit["records"][0]["penalty_given"] == "Drop of 3 grid positions"
+    index.close()
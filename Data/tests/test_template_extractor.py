@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from annotations.template_extractor import extract_templated, FIELDS
+
+DATA = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(DATA, "fixtures", "bench", "raw_text")
+
+
+def extract(year, name):
+    with open(os.path.join(FIXTURES, str(year), name), "r", encoding="utf-8") as f:
+        return extract_templated(f.read(), name)
+
+
+def test_infringement_with_collision():
+    [record] = extract(2025, "2025_bahrain_grand_prix_-_infringement_-_car_30_-_causing_a_collision_with_car_27_at_t1.txt")
+    assert list(record) == FIELDS
+    assert record["year"] == 2025
+    assert record["grand_prix"] == "Bahrain Grand Prix"
+    assert record["session_type"] == "Race"
+    assert record["drivers_involved"] == ["Liam Lawson"]
+    assert record["turn_number"] == "1"
+    assert record["penalty_given"].startswith("10 second time penalty")
+    assert record["type_of_incident"] == "Causing a collision with car 27 at t1"
+
+
+def test_no_further_action_means_no_penalty():
+    [record] = extract(2025, "2025_miami_grand_prix_-_decision_-_car_44_-_alleged_causing_a_collision.txt")
+    assert record["drivers_involved"] == ["Lewis Hamilton"]
+    assert record["penalty_given"] is None
+    assert record["turn_number"] == "17"
+
+
+@pytest.mark.parametrize("year, name, driver, penalty", [
+    (2024, "2024 Chinese Grand Prix - Infringement - Car 27 - Pit Lane Infringement.txt", "Nico Hulkenberg", "Reprimand"),
+    (2025, "2025_canadian_grand_prix_-_infringement_-_car_6_-_impeding_car_55.txt", "Isack Hadjar", "Drop of 3 grid"),
+    (2025, "2025_spanish_grand_prix_-_infringement_-_car_18_-_post-qualifying_weighing.txt", "Lance Stroll", "Warning"),
+])
+def test_qualifying_decisions(year, name, driver, penalty):
+    [record] = extract(year, name)
+    assert record["session_type"] == "Qualifying"
+    assert record["drivers_involved"] == [driver]
+    assert record["penalty_given"].startswith(penalty)
+
+
+@pytest.mark.parametrize("year, name", [
+    (2025, "2025_bahrain_grand_prix_-_summons_-_car_27_-_technical_regulations.txt"),
+    (2024, "2024 Azerbaijan Grand Prix - Race Director's Note - SC2-SC1 Time.txt"),
+    (2025, "2025_chinese_grand_prix_-_final_starting_grid.txt"),
+])
+def test_untemplated_documents_fall_back_to_the_llm(year, name):
+    assert extract(year, name) is None